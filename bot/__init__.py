@@ -1,9 +1,7 @@
-# Вариант 1: Простой импорт всех модулей
-from . import main
-from . import config
-from . import google_sheets
+# Подмодули импортируются лениво: `import bot.config` или `import bot.storage`
+# не должны поднимать весь бот (bot.main создает экземпляр при импорте)
+import importlib
 
-# Вариант 2: Более явный импорт с указанием, что именно экспортируется
 __all__ = [
     'main',
     'config', 
@@ -12,3 +10,9 @@ __all__ = [
 
 # Дополнительно можно добавить версию пакета
 __version__ = '1.0.0'
+
+
+def __getattr__(name):
+    if name in __all__:
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
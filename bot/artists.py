@@ -0,0 +1,232 @@
+# Файл: bot/artists.py
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# !!! ЗАПОЛНИТЕ ЭТОТ СЛОВАРЬ ВАШИМИ ДАННЫМИ !!!
+# Встроенная карта: используется, пока не загружен внешний справочник (ARTISTS_SOURCE)
+ARTIST_MAPPING: Dict[int, str] = {
+    283779327: "Егор", 413165965: "Настя", 6292548875: "Яна", 6260796172: "Кира",
+    1411900354: "Влада", 688970244: "Алексей", 5562603173: "Лиза", 904105063: "Даша",
+    5617024819: "Амина", 1093638777: "Тёма", 1389343617: "Никита", 2129236642: "Макс",
+    1411021174: "Катя",
+}
+
+
+def resolve_artist_name(mapping: Dict[int, str], user_id: int, username: Optional[str] = None) -> str:
+    """Имя артиста по карте, иначе username из Telegram, иначе ID."""
+    return mapping.get(user_id, username or f"ID:{user_id}")
+
+
+def parse_artist_rows(rows) -> Dict[int, str]:
+    """
+    Карта из строк (user_id, имя): строки листа или списка JSON/YAML.
+    Заголовок и строки без числового user_id или без имени пропускаются.
+    """
+    mapping: Dict[int, str] = {}
+    for row in rows:
+        if isinstance(row, dict):
+            row = (row.get('user_id', row.get('id')), row.get('name', row.get('имя')))
+        if len(row) < 2:
+            continue
+        user_id, name = str(row[0]).strip(), str(row[1] or '').strip()
+        if not user_id.lstrip('-').isdigit() or not name:
+            continue
+        mapping[int(user_id)] = name
+    return mapping
+
+
+class FileArtistSource:
+    """
+    Справочник из файла JSON или YAML: {"283779327": "Егор", ...} или
+    список [{"user_id": 283779327, "name": "Егор"}, ...].
+    Файл перечитывается, только если изменились время изменения или размер.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name = f"file:{path}"
+
+    def signature(self):
+        stat = os.stat(self.path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def load(self) -> Dict[int, str]:
+        with open(self.path, encoding='utf-8') as f:
+            if self.path.endswith(('.yaml', '.yml')):
+                try:
+                    import yaml
+                except ImportError as e:
+                    raise RuntimeError("Для справочника в YAML нужен пакет PyYAML (pip install pyyaml).") from e
+                data = yaml.safe_load(f)
+            else:
+                data = json.load(f)
+        if isinstance(data, dict):
+            return parse_artist_rows(data.items())
+        if isinstance(data, list):
+            return parse_artist_rows(data)
+        raise ValueError(f"Справочник {self.path}: ожидается объект или список, получено {type(data).__name__}")
+
+
+class ArtistSourceUnavailable(Exception):
+    """Источник пока недоступен (например, таблица еще не подключена) — это не ошибка данных."""
+
+
+class WorksheetArtistSource:
+    """
+    Справочник из листа таблицы ("Артисты"): столбцы user_id и имя, первая строка — заголовок.
+    get_manager возвращает подключенный GoogleSheetsManager или None, пока подключения нет.
+    Изменения листа узнать без чтения нельзя, поэтому он читается на каждом обновлении.
+    """
+
+    def __init__(self, get_manager: Callable, worksheet_name: str):
+        self.get_manager = get_manager
+        self.worksheet_name = worksheet_name
+        self.name = f"sheet:{worksheet_name}"
+
+    def signature(self):
+        return None
+
+    def load(self) -> Dict[int, str]:
+        manager = self.get_manager()
+        if manager is None:
+            raise ArtistSourceUnavailable("Google Sheets еще не подключены.")
+        return parse_artist_rows(manager.read_worksheet(self.worksheet_name))
+
+
+@dataclass(frozen=True)
+class ArtistSnapshot:
+    """Неизменяемый снимок справочника: индексы по user_id и по имени."""
+    by_id: Dict[int, str]
+    by_name: Dict[str, Tuple[int, ...]] = field(default_factory=dict)
+    version: int = 0
+    source: str = 'builtin'
+    loaded_at: float = 0.0
+
+    @classmethod
+    def build(cls, mapping: Dict[int, str], version: int, source: str) -> 'ArtistSnapshot':
+        by_name: Dict[str, List[int]] = {}
+        for user_id, name in mapping.items():
+            by_name.setdefault(name.casefold(), []).append(user_id)
+        return cls(dict(mapping), {name: tuple(ids) for name, ids in by_name.items()}, version, source, time.time())
+
+
+class ArtistDirectory:
+    """
+    Справочник артистов с обновлением на лету.
+
+    Читатели (обработчики сообщений, табло, отчеты, синхронизация листа) берут
+    текущий снимок одной ссылкой и не ждут блокировок. Фоновый поток каждые
+    refresh_interval секунд проверяет источник и, если данные изменились,
+    подменяет снимок целиком — переименование сразу видно везде. При ошибке
+    загрузки остается предыдущий снимок.
+    """
+
+    def __init__(self, source=None, refresh_interval: float = 30.0, fallback: Optional[Dict[int, str]] = None):
+        self.source = source
+        self.refresh_interval = refresh_interval
+        self._snapshot = ArtistSnapshot.build(ARTIST_MAPPING if fallback is None else fallback, 0, 'builtin')
+        self._signature = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._reloads = 0
+        self._failed_reloads = 0
+        self._last_error: Optional[str] = None
+
+    # --- Чтение (без блокировок) ---
+    def snapshot(self) -> ArtistSnapshot:
+        return self._snapshot
+
+    def mapping(self) -> Dict[int, str]:
+        return self._snapshot.by_id
+
+    def resolve(self, user_id: int, username: Optional[str] = None) -> str:
+        return resolve_artist_name(self._snapshot.by_id, user_id, username)
+
+    def user_ids_for_name(self, name: str) -> List[int]:
+        return list(self._snapshot.by_name.get(name.strip().casefold(), ()))
+
+    # --- Обновление ---
+    def reload(self, force: bool = False) -> bool:
+        """Перечитывает источник. True — снимок заменен; False — без изменений, ошибка или нет источника."""
+        if self.source is None:
+            return False
+        with self._reload_lock:
+            try:
+                signature = self.source.signature()
+                if not force and signature is not None and signature == self._signature:
+                    return False
+                mapping = self.source.load()
+            except ArtistSourceUnavailable as e:
+                logger.debug(f"Справочник артистов ({self.source.name}) пока недоступен: {e}")
+                return False
+            except Exception as e:
+                self._failed_reloads += 1
+                if str(e) != self._last_error:  # Одна и та же ошибка не засоряет лог каждые refresh_interval
+                    logger.error(f"Справочник артистов ({self.source.name}) не обновлен: {e}")
+                self._last_error = str(e)
+                return False
+            self._signature = signature
+            self._last_error = None
+            current = self._snapshot
+            if mapping == current.by_id and current.source == self.source.name:
+                return False
+            self._snapshot = ArtistSnapshot.build(mapping, current.version + 1, self.source.name)
+            self._reloads += 1
+        logger.info(f"Справочник артистов обновлен из {self.source.name}: {len(mapping)} записей (версия {current.version + 1}).")
+        return True
+
+    def start(self):
+        """Первая загрузка и фоновый поток обновления (повторный вызов ничего не делает)."""
+        if self.source is None or (self._thread and self._thread.is_alive()):
+            return
+        self.reload()
+        if self.refresh_interval > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="artists-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict:
+        snapshot = self._snapshot
+        return {
+            'source': snapshot.source,
+            'artists': len(snapshot.by_id),
+            'version': snapshot.version,
+            'loaded_at': snapshot.loaded_at,
+            'reloads': self._reloads,
+            'failed_reloads': self._failed_reloads,
+            'last_error': self._last_error,
+        }
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            self.reload()
+
+
+def create_artist_directory(source_spec: Optional[str], refresh_interval: float = 30.0,
+                            get_sheets_manager: Optional[Callable] = None,
+                            worksheet_name: str = "Артисты") -> ArtistDirectory:
+    """
+    Справочник по настройке ARTISTS_SOURCE: путь к .json/.yaml/.yml, 'sheet' — лист
+    worksheet_name в таблице бота, пусто — только встроенная ARTIST_MAPPING.
+    """
+    source = None
+    if source_spec == 'sheet':
+        if get_sheets_manager is None:
+            logger.warning("ARTISTS_SOURCE=sheet, но Google Sheets недоступны: используется встроенная карта артистов.")
+        else:
+            source = WorksheetArtistSource(get_sheets_manager, worksheet_name)
+    elif source_spec:
+        source = FileArtistSource(source_spec)
+    return ArtistDirectory(source, refresh_interval)
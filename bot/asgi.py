@@ -0,0 +1,249 @@
+# Файл: bot/asgi.py
+
+import asyncio
+import json
+import logging
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from bot.metrics import observe_stage
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_SIZE = 1024 * 1024  # Обновления Telegram намного меньше
+
+
+class Request:
+    """Минимальный HTTP-запрос поверх ASGI scope."""
+
+    def __init__(self, scope: Dict, body: bytes):
+        self.scope = scope
+        self.method = scope.get('method', 'GET')
+        self.path = scope.get('path', '/')
+        self.body = body
+        self.headers = {k.decode('latin-1').lower(): v.decode('latin-1') for k, v in scope.get('headers', [])}
+        raw_query = scope.get('query_string', b'').decode('latin-1')
+        self.query = {k: v[0] for k, v in parse_qs(raw_query).items()}
+        client = scope.get('client')
+        self.remote_addr = client[0] if client else None
+
+    def json(self):
+        """Разбирает тело как JSON (json.JSONDecodeError/UnicodeDecodeError пробрасываются)."""
+        return json.loads(self.body.decode('utf-8'))
+
+
+class Response:
+    def __init__(self, body='', status: int = 200, content_type: str = 'text/plain; charset=utf-8',
+                 headers: Optional[Dict[str, str]] = None):
+        self.body = body.encode('utf-8') if isinstance(body, str) else body
+        self.status = status
+        self.headers = {'content-type': content_type}
+        if headers:
+            self.headers.update(headers)
+
+    async def send(self, send):
+        headers = [(k.encode('latin-1'), v.encode('latin-1')) for k, v in self.headers.items()]
+        headers.append((b'content-length', str(len(self.body)).encode('latin-1')))
+        await send({'type': 'http.response.start', 'status': self.status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': self.body})
+
+
+class StreamingResponse(Response):
+    """
+    Ответ, тело которого отдается частями по мере готовности (chunked, без content-length).
+    Итератор закрывается в любом случае — и когда клиент оборвал соединение.
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes], status: int = 200, content_type: str = 'text/plain; charset=utf-8',
+                 headers: Optional[Dict[str, str]] = None):
+        super().__init__(b'', status=status, content_type=content_type, headers=headers)
+        self.chunks = chunks
+
+    async def send(self, send):
+        headers = [(k.encode('latin-1'), v.encode('latin-1')) for k, v in self.headers.items()]
+        try:
+            await send({'type': 'http.response.start', 'status': self.status, 'headers': headers})
+            async for chunk in self.chunks:
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            aclose = getattr(self.chunks, 'aclose', None)
+            if aclose is not None:
+                await aclose()
+
+
+def json_response(data, status: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(json.dumps(data, ensure_ascii=False, default=str), status=status,
+                    content_type='application/json; charset=utf-8', headers=headers)
+
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+class ASGIApp:
+    """
+    Голое ASGI-приложение: таблица маршрутов и хуки lifespan.
+    Работает напрямую под uvicorn, без WSGI-моста.
+    """
+
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], Handler] = {}
+        self.on_startup: List[Callable[[], Awaitable[None]]] = []
+        self.on_shutdown: List[Callable[[], Awaitable[None]]] = []
+
+    def route(self, path: str, methods=('GET',)):
+        def decorator(handler: Handler) -> Handler:
+            for method in methods:
+                self.routes[(method.upper(), path)] = handler
+            return handler
+        return decorator
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    for hook in self.on_startup:
+                        await hook()
+                except Exception as e:
+                    logger.critical(f"Ошибка запуска приложения: {e}", exc_info=True)
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for hook in self.on_shutdown:
+                    try:
+                        await hook()
+                    except Exception as e:
+                        logger.error(f"Ошибка при остановке приложения: {e}", exc_info=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        method = scope.get('method', 'GET')
+        path = scope.get('path', '/')
+        handler = self.routes.get((method, path))
+        if handler is None:
+            if any(route_path == path for _, route_path in self.routes):
+                await Response('Method Not Allowed', status=405).send(send)
+            else:
+                await Response('Not Found', status=404).send(send)
+            return
+
+        body = b''
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get('body', b'')
+            more_body = message.get('more_body', False)
+            if len(body) > MAX_BODY_SIZE:
+                await Response('Payload Too Large', status=413).send(send)
+                return
+
+        try:
+            response = await handler(Request(scope, body))
+        except Exception as e:
+            logger.exception(f"Необработанная ошибка в обработчике {method} {path}: {e}")
+            response = Response('Internal Server Error', status=500)
+        await response.send(send)
+
+
+class UpdateWorkerPool:
+    """
+    Ограниченная очередь обновлений и пул корутин-обработчиков.
+    Вебхук только кладет обновление в очередь; обработка идет в фоне.
+    Если передан waiter, он уходит в process вторым аргументом, а после
+    обработки вызывается waiter.finish() — так вебхук может дождаться результата.
+    """
+
+    def __init__(self, process: Callable[..., Awaitable[None]], concurrency: int = 8, max_queue_size: int = 1000):
+        self.process = process
+        self.concurrency = max(1, concurrency)
+        self.max_queue_size = max_queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._accepted = 0
+        self._rejected = 0
+        self._processed = 0
+        self._failed = 0
+
+    def start(self):
+        """Запускает обработчики в текущем event loop (повторный вызов ничего не делает)."""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._workers = [asyncio.create_task(self._worker(i), name=f"update-worker-{i}") for i in range(self.concurrency)]
+        logger.info(f"Пул обработчиков обновлений запущен: {self.concurrency} корутин, очередь до {self.max_queue_size}.")
+
+    def submit(self, update_json: Dict, waiter=None) -> bool:
+        """Кладет обновление в очередь. False — очередь заполнена (нужно вернуть Telegram ошибку)."""
+        self.start()
+        try:
+            self._queue.put_nowait((update_json, waiter, time.perf_counter()))
+        except asyncio.QueueFull:
+            self._rejected += 1
+            return False
+        self._accepted += 1
+        return True
+
+    async def join(self, timeout: Optional[float] = None) -> bool:
+        """Ждет обработки всего, что уже в очереди (обработчики продолжают работать). False — не дождались."""
+        if not self._workers:
+            return True
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def stop(self, timeout: float = 25.0):
+        """Дожидается обработки очереди (не дольше timeout) и останавливает обработчики."""
+        if not self._workers:
+            return
+        logger.info(f"Остановка пула обработчиков, в очереди {self._queue.qsize()} обновлений...")
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Очередь обновлений не обработана за {timeout}s, осталось {self._queue.qsize()}.")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> Dict:
+        return {
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'max_queue_size': self.max_queue_size,
+            'concurrency': self.concurrency,
+            'accepted': self._accepted,
+            'rejected': self._rejected,
+            'processed': self._processed,
+            'failed': self._failed,
+        }
+
+    async def _worker(self, index: int):
+        while True:
+            update_json, waiter, enqueued_at = await self._queue.get()
+            observe_stage('queue_wait', enqueued_at)
+            try:
+                if waiter is None:
+                    await self.process(update_json)
+                else:
+                    await self.process(update_json, waiter)
+                self._processed += 1
+            except Exception as e:
+                self._failed += 1
+                logger.exception(f"[update-worker-{index}] Ошибка обработки обновления: {e}")
+            finally:
+                if waiter is not None:
+                    waiter.finish()
+                observe_stage('update_total', enqueued_at)
+                self._queue.task_done()
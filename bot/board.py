@@ -0,0 +1,120 @@
+# Файл: bot/board.py
+
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Последний статус каждого пользователя: прыжки по индексу (user_id, timestamp),
+# по одному поиску на пользователя вместо полного прохода по таблице
+LATEST_PER_USER_SQL = '''
+WITH RECURSIVE users(user_id) AS (
+    SELECT MIN(user_id) FROM statuses
+    UNION ALL
+    SELECT (SELECT MIN(user_id) FROM statuses WHERE user_id > users.user_id) FROM users WHERE users.user_id IS NOT NULL
+)
+SELECT s.id, s.user_id, s.username, s.status, s.timestamp
+FROM users
+JOIN statuses s ON s.id = (
+    SELECT id FROM statuses WHERE user_id = users.user_id ORDER BY timestamp DESC, id DESC LIMIT 1
+)
+'''
+
+
+def parse_stale_after(value: str) -> Dict[str, float]:
+    """'в пути=120,на месте=300' -> {'в пути': 7200.0, 'на месте': 18000.0} (минуты -> секунды)."""
+    result = {}
+    for part in (value or '').split(','):
+        if '=' not in part:
+            continue
+        status, minutes = part.split('=', 1)
+        result[status.strip()] = float(minutes) * 60
+    return result
+
+
+class StatusBoard:
+    """
+    Текущий статус каждого артиста в памяти: user_id -> последний статус.
+
+    Обновляется из save_status, при старте собирается одним индексным запросом.
+    Чтение не трогает ни SQLite, ни Google Sheets. Если воркеров несколько,
+    sync() в фоне подтягивает чужие вставки по id.
+    """
+
+    def __init__(self, stale_after: Optional[Dict[str, float]] = None):
+        self.stale_after = stale_after or {}
+        self._entries: Dict[int, Dict] = {}
+        self._lock = threading.Lock()
+        self._last_id = 0
+
+    def load(self, conn: sqlite3.Connection):
+        rows = conn.execute(LATEST_PER_USER_SQL).fetchall()
+        max_id = conn.execute('SELECT MAX(id) FROM statuses').fetchone()[0] or 0
+        with self._lock:
+            self._entries = {}
+            for row_id, user_id, username, status, timestamp in rows:
+                self._set(user_id, username, status, datetime.fromisoformat(timestamp))
+            self._last_id = max_id
+        logger.info(f"Табло статусов загружено: {len(rows)} артистов.")
+
+    def sync(self, conn: sqlite3.Connection):
+        """Подтягивает статусы, записанные после последней загрузки (в том числе другими воркерами)."""
+        rows = conn.execute(
+            'SELECT id, user_id, username, status, timestamp FROM statuses WHERE id > ? ORDER BY id', (self._last_id,)
+        ).fetchall()
+        if not rows:
+            return
+        with self._lock:
+            for row_id, user_id, username, status, timestamp in rows:
+                self._set(user_id, username, status, datetime.fromisoformat(timestamp))
+            self._last_id = max(self._last_id, rows[-1][0])
+
+    def update(self, user_id: int, username: Optional[str], status: str, timestamp: datetime):
+        with self._lock:
+            self._set(user_id, username, status, timestamp)
+
+    def get(self, user_id: int) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            return dict(entry) if entry else None
+
+    def snapshot(self, now: datetime, resolve_name: Callable[[int, Optional[str]], str]) -> List[Dict]:
+        """Все артисты с длительностью текущего статуса и отметкой о просрочке."""
+        with self._lock:
+            entries = list(self._entries.values())
+        board = []
+        for entry in sorted(entries, key=lambda e: e['since'], reverse=True):
+            seconds = max(0.0, (now - entry['since']).total_seconds())
+            limit = self.stale_after.get(entry['status'])
+            board.append({
+                'user_id': entry['user_id'],
+                'name': resolve_name(entry['user_id'], entry['username']),
+                'status': entry['status'],
+                'since': entry['since'].isoformat(),
+                'minutes': round(seconds / 60),
+                'stale': limit is not None and seconds > limit,
+            })
+        return board
+
+    def _set(self, user_id: int, username: Optional[str], status: str, timestamp: datetime):
+        current = self._entries.get(user_id)
+        if current and current['since'] > timestamp:
+            return  # Более свежий статус уже на табло
+        self._entries[user_id] = {'user_id': user_id, 'username': username, 'status': status, 'since': timestamp}
+
+
+def format_board_text(board: List[Dict]) -> str:
+    """Текст табло для Telegram."""
+    if not board:
+        return "🗂 Табло пусто: статусов еще не было."
+    lines = ["🗂 Кто где сейчас:"]
+    for item in board:
+        hours, mins = divmod(item['minutes'], 60)
+        duration = f"{hours} ч {mins} мин" if hours else f"{mins} мин"
+        since = datetime.fromisoformat(item['since']).strftime('%d.%m %H:%M')
+        mark = "⚠️ " if item['stale'] else ""
+        lines.append(f"{mark}{item['name']} — {item['status']} с {since} ({duration})")
+    return '\n'.join(lines)
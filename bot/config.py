@@ -18,3 +18,100 @@ class Config:
     )
     GOOGLE_SHEETS_SPREADSHEET_NAME = "АнимельБот"  # Или твое реальное имя таблицы
     GOOGLE_SHEETS_WORKSHEET_NAME = "Статусы"  
+
+    # Фоновая пакетная запись в Google Sheets из outbox в SQLite
+    SHEETS_BATCH_SIZE = int(os.getenv('SHEETS_BATCH_SIZE', '50'))  # Строк в одном append_rows
+    SHEETS_FLUSH_INTERVAL = float(os.getenv('SHEETS_FLUSH_INTERVAL', '5'))  # Секунд до принудительной отправки
+    SHEETS_SYNC_POLL_INTERVAL = float(os.getenv('SHEETS_SYNC_POLL_INTERVAL', '30'))  # Опрос outbox: повторы и строки других воркеров
+    SHEETS_RETRY_MIN = float(os.getenv('SHEETS_RETRY_MIN', '5'))  # Секунд до повтора после первой ошибки, далее x2
+    SHEETS_RETRY_MAX = float(os.getenv('SHEETS_RETRY_MAX', '600'))
+    SHEETS_CLAIM_LEASE = float(os.getenv('SHEETS_CLAIM_LEASE', '300'))  # Секунд; захват упавшего воркера снимается
+    SHEETS_HTTP_TIMEOUT = float(os.getenv('SHEETS_HTTP_TIMEOUT', '60'))  # Секунд на запрос к API; меньше SHEETS_CLAIM_LEASE
+    SHEETS_BACKFILL_BATCH_SIZE = int(os.getenv('SHEETS_BACKFILL_BATCH_SIZE', '1000'))  # Строк в одном запросе догрузки
+    # Лист на каждый месяц ("Статусы 2024-05"): строка идет в лист месяца события.
+    # По умолчанию выключено — все пишется в GOOGLE_SHEETS_WORKSHEET_NAME, как раньше
+    SHEETS_MONTHLY_WORKSHEETS = os.getenv('SHEETS_MONTHLY_WORKSHEETS', '').lower() in ('1', 'true', 'yes')
+
+    # SQLite: одно соединение в режиме WAL, пакетные транзакции
+    DATABASE_PATH = os.getenv('DATABASE_PATH', 'animator_statuses.db')
+    SQLITE_BATCH_SIZE = int(os.getenv('SQLITE_BATCH_SIZE', '200'))  # Максимум вставок в одной транзакции
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+    # Хранение: статусы старше SQLITE_RETENTION_DAYS переносятся в архивную базу.
+    # По умолчанию 0 — не переносить: вся история остается в DATABASE_PATH.
+    # Архив подключается, только когда перенос включен или файл архива уже существует
+    SQLITE_ARCHIVE_PATH = os.getenv('SQLITE_ARCHIVE_PATH', f"{DATABASE_PATH}.archive")
+    SQLITE_RETENTION_DAYS = int(os.getenv('SQLITE_RETENTION_DAYS', '0'))
+    SQLITE_RETENTION_INTERVAL = float(os.getenv('SQLITE_RETENTION_INTERVAL', '21600'))  # Секунд между проверками
+
+    # Выгрузка истории (/export и python -m bot.export). Токен нужен и для /report, /board;
+    # без него эти HTTP-маршруты выключены
+    EXPORT_TOKEN = os.getenv('EXPORT_TOKEN')
+    EXPORT_CHUNK_ROWS = int(os.getenv('EXPORT_CHUNK_ROWS', '500'))  # Строк в одном куске ответа
+
+    # Справочник артистов: путь к .json/.yaml, 'sheet' (лист ARTISTS_WORKSHEET_NAME) или пусто — карта из bot/artists.py
+    ARTISTS_SOURCE = os.getenv('ARTISTS_SOURCE', '')
+    ARTISTS_WORKSHEET_NAME = os.getenv('ARTISTS_WORKSHEET_NAME', 'Артисты')
+    ARTISTS_REFRESH_INTERVAL = float(os.getenv('ARTISTS_REFRESH_INTERVAL', '30'))  # Секунд между проверками источника
+
+    # Serverless (handler.py): сколько ждать дописывания SQLite/Sheets перед ответом, секунд
+    SERVERLESS_FLUSH_TIMEOUT = float(os.getenv('SERVERLESS_FLUSH_TIMEOUT', '10'))
+
+    # Вебхук: очередь обновлений и пул обработчиков
+    WEBHOOK_QUEUE_SIZE = int(os.getenv('WEBHOOK_QUEUE_SIZE', '1000'))  # При переполнении вебхук отвечает 503
+    WEBHOOK_CONCURRENCY = int(os.getenv('WEBHOOK_CONCURRENCY', '8'))  # Число корутин-обработчиков
+    # Подтверждение статуса вызовом sendMessage прямо в теле ответа на вебхук (без исходящего запроса)
+    WEBHOOK_INLINE_REPLY = os.getenv('WEBHOOK_INLINE_REPLY', '').lower() in ('1', 'true', 'yes')
+    WEBHOOK_INLINE_TIMEOUT = float(os.getenv('WEBHOOK_INLINE_TIMEOUT', '3'))  # Секунд ожидания обработки; дальше — обычный ответ
+
+    # Несколько воркеров uvicorn: общий файл блокировки для отправок в Google Sheets
+    SHEETS_LOCK_PATH = os.getenv('SHEETS_LOCK_PATH', f"{DATABASE_PATH}.sheets.lock")
+
+    # Адрес Bot API (по умолчанию https://api.telegram.org/bot)
+    TELEGRAM_API_BASE_URL = os.getenv('TELEGRAM_API_BASE_URL')
+
+    # HTTP-клиент Bot API: пул соединений, keep-alive и таймауты (секунды)
+    TELEGRAM_POOL_SIZE = int(os.getenv('TELEGRAM_POOL_SIZE', '32'))
+    TELEGRAM_KEEPALIVE_CONNECTIONS = int(os.getenv('TELEGRAM_KEEPALIVE_CONNECTIONS', str(TELEGRAM_POOL_SIZE)))
+    TELEGRAM_KEEPALIVE_EXPIRY = float(os.getenv('TELEGRAM_KEEPALIVE_EXPIRY', '30'))
+    TELEGRAM_CONNECT_TIMEOUT = float(os.getenv('TELEGRAM_CONNECT_TIMEOUT', '5'))
+    TELEGRAM_READ_TIMEOUT = float(os.getenv('TELEGRAM_READ_TIMEOUT', '10'))
+    TELEGRAM_WRITE_TIMEOUT = float(os.getenv('TELEGRAM_WRITE_TIMEOUT', '10'))
+    TELEGRAM_POOL_TIMEOUT = float(os.getenv('TELEGRAM_POOL_TIMEOUT', '5'))  # Ожидание свободного соединения
+
+    # Подтверждения: ограничение частоты на чат и объединение в одно сообщение
+    OUTBOUND_RATE_PER_MINUTE = float(os.getenv('OUTBOUND_RATE_PER_MINUTE', '20'))  # 0 — без ограничения, ответ сразу
+    OUTBOUND_CHAT_BURST = float(os.getenv('OUTBOUND_CHAT_BURST', '3'))  # Сообщений подряд без ожидания
+    OUTBOUND_COALESCE_DELAY = float(os.getenv('OUTBOUND_COALESCE_DELAY', '0.3'))  # Секунд на сбор одновременных подтверждений
+    OUTBOUND_MAX_RETRIES = int(os.getenv('OUTBOUND_MAX_RETRIES', '3'))  # Повторов после сетевой ошибки или таймаута
+    OUTBOUND_RETRY_DELAY = float(os.getenv('OUTBOUND_RETRY_DELAY', '1'))  # Секунд до первого повтора, далее x2
+
+    # Отсев повторных доставок по update_id
+    DEDUP_CACHE_SIZE = int(os.getenv('DEDUP_CACHE_SIZE', '10000'))
+    DEDUP_TTL = float(os.getenv('DEDUP_TTL', '86400'))  # Секунд; Telegram хранит обновления сутки
+
+    # Статусы, их синонимы и отрицания (см. bot/statuses.json)
+    STATUSES_CONFIG_PATH = os.getenv(
+        'STATUSES_CONFIG_PATH',
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'statuses.json')
+    )
+
+    # Табло текущих статусов (/board)
+    BOARD_STALE_AFTER = os.getenv('BOARD_STALE_AFTER', 'в пути=120')  # Статус=минуты, через запятую
+    BOARD_SYNC_INTERVAL = float(os.getenv('BOARD_SYNC_INTERVAL', '5'))  # Секунд; подкачка вставок других воркеров
+
+    # Фоновое подключение к Google Sheets
+    SHEETS_CONNECT_RETRY_MIN = float(os.getenv('SHEETS_CONNECT_RETRY_MIN', '5'))  # Секунд до первой повторной попытки
+    SHEETS_CONNECT_RETRY_MAX = float(os.getenv('SHEETS_CONNECT_RETRY_MAX', '300'))
+    READY_REQUIRES_SHEETS = os.getenv('READY_REQUIRES_SHEETS', '').lower() in ('1', 'true', 'yes')
+
+    # Хранилища статусов: таймауты и необязательный JSONL-журнал
+    SINK_TIMEOUT_SQLITE = float(os.getenv('SINK_TIMEOUT_SQLITE', '5'))
+    SINK_TIMEOUT_SHEETS = float(os.getenv('SINK_TIMEOUT_SHEETS', '2'))
+    SINK_TIMEOUT_JSONL = float(os.getenv('SINK_TIMEOUT_JSONL', '2'))
+    JSONL_SINK_PATH = os.getenv('JSONL_SINK_PATH')  # Пусто — журнал отключен
+
+    # Логи: JSON (или text) через фоновый поток, частые записи — с ограничением частоты
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+    LOG_SAMPLE_LIMIT = int(os.getenv('LOG_SAMPLE_LIMIT', '20'))  # Записей одного вида за интервал; 0 — без ограничения
+    LOG_SAMPLE_INTERVAL = float(os.getenv('LOG_SAMPLE_INTERVAL', '10'))  # Секунд
@@ -0,0 +1,89 @@
+# Файл: bot/dedup.py
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateDeduplicator:
+    """
+    Отсев повторно доставленных обновлений Telegram по update_id.
+
+    Горячий путь — LRU-кэш в памяти с TTL. Промах кэша проверяется и
+    помечается в таблице processed_updates (INSERT OR IGNORE), поэтому
+    отсев переживает перезапуск и работает между воркерами.
+    """
+
+    def __init__(self, storage, max_size: int = 10000, ttl: float = 86400.0):
+        self.storage = storage
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self._cache: "OrderedDict[int, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn = None
+        self._inserts_since_prune = 0
+
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def setup(self):
+        self._conn = self.storage.connect()
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS processed_updates (update_id INTEGER PRIMARY KEY, seen_at REAL NOT NULL)''')
+        self._conn.commit()
+
+    async def is_duplicate(self, update_id: int) -> bool:
+        """True, если обновление уже встречалось. Первое появление запоминается."""
+        now = time.time()
+        with self._lock:
+            seen_at = self._cache.get(update_id)
+            if seen_at is not None and now - seen_at < self.ttl:
+                self._cache.move_to_end(update_id)
+                self.memory_hits += 1
+                return True
+        try:
+            is_new = await asyncio.to_thread(self._mark_in_db, update_id, now)
+        except sqlite3.Error as e:
+            # Лучше обработать возможный дубль, чем потерять статус
+            logger.error(f"Ошибка проверки update_id={update_id} в SQLite: {e}")
+            is_new = True
+        with self._lock:
+            self._cache[update_id] = now
+            self._cache.move_to_end(update_id)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+            if is_new:
+                self.misses += 1
+            else:
+                self.db_hits += 1
+        return not is_new
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'cache_size': len(self._cache),
+                'memory_hits': self.memory_hits,
+                'db_hits': self.db_hits,
+                'misses': self.misses,
+            }
+
+    def _mark_in_db(self, update_id: int, now: float) -> bool:
+        if self._conn is None:
+            return True
+        with self._db_lock:
+            with self._conn:
+                cursor = self._conn.execute('INSERT OR IGNORE INTO processed_updates (update_id, seen_at) VALUES (?, ?)', (update_id, now))
+                is_new = cursor.rowcount == 1
+                self._inserts_since_prune += 1
+                if self._inserts_since_prune >= 1000:
+                    # Telegram не доставляет обновления старше суток, хранить их дольше незачем
+                    self._conn.execute('DELETE FROM processed_updates WHERE seen_at < ?', (now - self.ttl,))
+                    self._inserts_since_prune = 0
+        return is_new
@@ -0,0 +1,193 @@
+# Файл: bot/export.py
+"""
+Выгрузка истории статусов в CSV или NDJSON.
+
+Строки читаются курсором SQLite по statuses_all (вместе с архивом, см.
+bot.retention) и отдаются генератором пачками по EXPORT_CHUNK_ROWS: память
+не зависит от периода, а заголовок CSV уходит клиенту сразу. Имена берутся
+из карты артистов, время — по Москве.
+
+HTTP: GET /export?format=csv|ndjson&from=...&to=...&artist=... с заголовком
+Authorization: Bearer <EXPORT_TOKEN>.
+Запуск: python -m bot.export [--format csv] [--from ДД.ММ.ГГГГ] [--to ДД.ММ.ГГГГ] [--artist Имя|user_id] [--output файл]
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import logging
+import sqlite3
+import sys
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+MOSCOW_TZ = ZoneInfo("Europe/Moscow")
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+FIELDS = ['id', 'date', 'time', 'timestamp', 'user_id', 'username', 'artist', 'status']
+
+
+def artist_user_ids(directory, artist: str) -> List[int]:
+    """user_id артиста: число как есть, иначе все id с таким именем в справочнике (без учета регистра)."""
+    artist = artist.strip()
+    if artist.lstrip('-').isdigit():
+        return [int(artist)]
+    return directory.user_ids_for_name(artist)
+
+
+def iter_statuses(conn: sqlite3.Connection, date_from: Optional[date] = None, date_to: Optional[date] = None,
+                  user_ids: Optional[List[int]] = None, username: Optional[str] = None,
+                  chunk_rows: int = 500) -> Iterator[List[tuple]]:
+    """
+    Статусы за период по времени события, пачками из курсора (fetchmany):
+    SQLite отдает строки по мере обхода индекса, весь результат в памяти не собирается.
+    user_ids/username — фильтр по артисту (достаточно совпадения с любым).
+    """
+    conditions, params = [], []
+    if date_from:
+        conditions.append('timestamp >= ?')
+        params.append(date_from.isoformat())
+    if date_to:
+        conditions.append('timestamp < ?')
+        params.append((date_to + timedelta(days=1)).isoformat())
+    if user_ids is not None or username:
+        artist_conditions = []
+        if user_ids:
+            artist_conditions.append(f"user_id IN ({','.join('?' * len(user_ids))})")
+            params.extend(user_ids)
+        if username:
+            artist_conditions.append('username = ?')
+            params.append(username.lstrip('@'))
+        conditions.append(f"({' OR '.join(artist_conditions) or '0'})")
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    cursor = conn.execute(
+        f'SELECT id, user_id, username, status, timestamp FROM statuses_all {where} ORDER BY timestamp, id', params
+    )
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                return
+            yield rows
+    finally:
+        cursor.close()
+
+
+def to_record(row: tuple, resolve_name: Callable[[int, Optional[str]], str]) -> Dict:
+    status_id, user_id, username, status, timestamp = row
+    moment = datetime.fromisoformat(timestamp)
+    # Старые записи без смещения уже в московском времени
+    moment = moment.replace(tzinfo=MOSCOW_TZ) if moment.tzinfo is None else moment.astimezone(MOSCOW_TZ)
+    return {
+        'id': status_id,
+        'date': moment.strftime('%d.%m.%Y'),
+        'time': moment.strftime('%H:%M:%S'),
+        'timestamp': moment.isoformat(timespec='seconds'),
+        'user_id': user_id,
+        'username': username,
+        'artist': resolve_name(user_id, username),
+        'status': status,
+    }
+
+
+def export_chunks(conn: sqlite3.Connection, fmt: str, resolve_name: Callable, **filters) -> Iterator[bytes]:
+    """Выгрузка в формате fmt (csv/ndjson) кусками байтов: первый кусок (заголовок CSV) — сразу."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат '{fmt}', допустимы: {', '.join(FORMATS)}")
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS) if fmt == 'csv' else None
+    if writer is not None:
+        writer.writeheader()
+        yield buffer.getvalue().encode('utf-8')
+    for rows in iter_statuses(conn, **filters):
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            record = to_record(row, resolve_name)
+            if writer is not None:
+                writer.writerow(record)
+            else:
+                buffer.write(json.dumps(record, ensure_ascii=False))
+                buffer.write('\n')
+        yield buffer.getvalue().encode('utf-8')
+
+
+async def stream_export(connect: Callable[[], sqlite3.Connection], fmt: str, resolve_name: Callable,
+                        **filters) -> AsyncIterator[bytes]:
+    """
+    Асинхронная обертка для HTTP: каждый кусок читается в потоке (SQLite блокирует),
+    следующий — только когда предыдущий отдан клиенту. Соединение закрывается
+    и при обрыве выгрузки.
+    """
+    conn = await asyncio.to_thread(connect)
+    chunks = export_chunks(conn, fmt, resolve_name, **filters)
+    try:
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        await asyncio.to_thread(_close, chunks, conn)
+
+
+def _close(chunks: Iterator[bytes], conn: sqlite3.Connection):
+    chunks.close()
+    conn.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from bot.artists import create_artist_directory
+    from bot.config import Config
+    from bot.reports import parse_report_date
+    from bot.retention import active_archive_path
+    from bot.storage import StatusStorage
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+    parser.add_argument('--from', dest='date_from', help='с даты (ДД.ММ.ГГГГ или ГГГГ-ММ-ДД)')
+    parser.add_argument('--to', dest='date_to', help='по дату включительно')
+    parser.add_argument('--artist', help='имя из карты артистов, user_id или @username')
+    parser.add_argument('--output', help='файл (по умолчанию stdout)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    today = datetime.now(MOSCOW_TZ).date()
+    try:
+        filters = {
+            'date_from': parse_report_date(args.date_from, today) if args.date_from else None,
+            'date_to': parse_report_date(args.date_to, today) if args.date_to else None,
+            'chunk_rows': Config.EXPORT_CHUNK_ROWS,
+        }
+    except ValueError as e:
+        logger.error(str(e))
+        return 2
+    directory = create_artist_directory(Config.ARTISTS_SOURCE)  # Лист "Артисты" без бота недоступен: тогда встроенная карта
+    directory.reload()
+    if args.artist:
+        filters['user_ids'] = artist_user_ids(directory, args.artist)
+        filters['username'] = args.artist
+
+    conn = StatusStorage(Config.DATABASE_PATH, busy_timeout_ms=Config.SQLITE_BUSY_TIMEOUT_MS,
+                         archive_path=active_archive_path(Config.SQLITE_ARCHIVE_PATH, Config.SQLITE_RETENTION_DAYS)).connect()
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for chunk in export_chunks(conn, args.format, directory.resolve, **filters):
+            out.write(chunk)
+        out.flush()
+    finally:
+        if args.output:
+            out.close()
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
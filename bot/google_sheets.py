@@ -1,23 +1,66 @@
 # Файл: bot/google_sheets.py
 
 import os
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
 from datetime import datetime
 import logging
 import asyncio
 import functools
+from contextlib import nullcontext
 
 logger = logging.getLogger(__name__)
 
+HEADERS = ['Дата', 'Имя артиста', 'Статус', 'Время']
+
+
+def monthly_worksheet_name(base_name: str, timestamp: datetime) -> str:
+    """Имя листа месяца: "Статусы 2024-05"."""
+    return f"{base_name} {timestamp:%Y-%m}"
+
+
+def load_credentials_from_env():
+    """
+    Учетные данные сервисного аккаунта из GOOGLE_SHEETS_CREDENTIALS_JSON (JSON целиком).
+    ValueError, если переменная пуста или не является JSON.
+    """
+    import json
+    raw = os.environ.get('GOOGLE_SHEETS_CREDENTIALS_JSON', '{}')
+    if not raw or raw == '{}':
+        raise ValueError("Переменная окружения GOOGLE_SHEETS_CREDENTIALS_JSON не установлена или пуста!")
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"GOOGLE_SHEETS_CREDENTIALS_JSON не является JSON: {e}") from e
+
+
 class GoogleSheetsManager:
-    def __init__(self, credentials_path=None):
-        """Инициализация менеджера Google Sheets"""
+    def __init__(self, credentials_path=None, credentials_dict=None, timeout=None):
+        """
+        Инициализация менеджера Google Sheets.
+        credentials_dict — учетные данные сервисного аккаунта прямо из памяти, без файла на диске.
+        timeout — секунд на каждый запрос к API (None — без ограничения).
+        """
         self.client = None
         self.spreadsheet = None
         self.worksheet = None
+        self.partition_base = None  # Имя для листов по месяцам; None — все пишется в self.worksheet
+        self._worksheets = {}  # Кэш листов по имени: без запроса к API на каждую запись
 
         try:
+            # gspread и oauth2client тяжелые: импортируем только при реальном подключении
+            import gspread
+            from oauth2client.service_account import ServiceAccountCredentials
+
+            scope = ['https://spreadsheets.google.com/feeds','https://www.googleapis.com/auth/drive']
+
+            if credentials_dict:
+                logger.info("Используются учетные данные Google из памяти.")
+                creds = ServiceAccountCredentials.from_json_keyfile_dict(credentials_dict, scope)
+                self.client = gspread.authorize(creds)
+                if timeout:
+                    self.client.set_timeout(timeout)
+                logger.info("Клиент gspread успешно инициализирован.")
+                return
+
             if not credentials_path:
                 try:
                     from bot.config import Config
@@ -30,8 +73,6 @@ class GoogleSheetsManager:
                     logger.error("В Config не найден атрибут GOOGLE_SHEETS_CREDENTIALS_JSON")
                     raise ValueError("Атрибут GOOGLE_SHEETS_CREDENTIALS_JSON не найден в Config")
 
-            scope = ['https://spreadsheets.google.com/feeds','https://www.googleapis.com/auth/drive']
-
             if not os.path.exists(credentials_path):
                 logger.error(f"Файл credentials не найден по указанному пути: {credentials_path}")
                 return
@@ -39,6 +80,8 @@ class GoogleSheetsManager:
             logger.info(f"Используется файл credentials: {credentials_path}")
             creds = ServiceAccountCredentials.from_json_keyfile_name(credentials_path, scope)
             self.client = gspread.authorize(creds)
+            if timeout:
+                self.client.set_timeout(timeout)
             logger.info("Клиент gspread успешно инициализирован.")
 
         except FileNotFoundError as fnf_err:
@@ -52,6 +95,7 @@ class GoogleSheetsManager:
         if not self.client:
              logger.error("Невозможно открыть таблицу: клиент gspread не инициализирован.")
              return None
+        import gspread
         try:
             spreadsheet = self.client.open(spreadsheet_name)
             logger.info(f"Таблица '{spreadsheet_name}' успешно открыта.")
@@ -64,40 +108,133 @@ class GoogleSheetsManager:
              logger.error(f"Ошибка при открытии таблицы '{spreadsheet_name}': {e}", exc_info=True)
              return None
 
-    def create_or_get_worksheet(self, spreadsheet, worksheet_name):
-        """Создание или получение листа в таблице и сохранение его в self.worksheet"""
+    def create_or_get_worksheet(self, spreadsheet, worksheet_name, process_lock=None):
+        """
+        Создание или получение листа в таблице и сохранение его в self.worksheet.
+        process_lock не дает нескольким воркерам одновременно создать один и тот же лист.
+        """
         if not spreadsheet:
              logger.error("Невозможно получить/создать лист: объект таблицы не предоставлен.")
              return None
 
+        with process_lock or nullcontext():
+            return self._create_or_get_worksheet(spreadsheet, worksheet_name)
+
+    def _create_or_get_worksheet(self, spreadsheet, worksheet_name):
+        self.worksheet = self._find_or_add_worksheet(spreadsheet, worksheet_name)
+        return self.worksheet
+
+    def _find_or_add_worksheet(self, spreadsheet, worksheet_name):
+        """Лист по имени из кэша, таблицы или новый с заголовками. None при ошибке."""
+        worksheet = self._worksheets.get(worksheet_name)
+        if worksheet is not None:
+            return worksheet
+        import gspread
         try:
             worksheet = spreadsheet.worksheet(worksheet_name)
             logger.info(f"Рабочий лист '{worksheet_name}' найден.")
-            self.worksheet = worksheet
 
         except gspread.WorksheetNotFound:
             logger.info(f"Рабочий лист '{worksheet_name}' не найден, попытка создания...")
             try:
                 worksheet = spreadsheet.add_worksheet(title=worksheet_name, rows=1000, cols=10)
                 logger.info(f"Рабочий лист '{worksheet_name}' успешно создан.")
-                self.worksheet = worksheet
 
                 # Устанавливаем правильные заголовки
-                headers = ['Дата', 'Имя артиста', 'Статус', 'Время']
-                self.worksheet.append_row(headers, value_input_option='USER_ENTERED')
-                logger.info(f"Заголовки {headers} добавлены в лист '{worksheet_name}'.")
+                worksheet.append_row(HEADERS, value_input_option='USER_ENTERED')
+                logger.info(f"Заголовки {HEADERS} добавлены в лист '{worksheet_name}'.")
 
             except Exception as e_add:
                 logger.error(f"Ошибка создания нового листа '{worksheet_name}': {e_add}", exc_info=True)
-                self.worksheet = None
+                return None
 
         except Exception as e_get:
             logger.error(f"Ошибка получения листа '{worksheet_name}': {e_get}", exc_info=True)
-            self.worksheet = None
+            return None
 
-        return self.worksheet
+        self._worksheets[worksheet_name] = worksheet
+        return worksheet
 
-    async def add_status_entry(self, real_artist_name, status, timestamp_str):
+    def use_monthly_worksheets(self, base_name):
+        """
+        Включает лист на каждый месяц ("Статусы 2024-05"): строка идет в лист
+        месяца своего события. Чем короче лист, тем дешевле Google найти его
+        конец при append, поэтому запись не замедляется с ростом истории.
+        """
+        self.partition_base = base_name
+
+    def worksheet_name_for(self, timestamp: datetime):
+        """Имя листа для события или None, если листы по месяцам выключены."""
+        if not self.partition_base:
+            return None
+        return monthly_worksheet_name(self.partition_base, timestamp)
+
+    def _worksheet_by_name(self, worksheet_name):
+        """
+        Лист для записи или чтения. Новый лист месяца создается при первом обращении;
+        вызывающий код держит межпроцессную блокировку Sheets (как при append_rows).
+        """
+        if worksheet_name is None:
+            if not self.worksheet:
+                raise RuntimeError("Рабочий лист (self.worksheet) не инициализирован.")
+            return self.worksheet
+        if not self.spreadsheet:
+            raise RuntimeError("Таблица не открыта: лист месяца создать негде.")
+        worksheet = self._find_or_add_worksheet(self.spreadsheet, worksheet_name)
+        if worksheet is None:
+            raise RuntimeError(f"Не удалось получить или создать лист '{worksheet_name}'.")
+        return worksheet
+
+    @staticmethod
+    def format_status_row(real_artist_name, status, timestamp: datetime):
+        """Формирует строку таблицы: Дата, Имя артиста, Статус, Время."""
+        date_str = timestamp.strftime('%d.%m.%Y') # Формат даты
+        time_str = timestamp.strftime('%H:%M:%S') # Формат времени
+
+        # Формируем строку данных для таблицы в нужном порядке
+        return [
+            date_str,           # Дата
+            real_artist_name,   # Имя артиста (переданное из main.py)
+            status,             # Статус
+            time_str            # Время
+        ]
+
+    def append_rows(self, rows, worksheet_name=None):
+        """
+        Синхронно добавляет несколько строк одним запросом к API (для фонового писателя).
+        worksheet_name — лист месяца из worksheet_name_for, None — основной лист.
+        Исключения пробрасываются вызывающему коду.
+        """
+        try:
+            self._worksheet_by_name(worksheet_name).append_rows(rows, value_input_option='USER_ENTERED')
+        except Exception:
+            if worksheet_name is not None:
+                self._worksheets.pop(worksheet_name, None)  # Лист могли удалить вручную: при повторе найдем заново
+            raise
+
+    def get_all_rows(self, worksheet_name=None, create=True):
+        """
+        Все строки листа (вместе с заголовком) одним запросом к API, как их отображает таблица.
+        create=False — отсутствующий лист не создается, результат пустой.
+        """
+        if create or worksheet_name is None:
+            return self._worksheet_by_name(worksheet_name).get_all_values()
+        import gspread
+        try:
+            return self.read_worksheet(worksheet_name)
+        except gspread.WorksheetNotFound:
+            return []
+
+    def read_worksheet(self, worksheet_name):
+        """Все строки существующего листа (например, справочника "Артисты"); лист не создается."""
+        if not self.spreadsheet:
+            raise RuntimeError("Таблица не открыта.")
+        worksheet = self._worksheets.get(worksheet_name)
+        if worksheet is None:
+            worksheet = self._worksheets[worksheet_name] = self.spreadsheet.worksheet(worksheet_name)
+        return worksheet.get_all_values()
+
+    async def add_status_entry(self, real_artist_name, status, timestamp: datetime):
         """
         Асинхронно добавляет запись в Google Sheets: Дата, Имя артиста, Статус, Время.
         """
@@ -106,24 +243,7 @@ class GoogleSheetsManager:
             return
 
         try:
-            # Парсим переданную строку времени
-            try:
-                ts_datetime = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
-                date_str = ts_datetime.strftime('%d.%m.%Y') # Формат даты
-                time_str = ts_datetime.strftime('%H:%M:%S') # Формат времени
-            except ValueError:
-                logger.warning(f"Не удалось распарсить timestamp_str '{timestamp_str}'. Используется текущее время.")
-                current_time = datetime.now()
-                date_str = current_time.strftime('%d.%m.%Y')
-                time_str = current_time.strftime('%H:%M:%S')
-
-            # Формируем строку данных для таблицы в нужном порядке
-            row_data = [
-                date_str,           # Дата
-                real_artist_name,   # Имя артиста (переданное из main.py)
-                status,             # Статус
-                time_str            # Время
-            ]
+            row_data = self.format_status_row(real_artist_name, status, timestamp)
 
             loop = asyncio.get_running_loop()
             append_func_with_option = functools.partial(
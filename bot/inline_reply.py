@@ -0,0 +1,53 @@
+# Файл: bot/inline_reply.py
+
+import asyncio
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+# Слот текущего обновления: выставляется на время process_update
+current_slot: ContextVar[Optional['InlineReplySlot']] = ContextVar('inline_reply_slot', default=None)
+
+
+class InlineReplySlot:
+    """
+    Место для одного вызова Bot API в теле ответа на вебхук.
+
+    Telegram выполняет метод из ответа сам, поэтому подтверждение не требует
+    отдельного исходящего запроса. Слот принимает только один ответ; если
+    ответов больше или вебхук уже ответил (close), они идут обычным запросом.
+    """
+
+    def __init__(self):
+        self.payload: Optional[Dict] = None
+        self.closed = False
+        self._done = asyncio.Event()
+
+    def is_free(self) -> bool:
+        return not self.closed and self.payload is None
+
+    def offer(self, payload: Dict) -> bool:
+        """Забирает вызов в ответ вебхука. False — слот занят или закрыт, нужен исходящий запрос."""
+        if self.closed or self.payload is not None:
+            return False
+        self.payload = payload
+        return True
+
+    def revoke(self) -> Optional[Dict]:
+        """Возвращает уже принятый вызов (чтобы отправить его обычным запросом до следующего)."""
+        if self.closed:
+            return None
+        payload, self.payload = self.payload, None
+        return payload
+
+    def finish(self):
+        """Обработка обновления завершена (вызывает пул обработчиков)."""
+        self._done.set()
+
+    async def wait(self, timeout: float) -> Optional[Dict]:
+        """Ждет конца обработки не дольше timeout и закрывает слот. Возвращает вызов для тела ответа."""
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.closed = True
+        return self.payload
@@ -0,0 +1,45 @@
+# Файл: bot/locks.py
+
+import fcntl
+import os
+import threading
+
+
+class InterProcessLock:
+    """
+    Межпроцессная блокировка на файле (flock).
+
+    Нужна, когда несколько воркеров uvicorn пишут в один и тот же ресурс
+    (лист Google Sheets). Внутри процесса дополнительно сериализует потоки.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._fd = None
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            self._fd = fd
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+    def release(self):
+        fd, self._fd = self._fd, None
+        try:
+            if fd is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+        finally:
+            self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
@@ -3,51 +3,61 @@
 import os
 import logging
 import json
+import hmac
 from typing import List, Dict, Optional
-from flask import Flask, request, abort
-from telegram import Update, Bot
+from telegram import Update, Bot, Chat
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 from dotenv import load_dotenv
 import sqlite3
 from datetime import datetime
 import asyncio
-from asgiref.wsgi import WsgiToAsgi
+import atexit
+import threading
+import time
 from zoneinfo import ZoneInfo
 
-# --- НАСТРОЙКА ---
-CREDENTIALS_FILE_PATH = "credentials.json"
-logging.basicConfig(
-    level=logging.INFO, # Стандартный уровень логирования
-    format='%(asctime)s - %(name)s - %(levelname)s - [PID:%(process)d] - %(message)s'
-)
+# --- КЛАСС КОНФИГУРАЦИИ (до логов: уровень и формат берутся из него) ---
 logger = logging.getLogger(__name__)
-
-# --- СОЗДАНИЕ ФАЙЛА УЧЕТНЫХ ДАННЫХ GOOGLE ПРИ ЗАПУСКЕ ---
-GOOGLE_CREDS_AVAILABLE = False
-try:
-    google_creds_json_str = os.environ.get('GOOGLE_SHEETS_CREDENTIALS_JSON', '{}')
-    if not google_creds_json_str or google_creds_json_str == '{}':
-        raise ValueError("Переменная окружения GOOGLE_SHEETS_CREDENTIALS_JSON не установлена или пуста!")
-    creds_dict = json.loads(google_creds_json_str)
-    with open(CREDENTIALS_FILE_PATH, "w") as f:
-        json.dump(creds_dict, f)
-    logger.info(f"✅ Файл учетных данных {CREDENTIALS_FILE_PATH} успешно создан/перезаписан.")
-    GOOGLE_CREDS_AVAILABLE = True
-except (ValueError, json.JSONDecodeError, FileNotFoundError, OSError) as e:
-    logger.error(f"❌ КРИТИЧЕСКАЯ ОШИБКА при создании файла {CREDENTIALS_FILE_PATH}: {e}", exc_info=True)
-
-# --- КЛАССЫ КОНФИГУРАЦИИ И МЕНЕДЖЕР GOOGLE SHEETS ---
 try:
     from bot.config import Config
-    logger.info("Успешно импортирован Config из bot.config")
+    CONFIG_IMPORTED = True
 except ImportError:
-    logger.warning("Не удалось импортировать Config из bot.config. Используется заглушка Config из main.py.")
+    CONFIG_IMPORTED = False
     class Config:
         BOT_TOKEN = os.getenv('BOT_TOKEN')
-        if not BOT_TOKEN: logger.critical("Переменная окружения BOT_TOKEN не установлена!")
         GOOGLE_SHEETS_SPREADSHEET_NAME = os.getenv('GOOGLE_SHEETS_SPREADSHEET_NAME', "АнимельБот")
         GOOGLE_SHEETS_WORKSHEET_NAME = os.getenv('GOOGLE_SHEETS_WORKSHEET_NAME', "Статусы")
+        LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+        LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+        LOG_SAMPLE_LIMIT = int(os.getenv('LOG_SAMPLE_LIMIT', '20'))
+        LOG_SAMPLE_INTERVAL = float(os.getenv('LOG_SAMPLE_INTERVAL', '10'))
+
+# --- НАСТРОЙКА ---
+from bot.logging_setup import setup_logging
+setup_logging(
+    level=Config.LOG_LEVEL,
+    fmt=Config.LOG_FORMAT,
+    sample_limit=Config.LOG_SAMPLE_LIMIT,
+    sample_interval=Config.LOG_SAMPLE_INTERVAL,
+)
+if CONFIG_IMPORTED:
+    logger.info("Успешно импортирован Config из bot.config")
+else:
+    logger.warning("Не удалось импортировать Config из bot.config. Используется заглушка Config из main.py.")
+    if not Config.BOT_TOKEN: logger.critical("Переменная окружения BOT_TOKEN не установлена!")
+
+# --- УЧЕТНЫЕ ДАННЫЕ GOOGLE (ТОЛЬКО В ПАМЯТИ, БЕЗ ФАЙЛА НА ДИСКЕ) ---
+GOOGLE_CREDS_AVAILABLE = False
+GOOGLE_CREDS_DICT = None
+try:
+    from bot.google_sheets import load_credentials_from_env
+    GOOGLE_CREDS_DICT = load_credentials_from_env()
+    logger.info("✅ Учетные данные Google загружены из переменной окружения.")
+    GOOGLE_CREDS_AVAILABLE = True
+except ValueError as e:
+    logger.error(f"❌ КРИТИЧЕСКАЯ ОШИБКА при чтении учетных данных Google: {e}")
 
+# --- МЕНЕДЖЕР GOOGLE SHEETS ---
 try:
     from bot.google_sheets import GoogleSheetsManager
     logger.info("Успешно импортирован GoogleSheetsManager из bot.google_sheets")
@@ -57,6 +67,23 @@ except ImportError:
     HAS_GOOGLE_SHEETS_MANAGER = False
     class GoogleSheetsManager: pass
 
+from bot.sheets_outbox import SheetsOutboxSyncer
+from bot.artists import create_artist_directory
+from bot.storage import StatusStorage
+from bot.retention import active_archive_path, apply_retention
+from bot.locks import InterProcessLock
+from bot.dedup import UpdateDeduplicator
+from bot.status_matcher import StatusMatcher
+from bot.reports import build_report, format_report_text, parse_report_date
+from bot.board import StatusBoard, format_board_text, parse_stale_after
+from bot.sinks import StatusEvent, SinkPipeline, SQLiteSink, GoogleSheetsSink, JsonlSink
+from bot.inline_reply import InlineReplySlot, current_slot
+from bot.outbound import OutboundScheduler
+from bot.telegram_request import PooledHTTPXRequest
+from bot.metrics import REGISTRY, CONTENT_TYPE, QUEUE_DEPTH, STAGE_SECONDS, STATUSES_TOTAL, WEBHOOK_RESPONSES_TOTAL, observe_stage
+from bot.asgi import ASGIApp, UpdateWorkerPool, Request, Response, StreamingResponse, json_response
+from bot.export import FORMATS as EXPORT_FORMATS, artist_user_ids, stream_export
+
 
 # --- КЛАСС БОТА ---
 class AnimatorStatusBot:
@@ -65,94 +92,344 @@ class AnimatorStatusBot:
         self.TOKEN = Config.BOT_TOKEN
         if not self.TOKEN: raise ValueError("Не удалось получить токен бота из Config.")
 
-        self.DATABASE_PATH = 'animator_statuses.db'
-        self.VALID_STATUSES = ['в пути', 'на месте', 'закончил']
+        self.DATABASE_PATH = Config.DATABASE_PATH
+        self.status_matcher = StatusMatcher.from_file(Config.STATUSES_CONFIG_PATH)
+        self.VALID_STATUSES = self.status_matcher.statuses
         self._app_initialized = False
-
-        # !!! ЗАПОЛНИТЕ ЭТОТ СЛОВАРЬ ВАШИМИ ДАННЫМИ !!!
-        self.artist_mapping = {
-            283779327: "Егор", 413165965: "Настя", 6292548875: "Яна", 6260796172: "Кира",
-            1411900354: "Влада", 688970244: "Алексей", 5562603173: "Лиза", 904105063: "Даша",
-            5617024819: "Амина", 1093638777: "Тёма", 1389343617: "Никита", 2129236642: "Макс",
-            1411021174: "Катя",
-        }
-        logger.info(f"Загружена карта артистов: {len(self.artist_mapping)} записей")
+        self._init_lock = None
+
+        # Справочник артистов: встроенная карта из bot/artists.py или ARTISTS_SOURCE с обновлением на лету
+        sheets_available = HAS_GOOGLE_SHEETS_MANAGER and GOOGLE_CREDS_AVAILABLE
+        self.artists = create_artist_directory(
+            Config.ARTISTS_SOURCE,
+            refresh_interval=Config.ARTISTS_REFRESH_INTERVAL,
+            get_sheets_manager=(lambda: getattr(self, 'sheets_manager', None)) if sheets_available else None,
+            worksheet_name=Config.ARTISTS_WORKSHEET_NAME,
+        )
+        self.artists.start()
+        logger.info(f"Загружена карта артистов ({self.artists.snapshot().source}): {len(self.artist_mapping)} записей")
 
         self.setup_database()
+        self.setup_retention()
+        self.setup_board()
         self.setup_google_sheets()
+        self.setup_sinks()
         self.telegram_app = self.create_telegram_app()
+        self.setup_outbound()
         logger.info("Экземпляр AnimatorStatusBot создан. Инициализация Telegram App будет при первом запросе.")
 
     def setup_database(self):
+        self.storage = StatusStorage(
+            self.DATABASE_PATH,
+            batch_size=Config.SQLITE_BATCH_SIZE,
+            busy_timeout_ms=Config.SQLITE_BUSY_TIMEOUT_MS,
+            # Строки для Google Sheets копятся в outbox, даже пока таблица недоступна
+            sheets_outbox=HAS_GOOGLE_SHEETS_MANAGER and GOOGLE_CREDS_AVAILABLE,
+            archive_path=active_archive_path(Config.SQLITE_ARCHIVE_PATH, Config.SQLITE_RETENTION_DAYS),
+        )
+        self.deduplicator = UpdateDeduplicator(
+            self.storage,
+            max_size=Config.DEDUP_CACHE_SIZE,
+            ttl=Config.DEDUP_TTL,
+        )
         try:
-            conn = sqlite3.connect(self.DATABASE_PATH); cursor = conn.cursor()
-            cursor.execute('''CREATE TABLE IF NOT EXISTS statuses (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, username TEXT, status TEXT NOT NULL, timestamp DATETIME NOT NULL)''')
-            conn.commit(); conn.close()
+            self.storage.start()
+            self.deduplicator.setup()
             logger.info(f"База данных SQLite '{self.DATABASE_PATH}' настроена.")
         except sqlite3.Error as e: logger.error(f"Ошибка настройки SQLite '{self.DATABASE_PATH}': {e}")
 
+    def setup_retention(self):
+        """Фоновый перенос старых статусов в архив (SQLITE_RETENTION_DAYS=0 — выключен)."""
+        self._retention_stop = threading.Event()
+        if Config.SQLITE_RETENTION_DAYS > 0 and Config.SQLITE_ARCHIVE_PATH:
+            threading.Thread(target=self._retention_loop, name="sqlite-retention", daemon=True).start()
+
+    def _retention_loop(self):
+        # Воркеры uvicorn делают это по очереди: второй просто не найдет строк для переноса
+        lock = InterProcessLock(f"{self.DATABASE_PATH}.retention.lock")
+        while True:
+            try:
+                with lock:
+                    conn = self.storage.connect()
+                    try:
+                        # Без полного VACUUM: он держал бы блокировку записи дольше busy_timeout писателя
+                        result = apply_retention(conn, Config.SQLITE_RETENTION_DAYS,
+                                                 datetime.now(ZoneInfo("Europe/Moscow")).date())
+                    finally:
+                        conn.close()
+                if result['archived']:
+                    logger.info(f"В архив перенесено {result['archived']} статусов до {result['cutoff']} "
+                                f"(освобождено страниц: {result['reclaimed_pages']}, {result['duration_ms']} мс).")
+            except sqlite3.Error as e:
+                logger.error(f"Ошибка переноса статусов в архив: {e}")
+            if self._retention_stop.wait(Config.SQLITE_RETENTION_INTERVAL):
+                return
+
+    def setup_board(self):
+        """Табло текущих статусов: сборка из SQLite и фоновая подкачка чужих вставок."""
+        self.board = StatusBoard(stale_after=parse_stale_after(Config.BOARD_STALE_AFTER))
+        try:
+            conn = self.storage.connect()
+            try:
+                self.board.load(conn)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка загрузки табло статусов из SQLite: {e}")
+            return
+        if Config.BOARD_SYNC_INTERVAL > 0:
+            self._board_stop = threading.Event()
+            threading.Thread(target=self._board_sync_loop, name="board-sync", daemon=True).start()
+
+    def _board_sync_loop(self):
+        conn = self.storage.connect()
+        try:
+            while not self._board_stop.wait(Config.BOARD_SYNC_INTERVAL):
+                try:
+                    self.board.sync(conn)
+                except sqlite3.Error as e:
+                    logger.error(f"Ошибка синхронизации табло статусов: {e}")
+        finally:
+            conn.close()
+
     def setup_google_sheets(self):
+        """
+        Готовит синхронизацию outbox -> Google Sheets и подключается к таблице
+        в фоновом потоке с повторами. До подключения статусы пишутся в SQLite,
+        а строки для таблицы ждут в sheets_outbox.
+        """
         self.sheets_manager = None
         self.status_worksheet = None
-        if HAS_GOOGLE_SHEETS_MANAGER:
-            if GOOGLE_CREDS_AVAILABLE:
-                logger.info("Учетные данные Google доступны, попытка настройки Google Sheets...")
-                try:
-                    self.sheets_manager = GoogleSheetsManager(credentials_path=CREDENTIALS_FILE_PATH)
-                    if hasattr(self.sheets_manager, 'client') and self.sheets_manager.client:
-                        spreadsheet_name = Config.GOOGLE_SHEETS_SPREADSHEET_NAME
-                        worksheet_name = Config.GOOGLE_SHEETS_WORKSHEET_NAME
-                        logger.info(f"Попытка открыть таблицу '{spreadsheet_name}' и лист '{worksheet_name}'...")
-                        spreadsheet = self.sheets_manager.open_spreadsheet(spreadsheet_name)
-                        if spreadsheet:
-                            worksheet = self.sheets_manager.create_or_get_worksheet(spreadsheet, worksheet_name)
-                            if worksheet:
-                                self.status_worksheet = worksheet
-                                logger.info(f"Подключение к Google Sheets ({spreadsheet_name}/{worksheet_name}) успешно установлено.")
-                            else: logger.warning("Не удалось получить или создать рабочий лист Google Sheets.")
-                        else: logger.warning("Не удалось открыть таблицу Google Sheets.")
-                    else: logger.warning("Менеджер Google Sheets создан, но клиент gspread не был инициализирован.")
-                except Exception as e: logger.error(f"Неожиданная ошибка при настройке Google Sheets: {e}", exc_info=True)
-            else: logger.warning("Учетные данные Google недоступны. Google Sheets не будут использоваться.")
-        else: logger.warning("Класс GoogleSheetsManager не импортирован. Работа с Google Sheets невозможна.")
-
-
-    async def save_status(self, user_id: int, username: str, status: str):
+        self.sheets_syncer = None
+        self.sheets_ready = threading.Event()
+        self._sheets_stop = threading.Event()
+        if not HAS_GOOGLE_SHEETS_MANAGER:
+            logger.warning("Класс GoogleSheetsManager не импортирован. Работа с Google Sheets невозможна.")
+            return
+        if not GOOGLE_CREDS_AVAILABLE:
+            logger.warning("Учетные данные Google недоступны. Google Sheets не будут использоваться.")
+            return
+
+        self._sheets_lock = InterProcessLock(Config.SHEETS_LOCK_PATH)
+        self.sheets_syncer = SheetsOutboxSyncer(
+            self.storage,
+            None,
+            resolve_name=self.resolve_artist_name,
+            format_row=GoogleSheetsManager.format_status_row,
+            batch_size=Config.SHEETS_BATCH_SIZE,
+            flush_interval=Config.SHEETS_FLUSH_INTERVAL,
+            poll_interval=Config.SHEETS_SYNC_POLL_INTERVAL,
+            retry_min=Config.SHEETS_RETRY_MIN,
+            retry_max=Config.SHEETS_RETRY_MAX,
+            lease_seconds=Config.SHEETS_CLAIM_LEASE,
+            process_lock=self._sheets_lock,
+        )
+        threading.Thread(target=self._connect_google_sheets, name="sheets-connect", daemon=True).start()
+
+    def _connect_google_sheets(self):
+        """Фоновое подключение к Google Sheets с экспоненциальной паузой между попытками."""
+        delay = Config.SHEETS_CONNECT_RETRY_MIN
+        attempt = 0
+        while not self._sheets_stop.is_set():
+            attempt += 1
+            if self._try_connect_google_sheets():
+                self.artists.reload()  # Справочник из листа "Артисты" — не дожидаясь интервала
+                self.sheets_syncer.sheets_manager = self.sheets_manager
+                self.sheets_syncer.start()
+                self.sheets_ready.set()
+                return
+            logger.warning(f"Google Sheets недоступны (попытка {attempt}), следующая через {delay:.0f}s. Статусы пишутся в SQLite.")
+            if self._sheets_stop.wait(delay):
+                return
+            delay = min(delay * 2, Config.SHEETS_CONNECT_RETRY_MAX)
+
+    def _try_connect_google_sheets(self) -> bool:
+        try:
+            manager = GoogleSheetsManager(credentials_dict=GOOGLE_CREDS_DICT, timeout=Config.SHEETS_HTTP_TIMEOUT)
+            if not manager.client:
+                logger.warning("Менеджер Google Sheets создан, но клиент gspread не был инициализирован.")
+                return False
+            spreadsheet_name = Config.GOOGLE_SHEETS_SPREADSHEET_NAME
+            worksheet_name = Config.GOOGLE_SHEETS_WORKSHEET_NAME
+            if Config.SHEETS_MONTHLY_WORKSHEETS:
+                # Листы месяцев создаются по мере надобности; сразу открываем текущий
+                manager.use_monthly_worksheets(worksheet_name)
+                worksheet_name = manager.worksheet_name_for(datetime.now(ZoneInfo("Europe/Moscow")))
+            logger.info(f"Попытка открыть таблицу '{spreadsheet_name}' и лист '{worksheet_name}'...")
+            spreadsheet = manager.open_spreadsheet(spreadsheet_name)
+            if not spreadsheet:
+                logger.warning("Не удалось открыть таблицу Google Sheets.")
+                return False
+            worksheet = manager.create_or_get_worksheet(spreadsheet, worksheet_name, process_lock=self._sheets_lock)
+            if not worksheet:
+                logger.warning("Не удалось получить или создать рабочий лист Google Sheets.")
+                return False
+        except Exception as e:
+            logger.error(f"Неожиданная ошибка при настройке Google Sheets: {e}", exc_info=True)
+            return False
+        self.sheets_manager = manager
+        self.status_worksheet = worksheet
+        logger.info(f"Подключение к Google Sheets ({spreadsheet_name}/{worksheet_name}) успешно установлено.")
+        return True
+
+    def setup_sinks(self):
+        """Хранилища статусов: SQLite (надежное), Google Sheets и необязательный JSONL-журнал."""
+        sinks = [SQLiteSink(self.storage, timeout=Config.SINK_TIMEOUT_SQLITE)]
+        if self.sheets_syncer:
+            sinks.append(GoogleSheetsSink(self.sheets_syncer, timeout=Config.SINK_TIMEOUT_SHEETS))
+        if Config.JSONL_SINK_PATH:
+            sinks.append(JsonlSink(Config.JSONL_SINK_PATH, timeout=Config.SINK_TIMEOUT_JSONL))
+        self.sinks = SinkPipeline(sinks)
+        logger.info(f"Хранилища статусов: {', '.join(sink.name for sink in sinks)}")
+
+    def setup_outbound(self):
+        """Очередь подтверждений с ограничением частоты на чат (OUTBOUND_RATE_PER_MINUTE=0 — отвечать сразу)."""
+        self.outbound = None
+        if Config.OUTBOUND_RATE_PER_MINUTE > 0:
+            self.outbound = OutboundScheduler(
+                self._send_confirmation,
+                rate_per_minute=Config.OUTBOUND_RATE_PER_MINUTE,
+                burst=Config.OUTBOUND_CHAT_BURST,
+                coalesce_delay=Config.OUTBOUND_COALESCE_DELAY,
+                max_retries=Config.OUTBOUND_MAX_RETRIES,
+                retry_delay=Config.OUTBOUND_RETRY_DELAY,
+            )
+
+    def use_direct_replies(self):
+        """
+        Подтверждения без очереди OutboundScheduler: сразу или в теле ответа на вебхук.
+        Для serverless — там вызов ждал бы токена чата до ответа, а после ответа процесс замораживают.
+        """
+        self.outbound = None
+
+    async def _send_confirmation(self, chat_id: int, text: str, reply_to_message_id: Optional[int]):
+        with STAGE_SECONDS.time(stage='reply'):
+            await self.telegram_app.bot.send_message(
+                chat_id=chat_id, text=text, reply_to_message_id=reply_to_message_id, allow_sending_without_reply=True
+            )
+
+    async def warm_up(self):
+        """Инициализирует Telegram Application заранее, чтобы первый вебхук не ждал getMe."""
+        try:
+            await self._ensure_initialized()
+        except RuntimeError:
+            pass  # Ошибка уже залогирована, следующая попытка будет при первом обновлении
+
+    def readiness(self) -> Dict:
+        """Состояние компонентов для /ready."""
+        sheets = 'disabled'
+        if self.sheets_syncer:
+            sheets = 'ready' if self.sheets_ready.is_set() else 'connecting'
+        return {
+            'telegram': 'ready' if self._app_initialized else 'pending',
+            'sqlite': 'ready' if self.storage.is_running() else 'down',
+            'google_sheets': sheets,
+        }
+
+
+    async def save_status(self, user_id: int, username: str, status: str) -> bool:
+        """
+        Раздает статус всем хранилищам одновременно. Возвращает True, когда
+        SQLite подтвердил запись; Google Sheets и журнал дописывают в фоне.
+        """
         moscow_tz = ZoneInfo("Europe/Moscow")
         timestamp_msk = datetime.now(moscow_tz)
-        timestamp_str = timestamp_msk.strftime('%Y-%m-%d %H:%M:%S')
 
-        real_artist_name = self.artist_mapping.get(user_id, username or f"ID:{user_id}")
-        logger.info(f"Сохранение статуса: User ID={user_id}, TG Username='{username}', Real Name='{real_artist_name}', Status='{status}', Time (MSK)={timestamp_msk}")
+        real_artist_name = self.resolve_artist_name(user_id, username)
+        logger.info("Сохранение статуса: User ID=%s, TG Username='%s', Real Name='%s', Status='%s', Time (MSK)=%s",
+                    user_id, username, real_artist_name, status, timestamp_msk,
+                    extra={'user_id': user_id, 'artist': real_artist_name, 'status': status})
 
-        # Сохранение в SQLite
-        try:
-            conn = sqlite3.connect(self.DATABASE_PATH); cursor = conn.cursor()
-            cursor.execute('INSERT INTO statuses (user_id, username, status, timestamp) VALUES (?, ?, ?, ?)',(user_id, username, status, timestamp_msk))
-            conn.commit(); conn.close()
-            logger.debug("Статус успешно сохранен в SQLite.")
-        except sqlite3.Error as e: logger.error(f"Ошибка сохранения статуса в SQLite: {e}")
-
-        # Сохранение в Google Sheets
-        if self.sheets_manager and self.status_worksheet:
-            logger.debug("Попытка сохранения статуса в Google Sheets...")
+        event = StatusEvent(user_id, username, real_artist_name, status, timestamp_msk)
+        STATUSES_TOTAL.inc(status=status)
+        self.board.update(user_id, username, status, timestamp_msk)
+        return await self.sinks.dispatch(event)
+
+    @property
+    def artist_mapping(self) -> Dict[int, str]:
+        """Текущий снимок справочника {user_id: имя}; после обновления — уже новый словарь."""
+        return self.artists.mapping()
+
+    def resolve_artist_name(self, user_id: int, username: Optional[str] = None) -> str:
+        return self.artists.resolve(user_id, username)
+
+    async def get_report(self, day) -> Dict:
+        """Отчет за день из SQLite (в отдельном потоке, чтобы не блокировать event loop)."""
+        def query():
+            conn = self.storage.connect()
             try:
-                 await self.sheets_manager.add_status_entry(real_artist_name, status, timestamp_str)
-            except Exception as e: logger.error(f"Ошибка при вызове add_status_entry для Google Sheets: {e}", exc_info=True)
-        else: logger.debug("Пропуск сохранения в Google Sheets.")
+                return build_report(conn, day, self.resolve_artist_name)
+            finally:
+                conn.close()
+        return await asyncio.to_thread(query)
+
+    def get_board(self) -> List[Dict]:
+        """Табло из памяти: без обращений к SQLite и Google Sheets."""
+        return self.board.snapshot(datetime.now(ZoneInfo("Europe/Moscow")), self.resolve_artist_name)
+
+    async def flush(self, timeout: float = 10.0) -> bool:
+        """
+        Дописывает все начатое, не останавливая компоненты: подтверждения, хранилища,
+        SQLite и, если таблица подключена, outbox Google Sheets. Нужен, когда процесс
+        могут заморозить сразу после ответа (serverless). False — не уложились в timeout.
+        """
+        deadline = time.monotonic() + timeout
+
+        def remaining() -> float:
+            return max(0.0, deadline - time.monotonic())
+
+        if self.outbound:
+            await self.outbound.drain(timeout=remaining())
+        await self.sinks.drain(timeout=remaining())
+        done = await asyncio.to_thread(self.storage.flush, remaining())
+        if self.sheets_syncer and self.sheets_ready.is_set():
+            done = await asyncio.to_thread(self.sheets_syncer.flush, remaining()) and done
+        return done and remaining() > 0
+
+    def shutdown(self):
+        """Фиксирует очередь SQLite и отправляет готовое из outbox в Google Sheets перед остановкой процесса."""
+        if getattr(self, '_board_stop', None):
+            self._board_stop.set()
+        self._retention_stop.set()
+        self.artists.stop()
+        self._sheets_stop.set()
+        self.storage.stop()
+        if self.sheets_syncer:
+            self.sheets_syncer.stop()
+
+    def stats(self) -> Dict:
+        """Внутренние счетчики для подбора порогов."""
+        return {
+            'sqlite_writer': self.storage.stats(),
+            'dedup': self.deduplicator.stats(),
+            'sinks': self.sinks.stats(),
+            'outbound': self.outbound.stats() if self.outbound else None,
+            'sheets_outbox': self.sheets_syncer.stats() if self.sheets_syncer else None,
+            'artists': self.artists.stats(),
+        }
 
     def extract_status(self, text: str) -> Optional[str]:
-        if not text: return None
-        text_lower = text.lower()
-        for status in self.VALID_STATUSES:
-            if status.lower() in text_lower: return status
-        return None
+        return self.status_matcher.match(text)
 
     def create_telegram_app(self):
         """Создает и настраивает экземпляр telegram.ext.Application."""
         if not self.TOKEN: raise ValueError("Токен бота не определен.")
-        application = Application.builder().token(self.TOKEN).build()
+        builder = Application.builder().token(self.TOKEN).request(PooledHTTPXRequest(
+            connection_pool_size=Config.TELEGRAM_POOL_SIZE,
+            max_keepalive_connections=Config.TELEGRAM_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=Config.TELEGRAM_KEEPALIVE_EXPIRY,
+            connect_timeout=Config.TELEGRAM_CONNECT_TIMEOUT,
+            read_timeout=Config.TELEGRAM_READ_TIMEOUT,
+            write_timeout=Config.TELEGRAM_WRITE_TIMEOUT,
+            pool_timeout=Config.TELEGRAM_POOL_TIMEOUT,
+        ))
+        if Config.TELEGRAM_API_BASE_URL:
+            # Например, локальный Bot API сервер или заглушка для проверок
+            builder = builder.base_url(Config.TELEGRAM_API_BASE_URL)
+        application = builder.build()
         application.add_handler(CommandHandler('start', self.start_command))
+        application.add_handler(CommandHandler('report', self.report_command))
+        application.add_handler(CommandHandler('board', self.board_command))
 
         # --- ВОЗВРАЩЕН СТАНДАРТНЫЙ ФИЛЬТР ---
         # Ловим текстовые сообщения (не команды) в группах или супергруппах
@@ -173,12 +450,67 @@ class AnimatorStatusBot:
         logger.info("Экземпляр приложения Telegram создан, обработчики добавлены.")
         return application
 
+    async def reply(self, message, text: str):
+        """
+        Ответ на сообщение. В режиме WEBHOOK_INLINE_REPLY первый ответ уходит в теле
+        ответа на вебхук; если ответов несколько — все идут обычными запросами по порядку.
+        """
+        slot = current_slot.get()
+        if slot is not None:
+            payload = {'method': 'sendMessage', 'chat_id': message.chat_id, 'text': text}
+            if message.chat.type != Chat.PRIVATE:
+                payload['reply_to_message_id'] = message.message_id  # Как reply_text: в группах — с цитатой
+            if slot.offer(payload):
+                return
+            earlier = slot.revoke()
+            if earlier:
+                with STAGE_SECONDS.time(stage='reply'):
+                    await self.telegram_app.bot.send_message(**{k: v for k, v in earlier.items() if k != 'method'})
+        with STAGE_SECONDS.time(stage='reply'):
+            await message.reply_text(text)
+
+    async def confirm(self, message, artist_name: str, status: str):
+        """
+        Подтверждение сохраненного статуса. С ограничителем частоты уходит через
+        очередь чата (одновременные подтверждения сливаются в одно сообщение);
+        в ответ вебхука — только если у чата есть свободный токен.
+        """
+        text = f"✅ Статус '{status}' сохранен."
+        if self.outbound is None:
+            await self.reply(message, text)
+            return
+        slot = current_slot.get()
+        if slot is not None and slot.is_free() and self.outbound.try_acquire(message.chat_id):
+            await self.reply(message, text)
+            return
+        reply_to = message.message_id if message.chat.type != Chat.PRIVATE else None
+        self.outbound.submit(message.chat_id, f"{artist_name}: {status}", text, reply_to)
+
     # --- Обработчики Telegram ---
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик команды /start."""
         user = update.effective_user
         logger.info(f"Получена команда /start от пользователя {user.id} ({user.username})")
-        await update.message.reply_text(f"Привет! Отправь статус: '{', '.join(self.VALID_STATUSES)}'.")
+        await self.reply(update.message, f"Привет! Отправь статус: '{', '.join(self.VALID_STATUSES)}'.")
+
+    async def report_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /report [дата]: хронология и длительности по артистам за день."""
+        user = update.effective_user
+        logger.info(f"Получена команда /report от пользователя {user.id} ({user.username}), аргументы: {context.args}")
+        today = datetime.now(ZoneInfo("Europe/Moscow")).date()
+        try:
+            day = parse_report_date(context.args[0] if context.args else None, today)
+        except ValueError:
+            await self.reply(update.message, "Формат: /report [ДД.ММ.ГГГГ]")
+            return
+        report = await self.get_report(day)
+        await self.reply(update.message, format_report_text(report))
+
+    async def board_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработчик команды /board: текущий статус каждого артиста."""
+        user = update.effective_user
+        logger.info(f"Получена команда /board от пользователя {user.id} ({user.username})")
+        await self.reply(update.message, format_board_text(self.get_board()))
 
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик текстовых сообщений из групп/супергрупп."""
@@ -187,10 +519,12 @@ class AnimatorStatusBot:
         effective_message = update.effective_message
 
         # Стандартное логирование получения сообщения
-        logger.info(f"Получено сообщение в handle_message (группа/супергруппа): "
-                    f"Chat ID: {effective_chat.id if effective_chat else 'N/A'}, "
-                    f"User ID: {effective_user.id if effective_user else 'N/A'}")
-        logger.debug(f"Текст сообщения: {repr(effective_message.text) if effective_message and effective_message.text else 'N/A'}")
+        chat_id = effective_chat.id if effective_chat else None
+        user_id = effective_user.id if effective_user else None
+        # Каждое сообщение группы: при потоке болтовни пишется не больше LOG_SAMPLE_LIMIT за интервал
+        logger.info("Получено сообщение в handle_message (группа/супергруппа): Chat ID: %s, User ID: %s", chat_id, user_id,
+                    extra={'chat_id': chat_id, 'user_id': user_id, 'sample': 'message_received'})
+        logger.debug("Текст сообщения: %r", effective_message.text if effective_message else None, extra={'sample': 'message_text'})
 
 
         # Проверка на наличие текста (должна проходить из-за filters.TEXT)
@@ -203,24 +537,38 @@ class AnimatorStatusBot:
         username = user.username or f"{user.first_name} {user.last_name or ''}".strip() or f"ID:{user.id}"
 
         # Извлекаем статус
-        status = self.extract_status(text)
-        logger.debug(f"Результат extract_status для текста '{text}': {status}") # Debug уровень для результата
+        with STAGE_SECONDS.time(stage='extract_status'):
+            status = self.extract_status(text)
+        logger.debug("Результат extract_status для текста '%s': %s", text, status, extra={'sample': 'extract_status'})
 
         if status:
-            logger.info(f"Распознан статус: '{status}' от пользователя {user.id} в чате {effective_chat.id}")
-            await self.save_status(user.id, user.username or f"ID:{user.id}", status)
+            logger.info("Распознан статус: '%s' от пользователя %s в чате %s", status, user.id, chat_id,
+                        extra={'chat_id': chat_id, 'user_id': user.id, 'status': status})
+            saved = await self.save_status(user.id, user.username or f"ID:{user.id}", status)
             try:
-                 await effective_message.reply_text(f"✅ Статус '{status}' сохранен.")
-                 logger.info(f"Ответ об успешном сохранении статуса '{status}' отправлен в чат {effective_chat.id}.")
+                 if saved:
+                     await self.confirm(effective_message, self.resolve_artist_name(user.id, user.username), status)
+                 else:
+                     await self.reply(effective_message, f"⚠️ Статус '{status}' не удалось сохранить, попробуйте еще раз.")
+                 logger.info("Ответ о сохранении статуса '%s' передан для чата %s.", status, chat_id,
+                             extra={'chat_id': chat_id, 'status': status})
             except Exception as reply_err:
                  logger.error(f"Ошибка при отправке ответа пользователю в чат {effective_chat.id}: {reply_err}", exc_info=True)
         else:
-            logger.debug(f"Допустимый статус не найден в сообщении от {user.id} в чате {effective_chat.id}.")
+            logger.debug("Допустимый статус не найден в сообщении от %s в чате %s.", user.id, chat_id,
+                         extra={'chat_id': chat_id, 'user_id': user.id, 'sample': 'no_status'})
 
 
     async def _ensure_initialized(self):
         """Внутренний метод для ленивой инициализации Telegram App."""
-        if not self._app_initialized:
+        if self._app_initialized:
+            return
+        # Несколько обработчиков из пула могут прийти сюда одновременно
+        if self._init_lock is None:
+            self._init_lock = asyncio.Lock()
+        async with self._init_lock:
+            if self._app_initialized:
+                return
             logger.info("Выполняется первая инициализация приложения Telegram (Application.initialize)...")
             try:
                 await self.telegram_app.initialize()
@@ -230,95 +578,250 @@ class AnimatorStatusBot:
                 logger.critical(f"КРИТИЧЕСКАЯ ОШИБКА ПРИ ПОПЫТКЕ ЛЕНИВОЙ ИНИЦИАЛИЗАЦИИ TELEGRAM: {e}", exc_info=True)
                 raise RuntimeError("Failed to initialize Telegram Application on first use") from e
 
-    async def process_update(self, update_json: Dict):
-        """Обрабатывает JSON обновления, убедившись, что приложение инициализировано."""
-        logger.debug(f"Начало process_update для JSON: {update_json}")
+    async def process_update(self, update_json: Dict, inline_slot: Optional[InlineReplySlot] = None):
+        """
+        Обрабатывает JSON обновления, убедившись, что приложение инициализировано.
+        inline_slot — место для ответа в теле вебхука (режим WEBHOOK_INLINE_REPLY).
+        """
+        logger.debug("Начало process_update для JSON: %s", update_json, extra={'sample': 'process_update'})
+
+        # Telegram повторяет доставку при медленном ответе: дубли отсекаем до любой работы
+        update_id = update_json.get('update_id')
+        if isinstance(update_id, int) and await self.deduplicator.is_duplicate(update_id):
+            logger.info("Повторная доставка update_id=%s отброшена.", update_id,
+                        extra={'update_id': update_id, 'sample': 'duplicate_update'})
+            return
+
         await self._ensure_initialized()
 
         update = None
         try:
+            started = time.perf_counter()
             update = Update.de_json(update_json, self.telegram_app.bot)
-            logger.debug(f"Update успешно десериализован. update_id={update.update_id}. Передача в telegram_app...")
+            observe_stage('de_json', started)
+            logger.debug("Update успешно десериализован. update_id=%s. Передача в telegram_app...", update.update_id,
+                         extra={'sample': 'de_json'})
         except Exception as de_json_err:
              logger.error(f"Ошибка десериализации Update.de_json: {de_json_err}", exc_info=True)
              return # Не продолжаем, если не смогли разобрать обновление
 
         if update:
+             token = current_slot.set(inline_slot)
+             started = time.perf_counter()
              try:
                  await self.telegram_app.process_update(update)
-                 logger.debug("Обновление успешно передано в telegram_app.process_update (дальнейшая обработка в хендлерах)")
+                 logger.debug("Обновление успешно передано в telegram_app.process_update (дальнейшая обработка в хендлерах)",
+                              extra={'sample': 'dispatch'})
              except Exception as ptb_process_err:
                   logger.error(f"Ошибка внутри telegram_app.process_update (вероятно, из callback-функции): {ptb_process_err}", exc_info=True)
                   # Не перевыбрасываем ошибку из колбэка
+             finally:
+                 current_slot.reset(token)
+                 observe_stage('dispatch', started)
 
 
-# --- ГЛОБАЛЬНЫЕ ЭКЗЕМПЛЯРЫ И ASGI/WSGI ПРИЛОЖЕНИЯ ---
+# --- ГЛОБАЛЬНЫЕ ЭКЗЕМПЛЯРЫ И ASGI ПРИЛОЖЕНИЕ ---
 logger.info("Создание глобального экземпляра AnimatorStatusBot...")
 try:
     bot_instance = AnimatorStatusBot()
+    atexit.register(bot_instance.shutdown)
     logger.info("Глобальный экземпляр AnimatorStatusBot успешно создан.")
 except Exception as e:
     logger.critical(f"КРИТИЧЕСКАЯ ОШИБКА ПРИ СОЗДАНИИ ЭКЗЕМПЛЯРА БОТА: {e}", exc_info=True)
     bot_instance = None
 
-logger.info("Создание экземпляра Flask (WSGI)...")
-flask_app = Flask(__name__)
-logger.info("Экземпляр Flask создан.")
-
-logger.info("Создание ASGI обертки (WsgiToAsgi) для Flask...")
-asgi_app = WsgiToAsgi(flask_app)
-logger.info("ASGI обертка создана.")
-
-# --- МАРШРУТЫ FLASK ---
-@flask_app.route('/webhook', methods=['POST'])
-async def webhook():
-    """Обработчик вебхука Telegram."""
-    # logger.info("===== ВХОД В ФУНКЦИЮ /webhook =====") # Убрали самый первый лог
+logger.info("Создание ASGI приложения...")
+asgi_app = ASGIApp()
+update_pool = UpdateWorkerPool(
+    bot_instance.process_update if bot_instance else None,
+    concurrency=Config.WEBHOOK_CONCURRENCY,
+    max_queue_size=Config.WEBHOOK_QUEUE_SIZE,
+)
+logger.info("ASGI приложение создано.")
+
+def _queue_depths() -> Dict:
+    """Глубина очередей для animator_queue_depth (снимается при каждом запросе /metrics)."""
+    depths = {('updates',): update_pool.stats()['queue_depth']}
+    if bot_instance is not None:
+        depths[('sqlite',)] = bot_instance.storage.stats()['queue_depth']
+        depths[('sinks_in_flight',)] = bot_instance.sinks.stats()['in_flight']
+        if bot_instance.sheets_syncer:
+            depths[('sheets_outbox',)] = bot_instance.sheets_syncer.stats()['queue_depth']
+        if bot_instance.outbound:
+            depths[('outbound',)] = bot_instance.outbound.stats()['pending']
+    return depths
+
+QUEUE_DEPTH.add_source(_queue_depths)
+
+async def on_startup():
+    if bot_instance is not None:
+        update_pool.start()
+        # Не блокируем запуск: getMe уйдет в фоне
+        asyncio.get_running_loop().create_task(bot_instance.warm_up())
+
+async def on_shutdown():
+    await update_pool.stop()
+    if bot_instance is not None:
+        if bot_instance.outbound:
+            await bot_instance.outbound.drain(timeout=10)
+        await bot_instance.sinks.drain(timeout=10)
+        bot_instance.shutdown()
+
+asgi_app.on_startup.append(on_startup)
+asgi_app.on_shutdown.append(on_shutdown)
+
+# --- МАРШРУТЫ ---
+@asgi_app.route('/webhook', methods=['POST'])
+async def webhook(request: Request) -> Response:
+    """Вебхук с замером длительности и счетчиком ответов по коду."""
+    started = time.perf_counter()
+    response = await _webhook(request)
+    observe_stage('webhook', started)
+    WEBHOOK_RESPONSES_TOTAL.inc(code=response.status)
+    return response
+
+async def _webhook(request: Request) -> Response:
+    """
+    Обработчик вебхука Telegram: проверяет обновление, ставит его в очередь
+    и сразу отвечает 200. Если очередь заполнена — 503, Telegram повторит доставку.
+    С WEBHOOK_INLINE_REPLY ждет обработки (до WEBHOOK_INLINE_TIMEOUT) и возвращает
+    подтверждение как вызов sendMessage в теле ответа.
+    """
     worker_pid = os.getpid()
-    logger.debug(f"[Worker {worker_pid}] Входящий запрос на /webhook ({request.method}) от {request.remote_addr}")
-    # logger.debug(f"[Worker {worker_pid}] Заголовки запроса: {request.headers}") # Убрали лог заголовков
+    logger.debug("[Worker %s] Входящий запрос на /webhook (%s) от %s", worker_pid, request.method, request.remote_addr,
+                 extra={'sample': 'webhook_received'})
 
     if bot_instance is None:
          logger.error(f"[Worker {worker_pid}] /webhook: Экземпляр бота не был создан!")
-         return 'Internal Server Error: Bot instance not available', 500
-    if request.method == "POST":
-        update_json = None
-        try:
-            # logger.info(f"[Worker {worker_pid}] /webhook: Попытка получить JSON из запроса...") # Убрали
-            update_json = request.get_json(force=True)
-            if not update_json:
-                 logger.warning(f"[Worker {worker_pid}] /webhook: Пустой JSON.")
-                 return 'Bad Request: Empty JSON', 400
-
-            # logger.info(f"[Worker {worker_pid}] /webhook: JSON получен, вызов bot_instance.process_update...") # Убрали
-            await bot_instance.process_update(update_json)
-            # logger.info(f"[Worker {worker_pid}] /webhook: bot_instance.process_update ЗАВЕРШЕН.") # Убрали
-            # Успешный ответ вернется, если не было исключений
-            return 'OK', 200
-        except json.JSONDecodeError as json_err:
-             raw_data = request.get_data(as_text=True)
-             logger.error(f"[Worker {worker_pid}] /webhook: Ошибка декодирования JSON: {json_err}. Сырые данные (начало): {raw_data[:500]}")
-             return 'Bad Request: Invalid JSON', 400
-        except RuntimeError as rt_err:
-             if "Failed to initialize Telegram Application" in str(rt_err) or "Application was not initialized" in str(rt_err):
-                  logger.exception(f"[Worker {worker_pid}] /webhook: КРИТИЧЕСКАЯ ОШИБКА - Не удалось инициализировать приложение Telegram: {rt_err}")
-                  return 'Internal Server Error - TG App Initialization Failed', 500
-             else:
-                  logger.exception(f"[Worker {worker_pid}] /webhook: Неожиданная ошибка RuntimeError: {rt_err}")
-                  return 'Internal Server Error', 500
-        except Exception as e:
-            logger.exception(f"[Worker {worker_pid}] /webhook: Критическая ошибка обработки: {e}")
-            return 'Internal Server Error', 500
-    else:
-        logger.warning(f"[Worker {worker_pid}] /webhook: Недопустимый метод {request.method}")
-        abort(405)
-
-@flask_app.route('/')
-def health_check():
+         return Response('Internal Server Error: Bot instance not available', status=500)
+
+    try:
+        update_json = request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError) as json_err:
+         logger.error(f"[Worker {worker_pid}] /webhook: Ошибка декодирования JSON: {json_err}. Сырые данные (начало): {request.body[:500]!r}")
+         return Response('Bad Request: Invalid JSON', status=400)
+    if not update_json:
+         logger.warning(f"[Worker {worker_pid}] /webhook: Пустой JSON.")
+         return Response('Bad Request: Empty JSON', status=400)
+    if not isinstance(update_json, dict) or not isinstance(update_json.get('update_id'), int):
+         logger.warning(f"[Worker {worker_pid}] /webhook: JSON не похож на обновление Telegram (нет update_id).")
+         return Response('Bad Request: Not a Telegram update', status=400)
+
+    inline_slot = InlineReplySlot() if Config.WEBHOOK_INLINE_REPLY else None
+    if not update_pool.submit(update_json, inline_slot):
+         logger.error(f"[Worker {worker_pid}] /webhook: Очередь обновлений заполнена, update_id={update_json['update_id']} отклонен.")
+         return Response('Service Unavailable: update queue is full', status=503, headers={'retry-after': '1'})
+    if inline_slot is not None:
+        payload = await inline_slot.wait(Config.WEBHOOK_INLINE_TIMEOUT)
+        if payload:
+            return json_response(payload)
+    return Response('OK', status=200)
+
+def _require_token(request: Request) -> Optional[Response]:
+    """
+    Служебные маршруты с данными артистов — только с Authorization: Bearer <EXPORT_TOKEN>.
+    None — доступ разрешен; без EXPORT_TOKEN маршруты выключены (404).
+    """
+    if not Config.EXPORT_TOKEN:
+        return Response('Not Found', status=404)
+    scheme, _, token = request.headers.get('authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not hmac.compare_digest(token.strip().encode(), Config.EXPORT_TOKEN.encode()):
+        return Response('Unauthorized', status=401, headers={'www-authenticate': 'Bearer'})
+    return None
+
+@asgi_app.route('/')
+async def health_check(request: Request) -> Response:
     """Простой health check."""
     logger.debug("Запрос на / (health check)")
     bot_status = "created" if bot_instance else "NOT CREATED"
-    return f"OK - Bot service is running (Bot instance: {bot_status})", 200
+    return Response(f"OK - Bot service is running (Bot instance: {bot_status})", status=200)
+
+@asgi_app.route('/ready')
+async def readiness_check(request: Request) -> Response:
+    """
+    Проверка готовности (в отличие от / — проверки живости).
+    503, пока не готовы SQLite и Telegram; Google Sheets обязательны только при READY_REQUIRES_SHEETS.
+    """
+    if bot_instance is None:
+        return json_response({'ready': False, 'error': 'Bot instance not available'}, status=503)
+    components = bot_instance.readiness()
+    ready = components['sqlite'] == 'ready' and components['telegram'] == 'ready'
+    if Config.READY_REQUIRES_SHEETS:
+        ready = ready and components['google_sheets'] != 'connecting'
+    return json_response({'ready': ready, **components}, status=200 if ready else 503)
+
+@asgi_app.route('/stats')
+async def stats(request: Request) -> Response:
+    """Счетчики очередей и фоновых писателей (глубина очереди, тайминги отправок). Без токена, как /metrics."""
+    if bot_instance is None:
+        return json_response({'error': 'Bot instance not available'}, status=500)
+    return json_response({'updates': update_pool.stats(), **bot_instance.stats()})
+
+@asgi_app.route('/report')
+async def report(request: Request) -> Response:
+    """Отчет за день в JSON: /report?date=ГГГГ-ММ-ДД (по умолчанию сегодня по Москве). С токеном EXPORT_TOKEN."""
+    denied = _require_token(request)
+    if denied:
+        return denied
+    if bot_instance is None:
+        return json_response({'error': 'Bot instance not available'}, status=500)
+    today = datetime.now(ZoneInfo("Europe/Moscow")).date()
+    try:
+        day = parse_report_date(request.query.get('date'), today)
+    except ValueError as e:
+        return json_response({'error': str(e)}, status=400)
+    return json_response(await bot_instance.get_report(day))
+
+@asgi_app.route('/metrics')
+async def metrics(request: Request) -> Response:
+    """Метрики в текстовом формате Prometheus: этапы обработки, статусы, ошибки хранилищ, очереди."""
+    return Response(REGISTRY.render(), status=200, content_type=CONTENT_TYPE)
+
+@asgi_app.route('/board')
+async def board(request: Request) -> Response:
+    """Табло текущих статусов в JSON. С токеном EXPORT_TOKEN."""
+    denied = _require_token(request)
+    if denied:
+        return denied
+    if bot_instance is None:
+        return json_response({'error': 'Bot instance not available'}, status=500)
+    return json_response({'artists': bot_instance.get_board()})
+
+@asgi_app.route('/export')
+async def export(request: Request) -> Response:
+    """
+    Потоковая выгрузка истории: /export?format=csv|ndjson&from=...&to=...&artist=...
+    Только с заголовком Authorization: Bearer <EXPORT_TOKEN>.
+    """
+    denied = _require_token(request)
+    if denied:
+        return denied
+    if bot_instance is None:
+        return json_response({'error': 'Bot instance not available'}, status=500)
+
+    fmt = request.query.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return json_response({'error': f"format: {', '.join(EXPORT_FORMATS)}"}, status=400)
+    today = datetime.now(ZoneInfo("Europe/Moscow")).date()
+    try:
+        export_filters = {
+            'date_from': parse_report_date(request.query['from'], today) if request.query.get('from') else None,
+            'date_to': parse_report_date(request.query['to'], today) if request.query.get('to') else None,
+            'chunk_rows': Config.EXPORT_CHUNK_ROWS,
+        }
+    except ValueError as e:
+        return json_response({'error': str(e)}, status=400)
+    artist = request.query.get('artist')
+    if artist:
+        export_filters['user_ids'] = artist_user_ids(bot_instance.artists, artist)
+        export_filters['username'] = artist
+
+    filename = f"statuses.{fmt}"
+    return StreamingResponse(
+        stream_export(bot_instance.storage.connect, fmt, bot_instance.resolve_artist_name, **export_filters),
+        content_type=EXPORT_FORMATS[fmt],
+        headers={'content-disposition': f'attachment; filename="{filename}"', 'cache-control': 'no-store'},
+    )
 
 # --- ТОЧКА ВХОДА ДЛЯ ЛОКАЛЬНОГО ЗАПУСКА (ЧЕРЕЗ POLLING) ---
 def main_local():
@@ -334,4 +837,6 @@ if __name__ == '__main__':
      main_local()
 
 # --- ТОЧКА ВХОДА ДЛЯ RENDER (UVICORN) ---
-# uvicorn bot.main:asgi_app --host 0.0.0.0 --port $PORT --workers 1
+# uvicorn bot.main:asgi_app --host 0.0.0.0 --port $PORT --workers $WEB_CONCURRENCY
+# Каждый воркер создает свои Application, клиент Google Sheets и соединения SQLite;
+# запись в SQLite согласуется через WAL и busy_timeout, отправки в Sheets — через SHEETS_LOCK_PATH.
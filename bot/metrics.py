@@ -0,0 +1,176 @@
+# Файл: bot/metrics.py
+"""
+Метрики в текстовом формате Prometheus без внешних зависимостей.
+
+Запись — счетчик под коротким локом и bisect по границам корзин, единицы
+микросекунд, поэтому метрики включены всегда. Значения свои у каждого воркера
+uvicorn (как и /stats): при нескольких воркерах /metrics отдает данные того
+процесса, который принял запрос.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Секунды: от долей миллисекунды (разбор, поиск статуса) до секунд (Google Sheets)
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence, extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(labels.get(name, '') for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """Значение снимается при каждом запросе /metrics функцией-источником: {значения меток: число}."""
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._sources: List[Callable[[], Dict[Tuple, float]]] = []
+
+    def add_source(self, source: Callable[[], Dict[Tuple, float]]):
+        self._sources.append(source)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for source in self._sources:
+            try:
+                values = source()
+            except Exception:
+                continue  # Источник недоступен (например, еще не запущен) — просто без значения
+            for key, value in sorted(values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, List] = {}  # ключ -> [счетчики корзин..., +Inf, сумма]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Этапы: de_json, dispatch, extract_status, sqlite_commit, sheets_append, reply,
+# webhook (HTTP-обработчик), queue_wait и update_total (от приема вебхука до конца обработки)
+STAGE_SECONDS: Histogram = REGISTRY.register(Histogram(
+    'animator_stage_duration_seconds', 'Длительность этапов обработки обновления.', ['stage']))
+SINK_WRITE_SECONDS: Histogram = REGISTRY.register(Histogram(
+    'animator_sink_write_duration_seconds', 'Длительность записи статуса в хранилище.', ['sink']))
+STATUSES_TOTAL: Counter = REGISTRY.register(Counter(
+    'animator_statuses_total', 'Распознанные статусы по типу.', ['status']))
+SINK_ERRORS_TOTAL: Counter = REGISTRY.register(Counter(
+    'animator_sink_errors_total', 'Ошибки хранилищ статусов.', ['sink', 'kind']))
+WEBHOOK_RESPONSES_TOTAL: Counter = REGISTRY.register(Counter(
+    'animator_webhook_responses_total', 'Ответы вебхука по HTTP-коду.', ['code']))
+QUEUE_DEPTH: Gauge = REGISTRY.register(Gauge(
+    'animator_queue_depth', 'Глубина внутренних очередей.', ['queue']))
+
+
+def observe_stage(stage: str, started: float, now: Optional[float] = None):
+    """Записывает этап, начатый в момент started (time.perf_counter())."""
+    STAGE_SECONDS.observe((time.perf_counter() if now is None else now) - started, stage=stage)
@@ -0,0 +1,226 @@
+# Файл: bot/outbound.py
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from telegram.error import BadRequest, NetworkError, RetryAfter
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_LENGTH = 4096  # Ограничение Telegram на длину сообщения
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity про запас."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: Optional[float] = None) -> float:
+        """Секунд до следующего токена (0 — можно отправлять)."""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> bool:
+        if self.wait_time() > 0:
+            return False
+        self.tokens -= 1
+        return True
+
+    def pause(self, seconds: float):
+        """Telegram вернул 429: ничего не отправляем seconds секунд."""
+        self.paused_until = time.monotonic() + seconds
+        self.tokens = 0
+
+    def is_idle(self, now: float) -> bool:
+        """Ведро полное и без паузы — не отличается от нового."""
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.paused_until
+
+
+@dataclass
+class _Confirmation:
+    fragment: str  # "Егор: в пути" — для объединенного сообщения
+    text: str  # Полный текст, если подтверждение уходит одно
+    reply_to_message_id: Optional[int]
+
+
+@dataclass
+class _ChatQueue:
+    bucket: TokenBucket
+    pending: Deque[_Confirmation] = field(default_factory=deque)
+    task: Optional[asyncio.Task] = None
+    failures: int = 0  # Сетевых ошибок подряд для первой пачки в очереди
+
+
+SendMessage = Callable[[int, str, Optional[int]], Awaitable[None]]
+
+
+class OutboundScheduler:
+    """
+    Исходящие подтверждения с ограничением частоты на каждый чат.
+
+    У каждого чата свое ведро токенов (Telegram пропускает около 20 сообщений
+    в минуту в группу). Пока токена нет, подтверждения копятся и уходят одним
+    сообщением: "✅ Егор: в пути, Настя: на месте". На 429 чат ставится на паузу
+    retry_after, подтверждения остаются в очереди — обработчики сообщений не ждут.
+    Сетевая ошибка или таймаут — до max_retries повторов с паузой retry_delay, x2;
+    после этого (или сразу при BadRequest) пачка отбрасывается. Чаты без очереди
+    и с полным ведром раз в idle_sweep_interval удаляются из памяти.
+    """
+
+    def __init__(self, send_message: SendMessage, rate_per_minute: float = 20, burst: float = 3,
+                 coalesce_delay: float = 0.3, max_retries: int = 3, retry_delay: float = 1.0,
+                 idle_sweep_interval: float = 60.0):
+        self.send_message = send_message
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.coalesce_delay = coalesce_delay
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.idle_sweep_interval = idle_sweep_interval
+        self._chats: Dict[int, _ChatQueue] = {}
+        self._last_sweep = time.monotonic()
+        self._retried = 0
+        self._evicted = 0
+        self._submitted = 0
+        self._messages = 0
+        self._coalesced = 0
+        self._retry_after = 0
+        self._failed = 0
+
+    def _chat(self, chat_id: int) -> _ChatQueue:
+        self._evict_idle()
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = _ChatQueue(TokenBucket(self.rate, self.burst))
+        return chat
+
+    def _evict_idle(self):
+        """Удаляет чаты без очереди и отправки, у которых ведро успело наполниться."""
+        now = time.monotonic()
+        if now - self._last_sweep < self.idle_sweep_interval:
+            return
+        self._last_sweep = now
+        idle = [chat_id for chat_id, chat in self._chats.items()
+                if not chat.pending and (chat.task is None or chat.task.done()) and chat.bucket.is_idle(now)]
+        for chat_id in idle:
+            del self._chats[chat_id]
+        self._evicted += len(idle)
+
+    def try_acquire(self, chat_id: int) -> bool:
+        """Берет токен для отправки в обход очереди (ответ в теле вебхука), если очередь чата пуста."""
+        chat = self._chat(chat_id)
+        if chat.pending:
+            return False
+        if chat.bucket.take():
+            self._submitted += 1
+            self._messages += 1
+            return True
+        return False
+
+    def submit(self, chat_id: int, fragment: str, text: str, reply_to_message_id: Optional[int] = None):
+        """Ставит подтверждение в очередь чата и сразу возвращается."""
+        chat = self._chat(chat_id)
+        chat.pending.append(_Confirmation(fragment, text, reply_to_message_id))
+        self._submitted += 1
+        if chat.task is None or chat.task.done():
+            chat.task = asyncio.get_running_loop().create_task(self._drain_chat(chat_id, chat), name=f"outbound-{chat_id}")
+
+    async def drain(self, timeout: Optional[float] = None):
+        """Ждет отправки накопленного (перед остановкой процесса)."""
+        tasks = [chat.task for chat in self._chats.values() if chat.task and not chat.task.done()]
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+
+    def stats(self) -> Dict:
+        return {
+            'chats': len(self._chats),
+            'pending': sum(len(chat.pending) for chat in self._chats.values()),
+            'submitted': self._submitted,
+            'messages': self._messages,
+            'coalesced': self._coalesced,
+            'retry_after': self._retry_after,
+            'retried': self._retried,
+            'failed': self._failed,
+            'evicted_chats': self._evicted,
+        }
+
+    async def _drain_chat(self, chat_id: int, chat: _ChatQueue):
+        # Короткая пауза собирает подтверждения, пришедшие почти одновременно
+        await asyncio.sleep(self.coalesce_delay)
+        while chat.pending:
+            wait = chat.bucket.wait_time()
+            if wait > 0:
+                await asyncio.sleep(wait)  # Тем временем копятся новые подтверждения
+                continue
+            chat.bucket.take()
+            batch = self._take_batch(chat.pending)
+            if len(batch) == 1:
+                text, reply_to = batch[0].text, batch[0].reply_to_message_id
+            else:
+                text, reply_to = "✅ " + ", ".join(item.fragment for item in batch), None
+            try:
+                await self.send_message(chat_id, text, reply_to)
+            except RetryAfter as e:
+                self._retry_after += 1
+                logger.warning(f"Telegram ограничил отправку в чат {chat_id}: пауза {e.retry_after}s, в очереди {len(chat.pending) + len(batch)}.")
+                chat.bucket.pause(float(e.retry_after))
+                chat.pending.extendleft(reversed(batch))
+                continue
+            except BadRequest as e:
+                # Повтор не поможет (например, чат недоступен)
+                chat.failures = 0
+                self._failed += 1
+                logger.error(f"Telegram отклонил подтверждение в чат {chat_id} ({len(batch)} шт.): {e}")
+                continue
+            except NetworkError as e:
+                # В том числе TimedOut: сообщение, скорее всего, не дошло — повторяем
+                chat.failures += 1
+                if chat.failures <= self.max_retries:
+                    self._retried += 1
+                    delay = self.retry_delay * (2 ** (chat.failures - 1))
+                    logger.warning(f"Сетевая ошибка при отправке в чат {chat_id}: {e}; повтор {chat.failures}/{self.max_retries} через {delay:.1f}s.")
+                    chat.bucket.pause(delay)
+                    chat.pending.extendleft(reversed(batch))
+                    continue
+                chat.failures = 0
+                self._failed += 1
+                logger.error(f"Подтверждение в чат {chat_id} ({len(batch)} шт.) не отправлено после {self.max_retries} повторов: {e}")
+                continue
+            except Exception as e:
+                chat.failures = 0
+                self._failed += 1
+                logger.error(f"Ошибка отправки подтверждения в чат {chat_id} ({len(batch)} шт.): {e}", exc_info=True)
+                continue
+            chat.failures = 0
+            self._messages += 1
+            self._coalesced += len(batch) - 1
+
+    @staticmethod
+    def _take_batch(pending: Deque[_Confirmation]) -> List[_Confirmation]:
+        """Забирает из очереди столько подтверждений, сколько помещается в одно сообщение."""
+        batch = [pending.popleft()]
+        length = len("✅ ") + len(batch[0].fragment)
+        while pending and length + 2 + len(pending[0].fragment) <= MAX_MESSAGE_LENGTH:
+            item = pending.popleft()
+            length += 2 + len(item.fragment)
+            batch.append(item)
+        return batch
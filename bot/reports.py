@@ -0,0 +1,189 @@
+# Файл: bot/reports.py
+
+import logging
+import sqlite3
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Статусы, между которыми считаются длительности
+EN_ROUTE = 'в пути'
+ARRIVED = 'на месте'
+FINISHED = 'закончил'
+
+
+def init_report_schema(conn: sqlite3.Connection):
+    """Индексы для отчетов и дневная сводка, которая обновляется на каждой вставке."""
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_statuses_user_ts ON statuses (user_id, timestamp)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_statuses_ts ON statuses (timestamp)')
+    conn.execute('''CREATE TABLE IF NOT EXISTS daily_summary (
+        day TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        username TEXT,
+        first_at TEXT,
+        last_at TEXT,
+        last_status TEXT,
+        en_route_since TEXT,
+        arrived_since TEXT,
+        travel_seconds REAL NOT NULL DEFAULT 0,
+        onsite_seconds REAL NOT NULL DEFAULT 0,
+        trips INTEGER NOT NULL DEFAULT 0,
+        visits INTEGER NOT NULL DEFAULT 0,
+        statuses_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, user_id)
+    )''')
+    conn.commit()
+
+    # Разовое заполнение сводки для базы, созданной до ее появления.
+    # IMMEDIATE и повторная проверка внутри: воркеры стартуют одновременно.
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        has_summary = conn.execute('SELECT 1 FROM daily_summary LIMIT 1').fetchone()
+        has_statuses = conn.execute('SELECT 1 FROM statuses LIMIT 1').fetchone()
+        if has_statuses and not has_summary:
+            logger.info("Заполнение daily_summary по истории statuses...")
+            rows = conn.execute('SELECT user_id, username, status, timestamp FROM statuses ORDER BY timestamp').fetchall()
+            for user_id, username, status, timestamp in rows:
+                update_daily_summary(conn, user_id, username, status, timestamp)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def update_daily_summary(conn: sqlite3.Connection, user_id: int, username: Optional[str], status: str, timestamp: str):
+    """
+    Учитывает один статус в дневной сводке (вызывается в транзакции вставки).
+    Поездка: от первого "в пути" до следующего "на месте"; работа: от "на месте" до "закончил".
+    Незакрытые к полуночи поездка и работа делятся по границе дня (см. _carry_over).
+    """
+    day = timestamp[:10]  # Время хранится по Москве, дата — первые 10 символов
+    row = conn.execute(
+        'SELECT first_at, en_route_since, arrived_since, travel_seconds, onsite_seconds, trips, visits, statuses_count '
+        'FROM daily_summary WHERE day = ? AND user_id = ?', (day, user_id)
+    ).fetchone()
+    if row:
+        first_at, en_route_since, arrived_since, travel, onsite, trips, visits, count = row
+    else:
+        first_at, en_route_since, arrived_since, travel, onsite, trips, visits, count = timestamp, None, None, 0.0, 0.0, 0, 0, 0
+        en_route_since, arrived_since = _carry_over(conn, user_id, day, timestamp)
+
+    if status == EN_ROUTE:
+        en_route_since = en_route_since or timestamp
+    elif status == ARRIVED:
+        if en_route_since:
+            travel += _seconds_between(en_route_since, timestamp)
+            trips += 1
+            en_route_since = None
+        arrived_since = arrived_since or timestamp
+    elif status == FINISHED:
+        if arrived_since:
+            onsite += _seconds_between(arrived_since, timestamp)
+            visits += 1
+            arrived_since = None
+
+    conn.execute(
+        'INSERT OR REPLACE INTO daily_summary (day, user_id, username, first_at, last_at, last_status, en_route_since, '
+        'arrived_since, travel_seconds, onsite_seconds, trips, visits, statuses_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        (day, user_id, username, first_at, timestamp, status, en_route_since, arrived_since, travel, onsite, trips, visits, count + 1)
+    )
+
+
+def _carry_over(conn: sqlite3.Connection, user_id: int, day: str, timestamp: str):
+    """
+    Первый статус дня: если накануне поездка или работа остались открытыми,
+    предыдущему дню засчитывается время до 24:00, а новый день продолжает их с 00:00.
+    Возвращает (en_route_since, arrived_since) для нового дня. Интервалы, открытые
+    раньше чем накануне, не переносятся: это забытый статус, а не ночная смена.
+    """
+    previous_day = (date.fromisoformat(day) - timedelta(days=1)).isoformat()
+    row = conn.execute(
+        'SELECT en_route_since, arrived_since, travel_seconds, onsite_seconds FROM daily_summary WHERE day = ? AND user_id = ?',
+        (previous_day, user_id)
+    ).fetchone()
+    if not row or not (row[0] or row[1]):
+        return None, None
+    en_route_since, arrived_since, travel, onsite = row
+    midnight = datetime.fromisoformat(timestamp).replace(hour=0, minute=0, second=0, microsecond=0).isoformat(sep=' ')
+    if en_route_since:
+        travel += _seconds_between(en_route_since, midnight)
+    if arrived_since:
+        onsite += _seconds_between(arrived_since, midnight)
+    conn.execute(
+        'UPDATE daily_summary SET en_route_since = NULL, arrived_since = NULL, travel_seconds = ?, onsite_seconds = ? '
+        'WHERE day = ? AND user_id = ?', (travel, onsite, previous_day, user_id)
+    )
+    return (midnight if en_route_since else None), (midnight if arrived_since else None)
+
+
+def _seconds_between(start: str, end: str) -> float:
+    return max(0.0, (datetime.fromisoformat(end) - datetime.fromisoformat(start)).total_seconds())
+
+
+def build_report(conn: sqlite3.Connection, day: date, resolve_name: Callable[[int, Optional[str]], str]) -> Dict:
+    """
+    Отчет за день: хронология статусов каждого артиста и длительности из daily_summary.
+    Хронология читается по индексу timestamp (statuses_all — вместе с архивом),
+    длительности — по первичному ключу сводки.
+    """
+    day_str = day.isoformat()
+    next_day_str = (day + timedelta(days=1)).isoformat()
+    artists: Dict[int, Dict] = {}
+
+    for row in conn.execute(
+        'SELECT user_id, username, travel_seconds, onsite_seconds, trips, visits, last_status, first_at '
+        'FROM daily_summary WHERE day = ? ORDER BY first_at', (day_str,)
+    ):
+        user_id, username, travel, onsite, trips, visits, last_status, _ = row
+        artists[user_id] = {
+            'user_id': user_id,
+            'name': resolve_name(user_id, username),
+            'travel_minutes': round(travel / 60, 1),
+            'onsite_minutes': round(onsite / 60, 1),
+            'trips': trips,
+            'visits': visits,
+            'last_status': last_status,
+            'timeline': [],
+        }
+
+    for user_id, status, timestamp in conn.execute(
+        'SELECT user_id, status, timestamp FROM statuses_all WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp',
+        (day_str, next_day_str)
+    ):
+        if user_id in artists:
+            artists[user_id]['timeline'].append({'status': status, 'time': timestamp[11:19]})
+
+    return {'date': day_str, 'artists': list(artists.values())}
+
+
+def format_report_text(report: Dict) -> str:
+    """Текст отчета для Telegram."""
+    day = datetime.strptime(report['date'], '%Y-%m-%d').strftime('%d.%m.%Y')
+    if not report['artists']:
+        return f"📋 Отчет за {day}: статусов нет."
+    lines: List[str] = [f"📋 Отчет за {day}"]
+    for artist in report['artists']:
+        timeline = ', '.join(f"{item['time'][:5]} {item['status']}" for item in artist['timeline'])
+        lines.append(f"\n👤 {artist['name']}: {timeline}")
+        lines.append(f"   в дороге {_format_minutes(artist['travel_minutes'])} ({artist['trips']}), "
+                     f"на месте {_format_minutes(artist['onsite_minutes'])} ({artist['visits']})")
+    return '\n'.join(lines)
+
+
+def _format_minutes(minutes: float) -> str:
+    hours, mins = divmod(int(round(minutes)), 60)
+    return f"{hours} ч {mins} мин" if hours else f"{mins} мин"
+
+
+def parse_report_date(value: Optional[str], today: date) -> date:
+    """Дата из аргумента: ДД.ММ.ГГГГ или ГГГГ-ММ-ДД, по умолчанию сегодня. ValueError при ошибке."""
+    if not value:
+        return today
+    for fmt in ('%d.%m.%Y', '%Y-%m-%d', '%d.%m'):
+        try:
+            parsed = datetime.strptime(value.strip(), fmt).date()
+        except ValueError:
+            continue
+        return parsed.replace(year=today.year) if fmt == '%d.%m' else parsed
+    raise ValueError(f"Не удалось разобрать дату '{value}'")
@@ -0,0 +1,202 @@
+# Файл: bot/retention.py
+"""
+Хранение истории SQLite: старые статусы переезжают в архивную базу.
+
+Основная таблица statuses (и ее индексы, которые обновляются на каждой
+вставке) держит только последние SQLITE_RETENTION_DAYS дней, остальное
+переносится в отдельный файл SQLITE_ARCHIVE_PATH. Внутри бота освободившиеся
+страницы возвращаются короткими шагами PRAGMA incremental_vacuum (база в режиме
+auto_vacuum=INCREMENTAL): писатель ждет не дольше одного шага. Полный VACUUM
+держит блокировку записи все время работы, поэтому выполняется только из
+командной строки; заодно он переводит старую базу в auto_vacuum=INCREMENTAL. Архив подключается к каждому соединению StatusStorage
+(ATTACH ... AS archive), а временное представление statuses_all объединяет
+обе таблицы — отчеты и сверка с листом читают его и видят всю историю.
+
+Переносятся только строки, уже отправленные в Google Sheets (или без строки
+в sheets_outbox); их строки outbox удаляются вместе с ними. Последний статус
+каждого пользователя остается в основной таблице, сколько бы ему ни было:
+табло (bot.board) собирается только из нее. daily_summary не трогается:
+длительности в отчетах по-прежнему берутся из нее.
+
+Запуск: python -m bot.retention [--keep-days 90] [--no-vacuum] [--dry-run]
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+STATUS_COLUMNS = 'id, user_id, username, status, timestamp'
+
+
+def active_archive_path(archive_path: Optional[str], retention_days: int) -> Optional[str]:
+    """
+    Архив, который надо подключать: при включенном переносе (retention_days > 0)
+    или если файл уже есть (перенос выключили, а история осталась в архиве).
+    Иначе None — соединения не создают лишний файл и читают только statuses.
+    """
+    if archive_path and (retention_days > 0 or os.path.exists(archive_path)):
+        return archive_path
+    return None
+
+
+def attach_archive(conn: sqlite3.Connection, archive_path: Optional[str]):
+    """
+    Подключает архив (создает при необходимости) и временное представление
+    statuses_all. Без archive_path statuses_all — просто statuses.
+    """
+    if not archive_path:
+        conn.execute(f'CREATE TEMP VIEW IF NOT EXISTS statuses_all AS SELECT {STATUS_COLUMNS} FROM main.statuses')
+        return
+    conn.execute('ATTACH DATABASE ? AS archive', (archive_path,))
+    conn.execute('PRAGMA archive.journal_mode = WAL')
+    # id сохраняется: sheets_outbox и табло ссылаются на строки по нему
+    conn.execute('''CREATE TABLE IF NOT EXISTS archive.statuses (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, username TEXT, status TEXT NOT NULL, timestamp DATETIME NOT NULL)''')
+    conn.execute('CREATE INDEX IF NOT EXISTS archive.idx_archive_statuses_ts ON statuses (timestamp)')
+    conn.commit()
+    # Фильтры по timestamp проталкиваются в обе части UNION ALL и идут по индексам
+    conn.execute(f'''CREATE TEMP VIEW IF NOT EXISTS statuses_all AS
+        SELECT {STATUS_COLUMNS} FROM main.statuses UNION ALL SELECT {STATUS_COLUMNS} FROM archive.statuses''')
+
+
+def _has_archive(conn: sqlite3.Connection) -> bool:
+    return any(row[1] == 'archive' for row in conn.execute('PRAGMA database_list'))
+
+
+# Старые, уже отправленные в таблицу и не последние у своего пользователя
+# (более новая строка ищется по индексу (user_id, timestamp))
+ARCHIVABLE_WHERE = (
+    "s.timestamp < ? AND COALESCE(o.state, 'synced') = 'synced' "
+    "AND EXISTS (SELECT 1 FROM main.statuses n WHERE n.user_id = s.user_id "
+    "AND (n.timestamp > s.timestamp OR (n.timestamp = s.timestamp AND n.id > s.id)))"
+)
+
+
+def _archivable_ids(conn: sqlite3.Connection, cutoff: str, limit: int) -> List[int]:
+    return [row[0] for row in conn.execute(
+        "SELECT s.id FROM main.statuses s LEFT JOIN sheets_outbox o ON o.status_id = s.id "
+        f"WHERE {ARCHIVABLE_WHERE} ORDER BY s.id LIMIT ?",
+        (cutoff, limit)
+    )]
+
+
+def archive_statuses(conn: sqlite3.Connection, cutoff: str, batch_size: int = 500) -> int:
+    """
+    Переносит статусы старше cutoff (ГГГГ-ММ-ДД) в архив пачками. Возвращает число строк.
+
+    Копирование и удаление — отдельные транзакции: в режиме WAL транзакция над
+    двумя файлами не атомарна целиком. Сбой между ними оставит копию в архиве,
+    а повторный запуск (INSERT OR IGNORE по id) просто удалит оригинал.
+    """
+    if not _has_archive(conn):
+        raise RuntimeError("Архив не подключен: укажите SQLITE_ARCHIVE_PATH.")
+    moved = 0
+    while True:
+        ids = _archivable_ids(conn, cutoff, batch_size)
+        if not ids:
+            return moved
+        placeholders = ','.join('?' * len(ids))
+        with conn:
+            conn.execute(f'INSERT OR IGNORE INTO archive.statuses ({STATUS_COLUMNS}) '
+                         f'SELECT {STATUS_COLUMNS} FROM main.statuses WHERE id IN ({placeholders})', ids)
+        with conn:
+            # Короткая транзакция на пачку: писатель бота ждет не дольше нее
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(f'DELETE FROM sheets_outbox WHERE status_id IN ({placeholders})', ids)
+            conn.execute(f'DELETE FROM main.statuses WHERE id IN ({placeholders}) '
+                         f'AND id IN (SELECT id FROM archive.statuses WHERE id IN ({placeholders}))', ids + ids)
+        moved += len(ids)
+
+
+def count_archivable(conn: sqlite3.Connection, cutoff: str) -> int:
+    return conn.execute(
+        "SELECT COUNT(*) FROM main.statuses s LEFT JOIN sheets_outbox o ON o.status_id = s.id "
+        f"WHERE {ARCHIVABLE_WHERE}", (cutoff,)
+    ).fetchone()[0]
+
+
+def reclaim_pages(conn: sqlite3.Connection, pages_per_step: int = 256) -> int:
+    """
+    Возвращает ОС свободные страницы основной базы шагами по pages_per_step, каждый —
+    отдельная короткая транзакция. Без auto_vacuum=INCREMENTAL ничего не делает. Возвращает число страниц.
+    """
+    if conn.execute('PRAGMA main.auto_vacuum').fetchone()[0] != 2:
+        return 0
+    reclaimed = 0
+    while True:
+        free = conn.execute('PRAGMA main.freelist_count').fetchone()[0]
+        if not free:
+            return reclaimed
+        # executescript доводит прагму до конца; execute освободил бы одну страницу
+        conn.executescript(f'PRAGMA main.incremental_vacuum({int(pages_per_step)})')
+        reclaimed += min(free, pages_per_step)
+
+
+def apply_retention(conn: sqlite3.Connection, keep_days: int, today: date, vacuum: bool = False,
+                    batch_size: int = 500, dry_run: bool = False) -> Dict:
+    """
+    Переносит в архив статусы старше keep_days дней и возвращает освободившееся место:
+    vacuum=True — полным VACUUM (только вне бота), иначе шагами incremental_vacuum.
+    """
+    cutoff = (today - timedelta(days=keep_days)).isoformat()
+    result = {'cutoff': cutoff, 'archived': 0, 'vacuumed': False, 'reclaimed_pages': 0, 'duration_ms': 0.0}
+    started = time.perf_counter()
+    if dry_run:
+        result['archived'] = count_archivable(conn, cutoff)
+        return result
+    result['archived'] = archive_statuses(conn, cutoff, batch_size)
+    if vacuum and result['archived']:
+        # Освобожденные страницы возвращаются ОС, индексы statuses перестраиваются плотно;
+        # смена auto_vacuum у существующей базы вступает в силу как раз при VACUUM
+        conn.execute('PRAGMA main.auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM main')
+        conn.execute('PRAGMA main.wal_checkpoint(TRUNCATE)')
+        result['vacuumed'] = True
+    elif result['archived']:
+        result['reclaimed_pages'] = reclaim_pages(conn)
+    result['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from bot.config import Config
+    from bot.storage import StatusStorage, init_schema
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--keep-days', type=int, default=Config.SQLITE_RETENTION_DAYS,
+                        help='сколько дней оставлять в основной таблице')
+    parser.add_argument('--no-vacuum', action='store_true',
+                        help='без полного VACUUM: место возвращается шагами incremental_vacuum, как внутри бота')
+    parser.add_argument('--dry-run', action='store_true', help='только посчитать строки для переноса')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.keep_days <= 0 or not Config.SQLITE_ARCHIVE_PATH:
+        logger.error("Нужны --keep-days > 0 и SQLITE_ARCHIVE_PATH.")
+        return 2
+
+    storage = StatusStorage(Config.DATABASE_PATH, busy_timeout_ms=Config.SQLITE_BUSY_TIMEOUT_MS,
+                            archive_path=Config.SQLITE_ARCHIVE_PATH)
+    conn = storage.connect()
+    try:
+        init_schema(conn)
+        result = apply_retention(conn, args.keep_days, datetime.now(ZoneInfo("Europe/Moscow")).date(),
+                                 vacuum=not args.no_vacuum, dry_run=args.dry_run)
+    finally:
+        conn.close()
+    verb = 'к переносу' if args.dry_run else 'перенесено'
+    logger.info(f"Статусов до {result['cutoff']} {verb}: {result['archived']} "
+                f"(VACUUM: {'да' if result['vacuumed'] else 'нет'}, освобождено страниц: {result['reclaimed_pages']}, "
+                f"{result['duration_ms']} мс).")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,272 @@
+# Файл: bot/sheets_backfill.py
+"""
+Сверка SQLite с листом Google Sheets и догрузка недостающих строк.
+
+Лист читается одним запросом, недостающие строки отправляются пачками по
+SHEETS_BACKFILL_BATCH_SIZE (один append_rows на пачку), поэтому догрузка
+после дня простоя — несколько запросов к API. Найденные и догруженные строки
+отмечаются в sheets_outbox как synced, чтобы фоновая синхронизация их не повторила.
+
+Строки сравниваются по (дата, имя, статус, время) с текущим именем из карты
+артистов, а оставшиеся — без имени, по (дата, статус, время): строки, записанные
+до переименования артиста в справочнике, не считаются недостающими и не дублируются.
+При листах по месяцам (SHEETS_MONTHLY_WORKSHEETS) каждый статус сверяется с листом
+своего месяца и со строками того же месяца в основном листе, куда писалось до
+включения листов по месяцам, — уже лежащая там история повторно не отправляется.
+Статусы из архива SQLite (bot.retention) тоже участвуют в сверке, но в sheets_outbox
+не записываются: их строки outbox retention уже удалил. Листы при
+сверке только читаются: лист месяца создается, лишь когда в него есть что догрузить,
+а с --dry-run в таблице ничего не меняется.
+
+Запуск: python -m bot.sheets_backfill [--from ДД.ММ.ГГГГ] [--to ДД.ММ.ГГГГ] [--batch-size 1000] [--dry-run]
+"""
+
+import argparse
+import logging
+import sqlite3
+import sys
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from bot.config import Config
+
+logger = logging.getLogger(__name__)
+
+MOSCOW_TZ = ZoneInfo("Europe/Moscow")
+
+
+def _normalize_cell(value: str) -> str:
+    """Приводит дату и время к виду, в котором их пишет format_status_row (таблица может убрать ведущие нули)."""
+    value = (value or '').strip()
+    for fmt, out in (('%d.%m.%Y', '%d.%m.%Y'), ('%H:%M:%S', '%H:%M:%S')):
+        try:
+            return datetime.strptime(value, fmt).strftime(out)
+        except ValueError:
+            continue
+    return value
+
+
+def row_key(row: Iterable[str]) -> Tuple[str, ...]:
+    return tuple(_normalize_cell(str(cell)) for cell in list(row)[:4])
+
+
+def find_missing(db_rows: List[Tuple[int, List[str]]], sheet_rows: List[List[str]]) -> Tuple[List[Tuple[int, List[str]]], List[int]]:
+    """
+    Делит строки базы (status_id, строка листа) на недостающие в листе и уже присутствующие.
+    Сравнение как мультимножеств: два одинаковых статуса в одну секунду — две строки.
+    Сначала совпадение целиком, затем среди оставшихся строк листа — без имени артиста:
+    так находятся строки, записанные под прежним именем, а чужие строки с тем же
+    временем и статусом уже разобраны первым проходом.
+    """
+    in_sheet = Counter(row_key(row) for row in sheet_rows)
+    unmatched, present = [], []
+    for status_id, row in db_rows:
+        key = row_key(row)
+        if in_sheet[key] > 0:
+            in_sheet[key] -= 1
+            present.append(status_id)
+        else:
+            unmatched.append((status_id, row))
+    without_name = Counter()
+    for key, count in in_sheet.items():
+        if count > 0:
+            without_name[_without_name(key)] += count
+    missing = []
+    for status_id, row in unmatched:
+        key = _without_name(row_key(row))
+        if without_name[key] > 0:
+            without_name[key] -= 1
+            present.append(status_id)
+        else:
+            missing.append((status_id, row))
+    return missing, present
+
+
+def _without_name(key: Tuple[str, ...]) -> Tuple[str, ...]:
+    return key[:1] + key[2:]
+
+
+def group_legacy_rows(sheet_rows: List[List[str]], worksheet_name_for: Callable) -> Dict[Optional[str], List[List[str]]]:
+    """Строки основного листа по листам месяцев (по колонке даты); заголовок и строки без даты пропускаются."""
+    groups: Dict[Optional[str], List[List[str]]] = {}
+    for row in sheet_rows:
+        try:
+            moment = datetime.strptime(str(row[0]).strip(), '%d.%m.%Y')
+        except (IndexError, ValueError):
+            continue
+        groups.setdefault(worksheet_name_for(moment), []).append(row)
+    return groups
+
+
+def load_db_rows(conn: sqlite3.Connection, resolve_name: Callable, format_row: Callable,
+                 date_from: Optional[date], date_to: Optional[date], lease_seconds: float,
+                 worksheet_name_for: Callable = lambda timestamp: None) -> Dict[Optional[str], List[Tuple[int, List[str]]]]:
+    """
+    Статусы за период (вместе с архивом), кроме тех, что прямо сейчас отправляет
+    фоновая синхронизация, по листам: {имя листа или None: [(status_id, строка листа)]}.
+    """
+    conditions, params = [], []
+    if date_from:
+        conditions.append('s.timestamp >= ?')
+        params.append(date_from.isoformat())
+    if date_to:
+        conditions.append('s.timestamp < ?')
+        params.append((date_to + timedelta(days=1)).isoformat())
+    conditions.append("NOT (COALESCE(o.state, '') = 'sending' AND o.claimed_at >= ?)")
+    params.append(time.time() - lease_seconds)
+    rows = conn.execute(
+        'SELECT s.id, s.user_id, s.username, s.status, s.timestamp FROM statuses_all s '
+        'LEFT JOIN sheets_outbox o ON o.status_id = s.id '
+        f"WHERE {' AND '.join(conditions)} ORDER BY s.timestamp, s.id",
+        params
+    ).fetchall()
+    groups: Dict[Optional[str], List[Tuple[int, List[str]]]] = {}
+    for status_id, user_id, username, status, timestamp in rows:
+        moment = datetime.fromisoformat(timestamp)
+        groups.setdefault(worksheet_name_for(moment), []).append(
+            (status_id, format_row(resolve_name(user_id, username), status, moment))
+        )
+    return groups
+
+
+def backfill(conn: sqlite3.Connection, sheets_manager, resolve_name: Callable, format_row: Callable,
+             date_from: Optional[date] = None, date_to: Optional[date] = None, batch_size: int = 1000,
+             lease_seconds: float = 300.0, process_lock=None, dry_run: bool = False) -> Dict:
+    """
+    Догружает в лист строки, которых там нет. Весь проход — под межпроцессной
+    блокировкой Sheets, а догружаемые строки захватываются в outbox ('sending'),
+    так что работающий бот их параллельно не отправит.
+    """
+    from contextlib import nullcontext
+    from bot.sheets_outbox import mark_synced
+
+    with process_lock or nullcontext():
+        # Листы читаются до транзакции: сеть не держит блокировку SQLite. Статусы,
+        # появившиеся после чтения, в лист попасть не могли — синхронизация ждет process_lock.
+        worksheets = load_db_rows(conn, resolve_name, format_row, date_from, date_to, lease_seconds,
+                                  sheets_manager.worksheet_name_for)
+        sheet_rows = {name: sheets_manager.get_all_rows(worksheet_name=name, create=False) for name in worksheets}
+        legacy_name = getattr(sheets_manager, 'partition_base', None)
+        if legacy_name and any(name is not None for name in worksheets):
+            # Месяцы, записанные до листов по месяцам, уже лежат в основном листе
+            legacy = group_legacy_rows(sheets_manager.get_all_rows(worksheet_name=legacy_name, create=False),
+                                       sheets_manager.worksheet_name_for)
+            for name, rows in legacy.items():
+                if name in sheet_rows:
+                    sheet_rows[name] = sheet_rows[name] + rows
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            worksheets = load_db_rows(conn, resolve_name, format_row, date_from, date_to, lease_seconds,
+                                      sheets_manager.worksheet_name_for)
+            missing: Dict[Optional[str], List[Tuple[int, List[str]]]] = {}
+            present: List[int] = []
+            for name, db_rows in worksheets.items():
+                missing[name], found = find_missing(db_rows, sheet_rows.get(name, []))
+                present.extend(found)
+            all_missing = [status_id for rows in missing.values() for status_id, _ in rows]
+            result = {'in_sheet': sum(len(rows) for rows in sheet_rows.values()),
+                      'in_db': sum(len(rows) for rows in worksheets.values()), 'present': len(present),
+                      'missing': len(all_missing), 'worksheets': len(worksheets), 'uploaded': 0, 'requests': 0}
+            if dry_run:
+                conn.rollback()
+                return result
+            now = time.time()
+            # В outbox только статусы основной базы: строки архивных retention удаляет,
+            # а синхронизация их не видит — такие остались бы pending навсегда
+            conn.execute('DELETE FROM sheets_outbox WHERE status_id NOT IN (SELECT id FROM main.statuses)')
+            conn.executemany("INSERT OR IGNORE INTO sheets_outbox (status_id) SELECT id FROM main.statuses WHERE id = ?",
+                             [(status_id,) for status_id in all_missing])
+            conn.executemany(
+                "UPDATE sheets_outbox SET state = 'sending', claimed_by = 'backfill', claimed_at = ? WHERE status_id = ?",
+                [(now, status_id) for status_id in all_missing]
+            )
+            conn.executemany("INSERT OR IGNORE INTO sheets_outbox (status_id, state) "
+                             "SELECT id, 'synced' FROM main.statuses WHERE id = ?",
+                             [(status_id,) for status_id in present])
+            mark_synced(conn, present)
+
+        uploaded_ids = set()
+        for name, rows in missing.items():
+            for start in range(0, len(rows), max(1, batch_size)):
+                chunk = rows[start:start + batch_size]
+                try:
+                    sheets_manager.append_rows([row for _, row in chunk], worksheet_name=name)
+                except Exception:
+                    with conn:
+                        # Остаток вернется фоновой синхронизации
+                        conn.executemany(
+                            "UPDATE sheets_outbox SET state = 'pending', claimed_by = NULL, next_attempt_at = 0 WHERE status_id = ?",
+                            [(status_id,) for status_id in all_missing if status_id not in uploaded_ids]
+                        )
+                    raise
+                with conn:
+                    mark_synced(conn, [status_id for status_id, _ in chunk])
+                uploaded_ids.update(status_id for status_id, _ in chunk)
+                result['uploaded'] += len(chunk)
+                result['requests'] += 1
+                logger.info(f"Догружено {result['uploaded']} из {len(all_missing)} строк.")
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from bot.artists import create_artist_directory
+    from bot.google_sheets import GoogleSheetsManager, load_credentials_from_env
+    from bot.locks import InterProcessLock
+    from bot.reports import parse_report_date
+    from bot.retention import active_archive_path
+    from bot.storage import StatusStorage, init_schema
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--from', dest='date_from', help='с даты (ДД.ММ.ГГГГ или ГГГГ-ММ-ДД)')
+    parser.add_argument('--to', dest='date_to', help='по дату включительно')
+    parser.add_argument('--batch-size', type=int, default=Config.SHEETS_BACKFILL_BATCH_SIZE)
+    parser.add_argument('--dry-run', action='store_true', help='только посчитать недостающие строки')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    today = datetime.now(MOSCOW_TZ).date()
+    try:
+        date_from = parse_report_date(args.date_from, today) if args.date_from else None
+        date_to = parse_report_date(args.date_to, today) if args.date_to else None
+        credentials = load_credentials_from_env()
+    except ValueError as e:
+        logger.error(str(e))
+        return 2
+
+    lock = InterProcessLock(Config.SHEETS_LOCK_PATH)
+    manager = GoogleSheetsManager(credentials_dict=credentials, timeout=Config.SHEETS_HTTP_TIMEOUT)
+    spreadsheet = manager.open_spreadsheet(Config.GOOGLE_SHEETS_SPREADSHEET_NAME)
+    if Config.SHEETS_MONTHLY_WORKSHEETS and spreadsheet:
+        manager.use_monthly_worksheets(Config.GOOGLE_SHEETS_WORKSHEET_NAME)  # Листы месяцев откроются при сверке
+    elif not spreadsheet or not manager.create_or_get_worksheet(spreadsheet, Config.GOOGLE_SHEETS_WORKSHEET_NAME, process_lock=lock):
+        logger.error("Не удалось открыть лист Google Sheets.")
+        return 1
+
+    artists = create_artist_directory(Config.ARTISTS_SOURCE, get_sheets_manager=lambda: manager,
+                                      worksheet_name=Config.ARTISTS_WORKSHEET_NAME)
+    artists.reload()
+
+    conn = StatusStorage(Config.DATABASE_PATH, busy_timeout_ms=Config.SQLITE_BUSY_TIMEOUT_MS,
+                         archive_path=active_archive_path(Config.SQLITE_ARCHIVE_PATH, Config.SQLITE_RETENTION_DAYS)).connect()
+    try:
+        init_schema(conn)
+        result = backfill(
+            conn, manager,
+            resolve_name=artists.resolve,
+            format_row=GoogleSheetsManager.format_status_row,
+            date_from=date_from, date_to=date_to, batch_size=args.batch_size,
+            lease_seconds=Config.SHEETS_CLAIM_LEASE, process_lock=lock, dry_run=args.dry_run,
+        )
+    finally:
+        conn.close()
+    logger.info(f"Строк в листе: {result['in_sheet']}, статусов в базе: {result['in_db']}, "
+                f"листов: {result['worksheets']}, уже в листе: {result['present']}, недостает: {result['missing']}, "
+                f"догружено: {result['uploaded']} за {result['requests']} запросов.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,341 @@
+# Файл: bot/sheets_outbox.py
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from bot.metrics import SINK_ERRORS_TOTAL, STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def init_outbox_schema(conn: sqlite3.Connection):
+    """
+    Очередь отправки в Google Sheets: по строке на статус с состоянием синхронизации.
+    pending -> sending (захвачена воркером) -> synced; при ошибке снова pending с паузой.
+    """
+    conn.execute('''CREATE TABLE IF NOT EXISTS sheets_outbox (
+        status_id INTEGER PRIMARY KEY REFERENCES statuses (id),
+        state TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at REAL NOT NULL DEFAULT 0,
+        claimed_by TEXT,
+        claimed_at REAL,
+        synced_at REAL,
+        last_error TEXT
+    )''')
+    # Синхронизированных строк подавляющее большинство — индексируем только остальные
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_unsynced ON sheets_outbox (next_attempt_at) WHERE state != 'synced'")
+    conn.commit()
+
+
+def mark_synced(conn: sqlite3.Connection, status_ids: List[int]):
+    now = time.time()
+    conn.executemany(
+        "UPDATE sheets_outbox SET state = 'synced', synced_at = ?, claimed_by = NULL, last_error = NULL WHERE status_id = ?",
+        [(now, status_id) for status_id in status_ids]
+    )
+
+
+class SheetsOutboxSyncer:
+    """
+    Фоновая отправка в Google Sheets из таблицы sheets_outbox.
+
+    Статус попадает в outbox в той же транзакции, что и в statuses, поэтому
+    ни сбой Google, ни перезапуск не теряют строк. Поток забирает пачку
+    (BEGIN IMMEDIATE — воркеры не захватят одно и то же), отправляет ее одним
+    append_rows и отмечает synced; при ошибке строки возвращаются в pending
+    с экспоненциальной паузой. Если включены листы по месяцам, пачка делится
+    по листам — по запросу на каждый месяц в пачке.
+
+    Захват живет lease_seconds: строки упавшего воркера забирает другой. Поэтому
+    перед append_rows, уже под process_lock, захват проверяется и продлевается —
+    строки, которые за время ожидания перезахватили или отправили, пропускаются.
+    Запрос к API ограничен таймаутом (SHEETS_HTTP_TIMEOUT) меньше lease_seconds.
+    Остается окно "хотя бы один раз": если процесс упадет между append_rows и
+    отметкой synced или таймаут сработает после того, как Google уже принял
+    строки, после истечения захвата они уйдут повторно; такие дубли находит
+    и не догружает заново только сверка bot.sheets_backfill.
+    """
+
+    def __init__(self, storage, sheets_manager, resolve_name: Callable, format_row: Callable,
+                 batch_size: int = 50, flush_interval: float = 5.0, poll_interval: float = 30.0,
+                 retry_min: float = 5.0, retry_max: float = 600.0, lease_seconds: float = 300.0,
+                 process_lock=None):
+        self.storage = storage
+        self.sheets_manager = sheets_manager
+        self.resolve_name = resolve_name
+        self.format_row = format_row
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval)
+        self.poll_interval = poll_interval
+        self.retry_min = retry_min
+        self.retry_max = retry_max
+        self.lease_seconds = lease_seconds
+        self.process_lock = process_lock
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"  # pid может достаться перезапущенному процессу
+
+        self._cond = threading.Condition()
+        self._notified = 0
+        self._first_notified_at: Optional[float] = None
+        self._flush_waiters: List[threading.Event] = []
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+        self._lock = threading.Lock()
+        self._backlog = 0
+        self._flushes = 0
+        self._failed_flushes = 0
+        self._flushed_rows = 0
+        self._last_flush_size = 0
+        self._last_flush_duration = 0.0
+        self._max_flush_duration = 0.0
+        self._total_flush_duration = 0.0
+        self._last_flush_at: Optional[float] = None
+        self._last_error: Optional[str] = None
+
+    def start(self):
+        """Запускает фоновый поток (повторный вызов ничего не делает)."""
+        with self._cond:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="sheets-outbox", daemon=True)
+            self._thread.start()
+        logger.info(f"Синхронизация outbox -> Google Sheets запущена (batch_size={self.batch_size}, flush_interval={self.flush_interval}s).")
+
+    def notify(self):
+        """Сообщает о новом статусе: пачка уйдет по размеру или по flush_interval."""
+        with self._cond:
+            self._notified += 1
+            if self._first_notified_at is None:
+                self._first_notified_at = time.monotonic()
+            self._cond.notify()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Просит немедленно отправить все готовое к отправке и ждет. True, если дождались."""
+        if not self._thread or not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        with self._cond:
+            self._flush_waiters.append(done)
+            self._cond.notify()
+        return done.wait(timeout)
+
+    def stop(self, timeout: Optional[float] = 30.0):
+        """Отправляет готовое и останавливает поток. Неотправленное остается в outbox."""
+        thread = self._thread
+        if not thread or not thread.is_alive():
+            return
+        logger.info(f"Остановка синхронизации Google Sheets, в outbox {self._backlog} строк...")
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.error("Синхронизация Google Sheets не успела завершиться за отведенное время.")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'queue_depth': self._backlog,
+                'flushes': self._flushes,
+                'failed_flushes': self._failed_flushes,
+                'flushed_rows': self._flushed_rows,
+                'last_flush_size': self._last_flush_size,
+                'last_flush_duration_ms': round(self._last_flush_duration * 1000, 2),
+                'max_flush_duration_ms': round(self._max_flush_duration * 1000, 2),
+                'avg_flush_duration_ms': round(self._total_flush_duration * 1000 / self._flushes, 2) if self._flushes else 0.0,
+                'last_flush_at': self._last_flush_at,
+                'last_error': self._last_error,
+                'batch_size': self.batch_size,
+                'flush_interval': self.flush_interval,
+            }
+
+    # --- Фоновый поток ---
+    def _run(self):
+        conn = self.storage.connect()
+        try:
+            while True:
+                with self._cond:
+                    self._wait_for_work()
+                    stopping = self._stopping
+                    waiters, self._flush_waiters = self._flush_waiters, []
+                    self._notified = 0
+                    self._first_notified_at = None
+                try:
+                    self._drain(conn)
+                except sqlite3.Error as e:
+                    logger.error(f"Ошибка чтения outbox Google Sheets: {e}")
+                except Exception as e:
+                    # Поток не должен умирать: захваченное вернется по истечении lease_seconds
+                    logger.error(f"Неожиданная ошибка синхронизации outbox Google Sheets: {e}", exc_info=True)
+                for waiter in waiters:
+                    waiter.set()
+                if stopping:
+                    return
+        finally:
+            conn.close()
+
+    def _wait_for_work(self):
+        """Ждет (под self._cond): стоп, flush, полная пачка, истекший flush_interval или период опроса."""
+        poll_deadline = time.monotonic() + self.poll_interval
+        while not self._stopping and not self._flush_waiters:
+            now = time.monotonic()
+            if self._notified >= self.batch_size:
+                return
+            if self._first_notified_at is not None:
+                deadline = self._first_notified_at + self.flush_interval
+            else:
+                deadline = poll_deadline  # Повторы после ошибок и строки других воркеров
+            if now >= deadline:
+                return
+            self._cond.wait(deadline - now)
+
+    def _drain(self, conn: sqlite3.Connection):
+        while True:
+            claimed = self._claim(conn)
+            if not claimed:
+                break
+            if not self._send(conn, claimed) or len(claimed) < self.batch_size:
+                break
+        self._update_backlog(conn)
+
+    def _claim(self, conn: sqlite3.Connection) -> List[tuple]:
+        now = time.time()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute(
+                "SELECT o.status_id, s.user_id, s.username, s.status, s.timestamp FROM sheets_outbox o "
+                "JOIN statuses s ON s.id = o.status_id "
+                "WHERE o.state != 'synced' AND ((o.state = 'pending' AND o.next_attempt_at <= ?) "
+                "OR (o.state = 'sending' AND o.claimed_at < ?)) "
+                "ORDER BY o.status_id LIMIT ?",
+                (now, now - self.lease_seconds, self.batch_size)
+            ).fetchall()
+            conn.executemany(
+                "UPDATE sheets_outbox SET state = 'sending', claimed_by = ?, claimed_at = ? WHERE status_id = ?",
+                [(self.owner, now, row[0]) for row in rows]
+            )
+        return rows
+
+    def _send(self, conn: sqlite3.Connection, claimed: List[tuple]) -> bool:
+        grouped, failed = self._group_by_worksheet(claimed)
+        for status_id, error in failed:
+            self._release(conn, [status_id], error)
+        groups = list(grouped.items())
+        for index, (worksheet_name, (status_ids, sheet_rows)) in enumerate(groups):
+            if not self._send_group(conn, worksheet_name, status_ids, sheet_rows):
+                # Остальные листы пачки не ждут истечения захвата, а сразу возвращаются в pending
+                self._release(conn, [status_id for _, (ids, _) in groups[index + 1:] for status_id in ids], None)
+                return False
+        return True
+
+    def _group_by_worksheet(self, claimed: List[tuple]) -> Tuple[Dict[Optional[str], tuple], List[Tuple[int, str]]]:
+        """
+        Строки пачки по листам: {имя листа или None: (status_id, строки листа)} и
+        [(status_id, ошибка)] для строк, которые не удалось подготовить, — они
+        уходят на повтор с паузой по одной и не мешают остальной пачке.
+        """
+        groups: Dict[Optional[str], tuple] = {}
+        failed: List[Tuple[int, str]] = []
+        for status_id, user_id, username, status, timestamp in claimed:
+            try:
+                moment = datetime.fromisoformat(timestamp)
+                worksheet_name = self.sheets_manager.worksheet_name_for(moment)
+                row = self.format_row(self.resolve_name(user_id, username), status, moment)
+            except Exception as e:
+                logger.error(f"Строка outbox {status_id} не подготовлена для Google Sheets, повтор с паузой: {e}", exc_info=True)
+                SINK_ERRORS_TOTAL.inc(sink='google_sheets', kind='row')
+                failed.append((status_id, f"{type(e).__name__}: {e}"))
+                continue
+            status_ids, sheet_rows = groups.setdefault(worksheet_name, ([], []))
+            status_ids.append(status_id)
+            sheet_rows.append(row)
+        return groups, failed
+
+    def _release(self, conn: sqlite3.Connection, status_ids: List[int], error: Optional[str]):
+        """
+        Возвращает строки в pending: после ошибки (error) — с паузой, иначе сразу.
+        Только пока они захвачены этим воркером — чужой захват не сбрасывается.
+        """
+        if not status_ids:
+            return
+        with conn:
+            if error is None:
+                conn.executemany(
+                    "UPDATE sheets_outbox SET state = 'pending', claimed_by = NULL "
+                    "WHERE status_id = ? AND state = 'sending' AND claimed_by = ?",
+                    [(status_id, self.owner) for status_id in status_ids]
+                )
+                return
+            conn.executemany(
+                "UPDATE sheets_outbox SET state = 'pending', claimed_by = NULL, attempts = attempts + 1, "
+                "next_attempt_at = ? + MIN(? * (1 << MIN(attempts, 20)), ?), last_error = ? "
+                "WHERE status_id = ? AND state = 'sending' AND claimed_by = ?",
+                [(time.time(), self.retry_min, self.retry_max, error[:500], status_id, self.owner) for status_id in status_ids]
+            )
+
+    def _renew_claim(self, conn: sqlite3.Connection, status_ids: List[int]) -> List[int]:
+        """
+        Продлевает захват строк и возвращает те, что все еще за этим воркером.
+        Пока ждали process_lock, захват мог истечь: тогда строки перезахватил
+        другой воркер (claimed_by) или уже отправил (state = 'synced').
+        """
+        now = time.time()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            return [status_id for status_id in status_ids if conn.execute(
+                "UPDATE sheets_outbox SET claimed_at = ? WHERE status_id = ? AND state = 'sending' AND claimed_by = ?",
+                (now, status_id, self.owner)
+            ).rowcount]
+
+    def _send_group(self, conn: sqlite3.Connection, worksheet_name: Optional[str],
+                    status_ids: List[int], sheet_rows: List[List[str]]) -> bool:
+        started = time.perf_counter()
+        try:
+            with self.process_lock or nullcontext():
+                owned = set(self._renew_claim(conn, status_ids))
+                if len(owned) < len(status_ids):
+                    logger.warning(f"Захват {len(status_ids) - len(owned)} строк outbox истек и перешел к другому воркеру, "
+                                   f"они не отправляются повторно.")
+                    sheet_rows = [row for status_id, row in zip(status_ids, sheet_rows) if status_id in owned]
+                    status_ids = [status_id for status_id in status_ids if status_id in owned]
+                if not status_ids:
+                    return True
+                self.sheets_manager.append_rows(sheet_rows, worksheet_name=worksheet_name)
+        except Exception as e:
+            with self._lock:
+                self._failed_flushes += 1
+                self._last_error = str(e)
+            SINK_ERRORS_TOTAL.inc(sink='google_sheets', kind='append')
+            logger.error(f"Ошибка пакетной записи {len(sheet_rows)} строк в Google Sheets, повтор с паузой: {e}", exc_info=True)
+            self._release(conn, status_ids, str(e))
+            return False
+        duration = time.perf_counter() - started
+        STAGE_SECONDS.observe(duration, stage='sheets_append')
+        with conn:
+            mark_synced(conn, status_ids)
+        with self._lock:
+            self._flushes += 1
+            self._flushed_rows += len(sheet_rows)
+            self._last_flush_size = len(sheet_rows)
+            self._last_flush_duration = duration
+            self._max_flush_duration = max(self._max_flush_duration, duration)
+            self._total_flush_duration += duration
+            self._last_flush_at = time.time()
+            self._last_error = None
+        logger.info(f"В Google Sheets{f' ({worksheet_name})' if worksheet_name else ''} отправлено "
+                    f"{len(sheet_rows)} строк одним запросом за {duration * 1000:.1f} мс.")
+        return True
+
+    def _update_backlog(self, conn: sqlite3.Connection):
+        backlog = conn.execute("SELECT COUNT(*) FROM sheets_outbox WHERE state != 'synced'").fetchone()[0]
+        with self._lock:
+            self._backlog = backlog
@@ -0,0 +1,156 @@
+# Файл: bot/sinks.py
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from bot.metrics import SINK_ERRORS_TOTAL, SINK_WRITE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class StatusEvent:
+    """Распознанный статус, который раздается всем хранилищам."""
+    user_id: int
+    username: Optional[str]
+    artist_name: str
+    status: str
+    timestamp: datetime  # Время по Москве, с часовым поясом
+
+
+class StatusSink:
+    """
+    Базовый класс хранилища статусов.
+    durable=True — ответ пользователю ждет подтверждения от этого хранилища.
+    """
+    name = 'sink'
+    durable = False
+
+    def __init__(self, timeout: float = 5.0):
+        self.timeout = timeout
+
+    async def write(self, event: StatusEvent):
+        raise NotImplementedError
+
+
+class SQLiteSink(StatusSink):
+    """Локальная база: подтверждение приходит после фиксации транзакции."""
+    name = 'sqlite'
+    durable = True
+
+    def __init__(self, storage, timeout: float = 5.0):
+        super().__init__(timeout)
+        self.storage = storage
+
+    async def write(self, event: StatusEvent):
+        future = self.storage.submit(event.user_id, event.username, event.status, event.timestamp)
+        # shield: таймаут ожидания не должен отменять уже поставленную вставку
+        await asyncio.shield(asyncio.wrap_future(future))
+
+
+class GoogleSheetsSink(StatusSink):
+    """
+    Google Sheets через outbox в SQLite: строку в sheets_outbox ставит транзакция
+    вставки статуса, здесь только будим фоновую синхронизацию.
+    """
+    name = 'google_sheets'
+
+    def __init__(self, syncer, timeout: float = 2.0):
+        super().__init__(timeout)
+        self.syncer = syncer
+
+    async def write(self, event: StatusEvent):
+        self.syncer.notify()
+
+
+class JsonlSink(StatusSink):
+    """Необязательный журнал статусов: одна JSON-строка на статус."""
+    name = 'jsonl'
+
+    def __init__(self, path: str, timeout: float = 2.0):
+        super().__init__(timeout)
+        self.path = path
+        self._lock = threading.Lock()
+
+    async def write(self, event: StatusEvent):
+        line = json.dumps({
+            'user_id': event.user_id,
+            'username': event.username,
+            'artist_name': event.artist_name,
+            'status': event.status,
+            'timestamp': event.timestamp.isoformat(),
+        }, ensure_ascii=False)
+        await asyncio.to_thread(self._append, line)
+
+    def _append(self, line: str):
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+
+class SinkPipeline:
+    """
+    Раздает событие всем хранилищам одновременно, у каждого свой таймаут,
+    ошибка одного не мешает остальным. dispatch() возвращается, как только
+    ответили надежные (durable) хранилища; остальные дописывают в фоне.
+    """
+
+    def __init__(self, sinks: List[StatusSink]):
+        self.sinks = sinks
+        self._background: Set[asyncio.Task] = set()
+        self.errors: Counter = Counter()
+        self.timeouts: Counter = Counter()
+        self.written: Counter = Counter()
+
+    async def dispatch(self, event: StatusEvent) -> bool:
+        """True, если все надежные хранилища подтвердили запись."""
+        durable = []
+        for sink in self.sinks:
+            task = asyncio.create_task(self._write(sink, event), name=f"sink-{sink.name}")
+            if sink.durable:
+                durable.append(task)
+            else:
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+        if not durable:
+            return True
+        results = await asyncio.gather(*durable)
+        return all(results)
+
+    async def drain(self, timeout: Optional[float] = None):
+        """Ждет фоновые записи (перед остановкой процесса)."""
+        if self._background:
+            await asyncio.wait(set(self._background), timeout=timeout)
+
+    def stats(self) -> Dict:
+        return {
+            'sinks': [sink.name for sink in self.sinks],
+            'written': dict(self.written),
+            'errors': dict(self.errors),
+            'timeouts': dict(self.timeouts),
+            'in_flight': len(self._background),
+        }
+
+    async def _write(self, sink: StatusSink, event: StatusEvent) -> bool:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(sink.write(event), sink.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts[sink.name] += 1
+            SINK_ERRORS_TOTAL.inc(sink=sink.name, kind='timeout')
+            logger.error(f"Хранилище '{sink.name}' не ответило за {sink.timeout}s (user_id={event.user_id}, статус '{event.status}').")
+            return False
+        except Exception as e:
+            self.errors[sink.name] += 1
+            SINK_ERRORS_TOTAL.inc(sink=sink.name, kind='error')
+            logger.error(f"Ошибка записи в хранилище '{sink.name}' (user_id={event.user_id}, статус '{event.status}'): {e}", exc_info=True)
+            return False
+        self.written[sink.name] += 1
+        SINK_WRITE_SECONDS.observe(time.perf_counter() - started, sink=sink.name)
+        return True
@@ -0,0 +1,89 @@
+# Файл: bot/status_matcher.py
+
+import json
+import logging
+import re
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(text: str) -> str:
+    """Нижний регистр, ё -> е, пробелы схлопнуты — ключ для поиска алиаса."""
+    return ' '.join(text.lower().replace('ё', 'е').split())
+
+
+def _char_pattern(ch: str) -> str:
+    if ch == ' ':
+        return r'\s+'
+    if ch == 'е':
+        return '[её]'
+    return re.escape(ch)
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """
+    Регулярка-префиксное дерево: общие префиксы вынесены, поэтому на каждой
+    позиции текста движок отбрасывает неподходящее за один-два символа.
+    """
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def emit(node: Dict) -> str:
+        alternatives = [_char_pattern(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not alternatives:
+            return ''
+        body = alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return emit(trie)
+
+
+class StatusMatcher:
+    """
+    Распознавание статуса в тексте сообщения.
+
+    Все алиасы компилируются один раз в одну регулярку с границами слов.
+    Один проход finditer возвращает канонический статус первого найденного
+    алиаса, перед которым нет отрицания ("не на месте" не считается).
+    """
+
+    def __init__(self, statuses: Dict[str, List[str]], negations: Optional[List[str]] = None):
+        self.statuses = list(statuses)
+        self._canonical: Dict[str, str] = {}
+        for canonical, aliases in statuses.items():
+            for alias in [canonical, *aliases]:
+                self._canonical[_normalize(alias)] = canonical
+
+        negation_words = [_normalize(n) for n in negations or []]
+        self._has_negations = bool(negation_words)
+        negation_part = rf'(?:(?P<neg>{_trie_pattern(negation_words)})\s+)?' if negation_words else ''
+        # Дешевая проверка первой буквы отсекает большинство позиций до остальной регулярки
+        first_chars = {word[0] for word in [*self._canonical, *negation_words]}
+        if 'е' in first_chars:
+            first_chars.add('ё')
+        first_class = ''.join(re.escape(ch) for ch in sorted(first_chars))
+        self._pattern = re.compile(
+            rf'(?=[{first_class}])(?<!\w){negation_part}(?P<alias>{_trie_pattern(self._canonical)})(?!\w)'
+        )
+
+    @classmethod
+    def from_file(cls, path: str) -> 'StatusMatcher':
+        with open(path, encoding='utf-8') as f:
+            config = json.load(f)
+        matcher = cls(config['statuses'], config.get('negations'))
+        logger.info(f"Загружены статусы из '{path}': {len(matcher.statuses)} статусов, {len(matcher._canonical)} алиасов")
+        return matcher
+
+    def match(self, text: str) -> Optional[str]:
+        if not text:
+            return None
+        for m in self._pattern.finditer(text.lower()):
+            if self._has_negations and m.group('neg'):
+                continue
+            return self._canonical.get(_normalize(m.group('alias')))
+        return None
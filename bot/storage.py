@@ -0,0 +1,212 @@
+# Файл: bot/storage.py
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, Optional
+
+from bot.metrics import SINK_ERRORS_TOTAL, STAGE_SECONDS
+from bot.reports import init_report_schema, update_daily_summary
+from bot.retention import attach_archive
+from bot.sheets_outbox import init_outbox_schema
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def _configure_connection(conn: sqlite3.Connection, busy_timeout_ms: int):
+    """Общие настройки соединения: WAL, ожидание блокировки, облегченный fsync."""
+    conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+    # Только для новой базы (до WAL и первых таблиц): место после переноса в архив
+    # возвращается короткими шагами incremental_vacuum, без VACUUM целиком
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+
+
+def init_schema(conn: sqlite3.Connection):
+    """Создает таблицы, если их еще нет."""
+    conn.execute('''CREATE TABLE IF NOT EXISTS statuses (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, username TEXT, status TEXT NOT NULL, timestamp DATETIME NOT NULL)''')
+    conn.commit()
+    init_report_schema(conn)
+    init_outbox_schema(conn)
+
+
+class StatusStorage:
+    """
+    Хранилище статусов в SQLite.
+
+    Одно долгоживущее соединение в режиме WAL принадлежит писательскому потоку.
+    Вставки копятся в очереди и фиксируются пачками в одной транзакции,
+    поэтому event loop не ждет ни открытия соединения, ни fsync.
+    С sheets_outbox=True в той же транзакции ставится строка в sheets_outbox.
+    archive_path — архив старых статусов (bot.retention), подключается к каждому соединению.
+    """
+
+    def __init__(self, path: str, batch_size: int = 200, busy_timeout_ms: int = 5000,
+                 max_queue_size: int = 100000, sheets_outbox: bool = False, archive_path: Optional[str] = None):
+        self.path = path
+        self.archive_path = archive_path
+        self.sheets_outbox = sheets_outbox
+        self.batch_size = max(1, batch_size)
+        self.busy_timeout_ms = busy_timeout_ms
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+        self._inserted = 0
+        self._failed = 0
+        self._commits = 0
+        self._last_commit_size = 0
+        self._last_commit_duration = 0.0
+        self._max_commit_duration = 0.0
+
+    def start(self):
+        """Создает схему (ошибки всплывают сразу) и запускает писательский поток."""
+        conn = self.connect()
+        try:
+            init_schema(conn)
+        finally:
+            conn.close()
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+            self._thread.start()
+        logger.info(f"Писатель SQLite '{self.path}' запущен (WAL, batch_size={self.batch_size}).")
+
+    def connect(self) -> sqlite3.Connection:
+        """Новое соединение с теми же настройками (для чтения из других потоков)."""
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, check_same_thread=False)
+        _configure_connection(conn, self.busy_timeout_ms)
+        attach_archive(conn, self.archive_path)
+        return conn
+
+    def submit(self, user_id: int, username: Optional[str], status: str, timestamp: datetime) -> Future:
+        """Ставит вставку в очередь. Future завершится id строки после фиксации транзакции."""
+        future: Future = Future()
+        future.add_done_callback(_log_failure)
+        params = (user_id, username, status, timestamp.isoformat(sep=' '))
+        try:
+            self._queue.put_nowait((params, future))
+        except queue.Full:
+            future.set_exception(RuntimeError(f"Очередь записи SQLite переполнена ({self._queue.maxsize})"))
+        return future
+
+    async def enqueue(self, user_id: int, username: Optional[str], status: str, timestamp: datetime) -> Future:
+        """Асинхронная обертка над submit: не ждет фиксации, только ставит запись в очередь."""
+        return self.submit(user_id, username, status, timestamp)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Ждет, пока все поставленные ранее вставки будут зафиксированы."""
+        if not self._thread or not self._thread.is_alive():
+            return False
+        marker: Future = Future()
+        self._queue.put((None, marker))
+        try:
+            marker.result(timeout)
+            return True
+        except Exception:
+            return False
+
+    def stop(self, timeout: Optional[float] = 30.0):
+        """Фиксирует остаток очереди и закрывает соединение."""
+        thread = self._thread
+        if not thread or not thread.is_alive():
+            return
+        logger.info(f"Остановка писателя SQLite, в очереди {self._queue.qsize()} записей...")
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.error("Писатель SQLite не успел завершиться за отведенное время.")
+
+    def is_running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'inserted': self._inserted,
+                'failed': self._failed,
+                'commits': self._commits,
+                'last_commit_size': self._last_commit_size,
+                'last_commit_duration_ms': round(self._last_commit_duration * 1000, 2),
+                'max_commit_duration_ms': round(self._max_commit_duration * 1000, 2),
+            }
+
+    # --- Писательский поток ---
+    def _run(self):
+        conn = self.connect()
+        try:
+            while True:
+                item = self._queue.get()
+                stop = item is _STOP
+                batch = [] if stop else [item]
+                # Забираем все, что успело накопиться, но не больше batch_size
+                while not stop and len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stop = True
+                        break
+                    batch.append(item)
+                if batch:
+                    self._write_batch(conn, batch)
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch):
+        started = time.perf_counter()
+        results = []
+        try:
+            with conn:
+                # IMMEDIATE: сводку читаем и пишем в одной транзакции, другие воркеры ждут busy_timeout
+                conn.execute('BEGIN IMMEDIATE')
+                cursor = conn.cursor()
+                for params, future in batch:
+                    if params is None:
+                        results.append((future, None))
+                        continue
+                    cursor.execute('INSERT INTO statuses (user_id, username, status, timestamp) VALUES (?, ?, ?, ?)', params)
+                    row_id = cursor.lastrowid
+                    results.append((future, row_id))
+                    update_daily_summary(conn, *params)
+                    if self.sheets_outbox:
+                        cursor.execute('INSERT INTO sheets_outbox (status_id) VALUES (?)', (row_id,))
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка пакетной записи {len(batch)} статусов в SQLite: {e}")
+            SINK_ERRORS_TOTAL.inc(sink='sqlite', kind='commit')
+            with self._lock:
+                self._failed += sum(1 for params, _ in batch if params is not None)
+            for _, future in batch:
+                if not future.cancelled():
+                    future.set_exception(e)
+            return
+        duration = time.perf_counter() - started
+        STAGE_SECONDS.observe(duration, stage='sqlite_commit')
+        inserted = sum(1 for _, row_id in results if row_id is not None)
+        with self._lock:
+            self._inserted += inserted
+            self._commits += 1
+            self._last_commit_size = inserted
+            self._last_commit_duration = duration
+            self._max_commit_duration = max(self._max_commit_duration, duration)
+        for future, row_id in results:
+            # Ожидающий мог отменить future по таймауту — строка все равно записана
+            if not future.cancelled():
+                future.set_result(row_id)
+
+
+def _log_failure(future: Future):
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"Статус не сохранен в SQLite: {future.exception()}")
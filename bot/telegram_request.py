@@ -0,0 +1,29 @@
+# Файл: bot/telegram_request.py
+
+from typing import Optional
+
+import httpx
+from telegram.request import HTTPXRequest
+
+
+class PooledHTTPXRequest(HTTPXRequest):
+    """
+    HTTPXRequest с настраиваемым keep-alive: в python-telegram-bot 20.3 число
+    keep-alive соединений всегда равно размеру пула, а время жизни — умолчанию httpx (5 с).
+    """
+    __slots__ = ('_limits',)
+
+    def __init__(self, connection_pool_size: int = 32, max_keepalive_connections: Optional[int] = None,
+                 keepalive_expiry: Optional[float] = 30.0, **kwargs):
+        # Лимиты нужны уже в конструкторе родителя: он сразу создает клиент через _build_client
+        self._limits = httpx.Limits(
+            max_connections=connection_pool_size,
+            max_keepalive_connections=connection_pool_size if max_keepalive_connections is None else max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        super().__init__(connection_pool_size=connection_pool_size, **kwargs)
+
+    def _build_client(self) -> httpx.AsyncClient:
+        # Единственный клиент; при повторном initialize() после shutdown() — с теми же лимитами
+        self._client_kwargs['limits'] = self._limits
+        return super()._build_client()
@@ -1,4 +1,142 @@
-from bot import main  # импортируем функцию main из bot/main.py
+# Файл: handler.py
+"""
+Точка входа для serverless (событие в стиле API Gateway: REST v1 и HTTP v2).
 
-def handler(event, context):
-    return main(event)
+Холодный старт: импорт bot.main (экземпляр бота, Telegram Application),
+хуки запуска ASGI-приложения и свой event loop. Все это живет в модуле и
+переиспользуется теплыми вызовами того же контейнера — Application, пул
+соединений Bot API и соединения SQLite не создаются заново. gspread и
+oauth2client импортируются только в фоновом подключении к таблице.
+
+Событие превращается в HTTP-запрос к тому же asgi_app, что и под uvicorn.
+Перед ответом вызов ждет обработки принятых обновлений и дописывания SQLite
+и outbox Google Sheets (SERVERLESS_FLUSH_TIMEOUT): после ответа платформа
+может заморозить процесс вместе с фоновыми потоками. Подтверждения уходят
+сразу (или в теле ответа), без очереди с ограничением частоты на чат: иначе
+с четвертого статуса подряд вызов ждал бы свободного токена секунды.
+
+Локальная проверка холодных и теплых вызовов: python -m scripts.serverless_sim
+"""
+
+import asyncio
+import base64
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+logger = logging.getLogger(__name__)
+
+
+class _WarmState:
+    """Все, что переживает вызов: event loop и объекты из bot.main."""
+
+    def __init__(self):
+        started = time.perf_counter()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        from bot.config import Config
+        from bot.main import asgi_app, bot_instance, update_pool  # Тяжелый импорт — один раз на контейнер
+        self.config = Config
+        self.asgi_app = asgi_app
+        self.bot = bot_instance
+        self.update_pool = update_pool
+        if bot_instance is not None:
+            bot_instance.use_direct_replies()
+        for hook in asgi_app.on_startup:
+            self.loop.run_until_complete(hook())
+        self.init_seconds = time.perf_counter() - started
+        self.invocations = 0
+        logger.info(f"Холодный старт serverless-обработчика за {self.init_seconds * 1000:.0f} мс.")
+
+
+_state: Optional[_WarmState] = None
+
+
+def handler(event: Dict, context=None) -> Dict:
+    """Обрабатывает одно HTTP-событие и возвращает ответ в формате API Gateway."""
+    global _state
+    if _state is None:
+        _state = _WarmState()
+    _state.invocations += 1
+    return _state.loop.run_until_complete(_invoke(_state, event or {}, context))
+
+
+def init_stats() -> Dict:
+    """Время холодного старта и число вызовов в этом контейнере (для локальных замеров)."""
+    if _state is None:
+        return {'initialized': False}
+    return {'initialized': True, 'init_ms': round(_state.init_seconds * 1000, 1), 'invocations': _state.invocations}
+
+
+async def _invoke(state: _WarmState, event: Dict, context) -> Dict:
+    scope, body = _scope_from_event(event)
+    status, headers, chunks = await _call_asgi(state.asgi_app, scope, body)
+
+    # Ответ уйдет только после того, как все принятое записано
+    timeout = _flush_budget(state.config.SERVERLESS_FLUSH_TIMEOUT, context)
+    started = time.monotonic()
+    flushed = await state.update_pool.join(timeout)
+    if state.bot is not None:
+        flushed = await state.bot.flush(max(0.0, timeout - (time.monotonic() - started))) and flushed
+    if not flushed:
+        logger.warning(f"Serverless: записи не дописаны за {timeout:.1f}s, остаток — при следующем вызове.")
+
+    return _gateway_response(status, headers, b''.join(chunks))
+
+
+def _flush_budget(configured: float, context) -> float:
+    """Не дольше настройки и оставшегося времени вызова (с запасом на ответ)."""
+    get_remaining = getattr(context, 'get_remaining_time_in_millis', None)
+    if get_remaining is None:
+        return configured
+    return max(0.0, min(configured, get_remaining() / 1000 - 0.5))
+
+
+def _scope_from_event(event: Dict) -> Tuple[Dict, bytes]:
+    http = (event.get('requestContext') or {}).get('http') or {}
+    method = (event.get('httpMethod') or http.get('method') or 'POST').upper()
+    path = event.get('rawPath') or event.get('path') or '/webhook'
+    query = event.get('rawQueryString')
+    if query is None:
+        query = urlencode(event.get('queryStringParameters') or {})
+    headers = {str(k).lower(): str(v) for k, v in (event.get('headers') or {}).items()}
+
+    body = event.get('body') or b''
+    if isinstance(body, str):
+        body = base64.b64decode(body) if event.get('isBase64Encoded') else body.encode('utf-8')
+    source_ip = http.get('sourceIp') or ((event.get('requestContext') or {}).get('identity') or {}).get('sourceIp')
+
+    scope = {
+        'type': 'http', 'method': method, 'path': path, 'query_string': query.encode('latin-1'),
+        'headers': [(k.encode('latin-1'), v.encode('latin-1')) for k, v in headers.items()],
+        'http_version': '1.1', 'scheme': 'https', 'root_path': '',
+        'client': (source_ip, 0) if source_ip else None,
+    }
+    return scope, body
+
+
+async def _call_asgi(app, scope: Dict, body: bytes) -> Tuple[int, List[Tuple[bytes, bytes]], List[bytes]]:
+    start: Dict = {}
+    chunks: List[bytes] = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            start.update(message)
+        elif message['type'] == 'http.response.body':
+            chunks.append(message.get('body', b''))
+
+    await app(scope, receive, send)
+    return start.get('status', 500), start.get('headers', []), chunks
+
+
+def _gateway_response(status: int, headers: List[Tuple[bytes, bytes]], body: bytes) -> Dict:
+    response_headers = {k.decode('latin-1'): v.decode('latin-1') for k, v in headers if k.lower() != b'content-length'}
+    try:
+        return {'statusCode': status, 'headers': response_headers, 'body': body.decode('utf-8'), 'isBase64Encoded': False}
+    except UnicodeDecodeError:
+        return {'statusCode': status, 'headers': response_headers,
+                'body': base64.b64encode(body).decode('ascii'), 'isBase64Encoded': True}
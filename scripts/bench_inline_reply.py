@@ -0,0 +1,113 @@
+# Файл: scripts/bench_inline_reply.py
+"""
+Сравнение задержки подтверждения статуса: обычный исходящий sendMessage
+против ответа в теле вебхука (WEBHOOK_INLINE_REPLY).
+
+Бот работает в этом же процессе против фейкового Bot API с задержкой --latency
+(имитация сети до api.telegram.org). Задержка — от начала запроса на /webhook до
+момента, когда подтверждение ушло: для исходящего режима — когда фейковый API
+получил sendMessage, для inline — когда готов ответ вебхука (дальше его выполняет
+сам Telegram по уже открытому соединению).
+
+Запуск: python -m scripts.bench_inline_reply [--updates 200] [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from scripts.fakes import FakeBotAPI, make_update  # noqa: E402
+
+
+async def call_webhook(app, payload):
+    """Один POST /webhook напрямую через ASGI. Возвращает (статус, тело)."""
+    body = json.dumps(payload).encode('utf-8')
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'POST', 'path': '/webhook', 'query_string': b'',
+             'headers': [(b'content-type', b'application/json')], 'client': ('127.0.0.1', 1)}
+    await app(scope, receive, send)
+    return sent[0]['status'], sent[1]['body']
+
+
+async def run_mode(app, config, fake_api, inline: bool, updates: int, first_id: int):
+    config.WEBHOOK_INLINE_REPLY = inline
+    latencies = []
+    outbound_before = len(fake_api.calls_for('sendMessage'))
+    inline_replies = 0
+    for i in range(updates):
+        update_id = first_id + i
+        payload = make_update(update_id, 70000 + update_id % 13, "Я в пути")
+        expected = len(fake_api.calls_for('sendMessage')) + 1
+        started = time.perf_counter()
+        status, body = await call_webhook(app, payload)
+        if inline and body.startswith(b'{'):
+            assert json.loads(body)['method'] == 'sendMessage'
+            inline_replies += 1
+        else:
+            while len(fake_api.calls_for('sendMessage')) < expected:
+                await asyncio.sleep(0.0005)
+        latencies.append(time.perf_counter() - started)
+        assert status == 200, status
+    outbound = len(fake_api.calls_for('sendMessage')) - outbound_before
+    latencies.sort()
+    return {
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        'outbound_per_status': outbound / updates,
+        'inline_replies': inline_replies,
+    }
+
+
+async def bench(updates: int, latency: float):
+    fake_api = FakeBotAPI(latency=latency).start()
+    tmp = tempfile.mkdtemp()
+    os.environ.update(BOT_TOKEN='123456:BENCH', TELEGRAM_API_BASE_URL=fake_api.base_url,
+                      DATABASE_PATH=os.path.join(tmp, 'statuses.db'), GOOGLE_SHEETS_CREDENTIALS_JSON='',
+                      BOARD_SYNC_INTERVAL='0', OUTBOUND_RATE_PER_MINUTE='0')  # Без объединения: ответ на каждый статус
+    import logging
+    from bot.config import Config
+    from bot.main import asgi_app, bot_instance, update_pool
+    logging.getLogger().setLevel(logging.WARNING)
+
+    await run_mode(asgi_app, Config, fake_api, False, 3, 1)  # Прогрев: getMe, соединения, кэши
+    rows = [
+        ('исходящий sendMessage', await run_mode(asgi_app, Config, fake_api, False, updates, 1000)),
+        ('ответ в теле вебхука', await run_mode(asgi_app, Config, fake_api, True, updates, 1000 + updates)),
+    ]
+    await update_pool.stop()
+    bot_instance.shutdown()
+    fake_api.stop()
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"Статусов: {updates}, задержка фейкового Bot API: {latency * 1000:.0f} мс")
+    print(f"{'режим':>24} {'p50, мс':>9} {'p95, мс':>9} {'исходящих/статус':>17}")
+    for name, result in rows:
+        print(f"{name:>24} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['outbound_per_status']:>17.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--updates', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.05, help='секунд на запрос к фейковому Bot API')
+    args = parser.parse_args()
+    asyncio.run(bench(args.updates, args.latency))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+# Файл: scripts/bench_matcher.py
+"""
+Бенчмарк распознавания статусов на корпусе сообщений группового чата
+(большинство — обычная болтовня без статуса): старый линейный поиск
+подстрок против StatusMatcher.
+
+Запуск: python -m scripts.bench_matcher [--messages 100000] [--status-share 0.1]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.config import Config  # noqa: E402
+from bot.status_matcher import StatusMatcher  # noqa: E402
+
+OLD_STATUSES = ['в пути', 'на месте', 'закончил']
+
+CHATTER = [
+    "Всем привет! Кто сегодня на дне рождения в 15:00?",
+    "Костюм Человека-паука кто-нибудь забирал со склада?",
+    "Напоминаю: завтра в 10 планерка, не опаздываем",
+    "Скиньте, пожалуйста, адрес заказа на Ленинском",
+    "Ребят, у кого остались мыльные пузыри?",
+    "Клиент просит перенести на час позже, кто сможет?",
+    "Спасибо всем за сегодня, было огонь 🔥",
+    "Такси не могу вызвать, пробки жуткие",
+    "Фото с праздника загрузила в общий альбом",
+    "Кто возьмет субботу утро? Детский сад, 20 детей",
+    "Ок",
+    "👍",
+    "Аниматор нужен на выпускной 25 мая, пишите в личку",
+    "Не забудьте чеки за такси сдать до пятницы",
+    "Мне еду заказать на всех или каждый сам?",
+]
+
+STATUS_MESSAGES = [
+    "В пути", "в пути, буду минут через 20", "Выехала!", "Я выехал, пробки",
+    "На месте", "на месте 👍", "Доехала, начинаем", "приехал на точку, я на месте",
+    "Закончил", "закончила, еду домой", "Отработали, освободилась",
+    "еще не выехала, задерживаюсь", "пока не на месте, ищу вход",
+]
+
+
+def old_extract_status(text):
+    if not text: return None
+    text_lower = text.lower()
+    for status in OLD_STATUSES:
+        if status.lower() in text_lower: return status
+    return None
+
+
+def make_all_aliases_scan(matcher):
+    """Тот же линейный поиск, но по всем алиасам из конфига — так он рос бы с числом статусов."""
+    aliases = list(matcher._canonical.items())
+
+    def extract(text):
+        if not text: return None
+        text_lower = text.lower()
+        for alias, status in aliases:
+            if alias in text_lower: return status
+        return None
+    return extract
+
+
+def build_corpus(size: int, status_share: float, seed: int = 42):
+    rng = random.Random(seed)
+    return [rng.choice(STATUS_MESSAGES) if rng.random() < status_share else rng.choice(CHATTER) for _ in range(size)]
+
+
+def timed(func, corpus):
+    started = time.perf_counter()
+    found = sum(1 for text in corpus if func(text))
+    return time.perf_counter() - started, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=100000)
+    parser.add_argument('--status-share', type=float, default=0.1)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.messages, args.status_share)
+
+    started = time.perf_counter()
+    matcher = StatusMatcher.from_file(Config.STATUSES_CONFIG_PATH)
+    compile_time = time.perf_counter() - started
+
+    old_time, old_found = timed(old_extract_status, corpus)
+    scan_time, scan_found = timed(make_all_aliases_scan(matcher), corpus)
+    new_time, new_found = timed(matcher.match, corpus)
+
+    print(f"Сообщений: {len(corpus)}, доля статусов: {args.status_share:.0%}, компиляция матчера: {compile_time * 1000:.2f} мс")
+    print(f"{'':>14} {'всего, с':>10} {'мкс/сообщ.':>12} {'найдено':>9}")
+    print(f"{'подстроки':>14} {old_time:>10.3f} {old_time / len(corpus) * 1e6:>12.2f} {old_found:>9}")
+    print(f"{'все алиасы':>14} {scan_time:>10.3f} {scan_time / len(corpus) * 1e6:>12.2f} {scan_found:>9}")
+    print(f"{'StatusMatcher':>14} {new_time:>10.3f} {new_time / len(corpus) * 1e6:>12.2f} {new_found:>9}")
+    print("Разница в 'найдено': синонимы (выехала, доехала...) и отрицания (не на месте).")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# Файл: scripts/bench_storage.py
+"""
+Микробенчмарк записи статусов в SQLite: старый путь (connect/INSERT/commit/close
+на каждый статус) против StatusStorage (одно WAL-соединение, пакетные транзакции).
+
+Запуск: python -m scripts.bench_storage [--counts 1000 10000]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.storage import StatusStorage  # noqa: E402
+
+MOSCOW_TZ = ZoneInfo("Europe/Moscow")
+STATUSES = ['в пути', 'на месте', 'закончил']
+
+
+def bench_old(path: str, count: int) -> float:
+    conn = sqlite3.connect(path)
+    conn.execute('''CREATE TABLE IF NOT EXISTS statuses (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, username TEXT, status TEXT NOT NULL, timestamp DATETIME NOT NULL)''')
+    conn.commit(); conn.close()
+
+    started = time.perf_counter()
+    for i in range(count):
+        conn = sqlite3.connect(path); cursor = conn.cursor()
+        cursor.execute('INSERT INTO statuses (user_id, username, status, timestamp) VALUES (?, ?, ?, ?)',
+                       (i % 50, f"user{i % 50}", STATUSES[i % 3], datetime.now(MOSCOW_TZ).isoformat(sep=' ')))
+        conn.commit(); conn.close()
+    return time.perf_counter() - started
+
+
+def bench_new(path: str, count: int) -> float:
+    storage = StatusStorage(path)
+    storage.start()
+    started = time.perf_counter()
+    futures = [storage.submit(i % 50, f"user{i % 50}", STATUSES[i % 3], datetime.now(MOSCOW_TZ)) for i in range(count)]
+    futures[-1].result()
+    elapsed = time.perf_counter() - started
+    storage.stop()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--counts', type=int, nargs='+', default=[1000, 10000])
+    args = parser.parse_args()
+
+    print(f"{'статусов':>10} {'старый путь, с':>16} {'StatusStorage, с':>18} {'ускорение':>10}")
+    for count in args.counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            old = bench_old(os.path.join(tmp, 'old.db'), count)
+            new = bench_new(os.path.join(tmp, 'new.db'), count)
+        print(f"{count:>10} {old:>16.3f} {new:>18.3f} {old / new:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+# Файл: scripts/fakes.py
+"""
+Локальные заглушки для проверок и бенчмарков без сети:
+фейковый Bot API сервер и фейковые менеджеры Google Sheets.
+"""
+
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+FAKE_BOT_USER = {'id': 1000000001, 'is_bot': True, 'first_name': 'FakeBot', 'username': 'fake_bot'}
+
+
+class FakeBotAPI:
+    """
+    Фейковый Bot API (getMe, sendMessage и любые другие методы) в фоновом потоке.
+    Адрес для Config.TELEGRAM_API_BASE_URL — свойство base_url.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0):
+        self.latency = latency
+        self.calls: List[Dict] = []
+        self._lock = threading.Lock()
+        self._message_id = 0
+        fake = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                fake._handle(self)
+
+            do_GET = do_POST
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-bot-api", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/bot"
+
+    def start(self) -> 'FakeBotAPI':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def calls_for(self, method: str) -> List[Dict]:
+        with self._lock:
+            return [call for call in self.calls if call['method'] == method]
+
+    def _handle(self, handler: BaseHTTPRequestHandler):
+        length = int(handler.headers.get('Content-Length') or 0)
+        raw = handler.rfile.read(length) if length else b''
+        content_type = handler.headers.get('Content-Type', '')
+        if 'json' in content_type:
+            params = json.loads(raw or b'{}')
+        else:
+            params = {k: v[0] for k, v in parse_qs(raw.decode('utf-8')).items()}
+        method = handler.path.rstrip('/').rsplit('/', 1)[-1]
+
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls.append({'method': method, 'params': params, 'at': time.time()})
+            self._message_id += 1
+            message_id = self._message_id
+
+        if method == 'getMe':
+            result = FAKE_BOT_USER
+        elif method == 'sendMessage':
+            chat_id = int(params.get('chat_id', 0))
+            result = {
+                'message_id': message_id, 'date': int(time.time()), 'text': params.get('text', ''),
+                'chat': {'id': chat_id, 'type': 'group' if chat_id < 0 else 'private', 'title': 'fake'},
+                'from': FAKE_BOT_USER,
+            }
+        else:
+            result = True
+
+        body = json.dumps({'ok': True, 'result': result}).encode('utf-8')
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+
+def make_update(update_id: int, user_id: int, text: str, chat_id: int = -100123, username: str = None) -> Dict:
+    """JSON обновления Telegram: текстовое сообщение в группе."""
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'group', 'title': 'Аниматоры'},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': f'User{user_id}',
+                     'username': username or f'user{user_id}'},
+            'text': text,
+        },
+    }
+
+
+class FileSheetsManager:
+    """
+    Фейковый лист, общий для нескольких процессов: каждая строка — JSON-строка в файле
+    с pid и номером пачки. Строки пачки пишутся по одной, с паузой, чтобы без
+    межпроцессной блокировки пачки разных воркеров перемешивались.
+    """
+
+    def __init__(self, path: str, row_delay: float = 0.001):
+        self.client = None
+        self.spreadsheet = None
+        self.worksheet = path
+        self.path = path
+        self.row_delay = row_delay
+        self._batches = 0
+
+    @staticmethod
+    def format_status_row(real_artist_name, status, timestamp):
+        from bot.google_sheets import GoogleSheetsManager
+        return GoogleSheetsManager.format_status_row(real_artist_name, status, timestamp)
+
+    def worksheet_name_for(self, timestamp):
+        return None
+
+    def append_rows(self, rows, worksheet_name=None):
+        self._batches += 1
+        batch_id = f"{os.getpid()}-{self._batches}"
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps({'batch': batch_id, 'row': row}, ensure_ascii=False) + '\n')
+                f.flush()
+                time.sleep(self.row_delay)
+
+    @staticmethod
+    def read(path: str) -> List[Dict]:
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+
+class FakeQuotaError(Exception):
+    """Аналог ответа 429 RESOURCE_EXHAUSTED от Google Sheets API."""
+
+
+class MemoryWorksheetManager:
+    """
+    Фейковый лист в памяти вместо gspread: задержка на каждый запрос, квота
+    запросов в минуту (как у Sheets API) и доля случайных ошибок.
+    Листы по месяцам — как у GoogleSheetsManager.use_monthly_worksheets.
+    """
+
+    def __init__(self, latency: float = 0.0, quota_per_minute: int = 0, error_rate: float = 0.0, seed: int = 0):
+        import random
+        self.client = None
+        self.spreadsheet = None
+        self.worksheet = self
+        self.latency = latency
+        self.quota_per_minute = quota_per_minute
+        self.error_rate = error_rate
+        self.partition_base = None
+        self.sheets: Dict[Optional[str], List[List]] = {}
+        self.rows: List[List] = self._sheet(None)
+        self.requests = 0
+        self.quota_errors = 0
+        self.random_errors = 0
+        self._random = random.Random(seed)
+        self._request_times: List[float] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def format_status_row(real_artist_name, status, timestamp):
+        from bot.google_sheets import GoogleSheetsManager
+        return GoogleSheetsManager.format_status_row(real_artist_name, status, timestamp)
+
+    def use_monthly_worksheets(self, base_name):
+        self.partition_base = base_name
+
+    def worksheet_name_for(self, timestamp):
+        from bot.google_sheets import monthly_worksheet_name
+        return monthly_worksheet_name(self.partition_base, timestamp) if self.partition_base else None
+
+    def _sheet(self, worksheet_name) -> List[List]:
+        from bot.google_sheets import HEADERS
+        return self.sheets.setdefault(worksheet_name, [list(HEADERS)])
+
+    def _request(self):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+            now = time.monotonic()
+            if self.quota_per_minute:
+                self._request_times = [t for t in self._request_times if now - t < 60]
+                if len(self._request_times) >= self.quota_per_minute:
+                    self.quota_errors += 1
+                    raise FakeQuotaError("429 RESOURCE_EXHAUSTED: Quota exceeded for 'Write requests per minute per user'")
+                self._request_times.append(now)
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.random_errors += 1
+                raise FakeQuotaError("503 UNAVAILABLE: The service is currently unavailable")
+
+    def append_rows(self, rows, worksheet_name=None):
+        self._request()
+        with self._lock:
+            self._sheet(worksheet_name).extend(list(row) for row in rows)
+
+    def get_all_rows(self, worksheet_name=None, create=True):
+        self._request()
+        with self._lock:
+            if not create and worksheet_name not in self.sheets:
+                return []
+            return [list(row) for row in self._sheet(worksheet_name)]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'rows': sum(len(rows) - 1 for rows in self.sheets.values()), 'sheets': len(self.sheets), 'requests': self.requests,
+                    'quota_errors': self.quota_errors, 'random_errors': self.random_errors}
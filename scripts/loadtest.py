@@ -0,0 +1,289 @@
+# Файл: scripts/loadtest.py
+"""
+Нагрузочный тест bot.main без сети: asgi_app в этом процессе, фейковый Bot API
+(scripts.fakes.FakeBotAPI) и лист в памяти с задержкой, квотой и ошибками
+(scripts.fakes.MemoryWorksheetManager) вместо gspread.
+
+Синтетический поток групповых чатов (статусы, болтовня, отрицания, повторные
+доставки) подается с заданной частотой: запросы отправляются по расписанию,
+не дожидаясь ответов, а задержка считается от запланированного момента
+отправки, поэтому медленный ответ не занижает перцентили.
+
+Для каждой частоты: пропускная способность, p50/p95/p99 задержки вебхука,
+доля ошибок, время до полной обработки, записи в SQLite и лист, исходящие
+сообщения. Результаты сохраняются в JSON; --compare сравнивает с прошлым прогоном.
+
+Запуск: python -m scripts.loadtest [--rates 50,200,500] [--duration 10] [--output loadtest.json]
+        [--compare old.json] [--inline] [--api-latency 0.05] [--sheet-latency 0.2]
+        [--sheet-quota 60] [--sheet-error-rate 0.05]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, Iterator, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from scripts.fakes import FakeBotAPI, MemoryWorksheetManager, make_update  # noqa: E402
+
+STATUS_TEXTS = ['Я в пути', 'в пути!', 'Выехала, в пути', 'на месте', 'Уже на месте', 'закончил', 'Закончила, еду домой']
+CHATTER_TEXTS = ['Всем привет', 'Кто сегодня на смене?', 'Скиньте адрес', 'ок', 'Спасибо!', 'Я еще не в пути',
+                 'Пробки страшные', 'Где костюм пирата?', 'Созвон в 10']
+
+
+def synthetic_stream(chats: int, artists: int, status_share: float, duplicate_share: float, seed: int) -> Iterator[Dict]:
+    """Бесконечный поток обновлений групповых чатов со своими update_id."""
+    from bot.artists import ARTIST_MAPPING
+    rng = random.Random(seed)
+    known = list(ARTIST_MAPPING)
+    users = known + [900000000 + i for i in range(max(0, artists - len(known)))]
+    chat_ids = [-1001000000000 - i for i in range(chats)]
+    update_id = 0
+    previous = None
+    while True:
+        if previous is not None and rng.random() < duplicate_share:
+            yield previous  # Повторная доставка того же update_id
+            continue
+        update_id += 1
+        text = rng.choice(STATUS_TEXTS) if rng.random() < status_share else rng.choice(CHATTER_TEXTS)
+        previous = make_update(update_id, rng.choice(users), text, chat_id=rng.choice(chat_ids))
+        yield previous
+
+
+async def call_webhook(app, payload: Dict) -> int:
+    body = json.dumps(payload).encode('utf-8')
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'POST', 'path': '/webhook', 'query_string': b'',
+             'headers': [(b'content-type', b'application/json')], 'client': ('127.0.0.1', 1)}
+    await app(scope, receive, send)
+    return sent[0]['status']
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Перцентиль по ближайшему рангу."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+async def run_step(app, stream: Iterator[Dict], rate: float, duration: float):
+    """Отправляет rate запросов в секунду в течение duration секунд (открытая модель нагрузки)."""
+    loop = asyncio.get_running_loop()
+    total = int(rate * duration)
+    latencies: List[float] = []
+    codes: Counter = Counter()
+
+    async def timed(payload, scheduled):
+        try:
+            code = await call_webhook(app, payload)
+        except Exception as e:
+            code = type(e).__name__
+        codes[code] += 1
+        latencies.append(loop.time() - scheduled)
+
+    started = loop.time()
+    tasks = []
+    for i in range(total):
+        scheduled = started + i / rate
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(timed(next(stream), scheduled)))
+    await asyncio.gather(*tasks)
+    return latencies, codes, loop.time() - started
+
+
+async def wait_processed(update_pool, timeout: float = 120) -> float:
+    """Ждет, пока пул обработает все принятые обновления. Возвращает время ожидания."""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        stats = update_pool.stats()
+        if stats['queue_depth'] == 0 and stats['processed'] + stats['failed'] >= stats['accepted']:
+            break
+        await asyncio.sleep(0.01)
+    return time.perf_counter() - started
+
+
+def _delta(after: Dict, before: Dict, key: str):
+    return (after.get(key) or 0) - (before.get(key) or 0)
+
+
+async def run(args) -> Dict:
+    fake_api = FakeBotAPI(latency=args.api_latency).start()
+    tmp = tempfile.mkdtemp()
+    os.environ.update(
+        BOT_TOKEN='123456:LOADTEST', TELEGRAM_API_BASE_URL=fake_api.base_url,
+        DATABASE_PATH=os.path.join(tmp, 'statuses.db'), GOOGLE_SHEETS_CREDENTIALS_JSON='',
+        SHEETS_LOCK_PATH=os.path.join(tmp, 'sheets.lock'),
+    )
+    import logging
+    from bot.config import Config
+    from bot.locks import InterProcessLock
+    from bot.main import asgi_app, bot_instance, update_pool
+    from bot.sheets_outbox import SheetsOutboxSyncer
+    logging.getLogger().setLevel(logging.WARNING if args.verbose else logging.CRITICAL)  # Ошибки листа и так в отчете
+
+    sheet = MemoryWorksheetManager(latency=args.sheet_latency, quota_per_minute=args.sheet_quota,
+                                   error_rate=args.sheet_error_rate, seed=args.seed)
+    bot_instance.sheets_manager = sheet
+    bot_instance.storage.sheets_outbox = True
+    bot_instance.sheets_syncer = SheetsOutboxSyncer(
+        bot_instance.storage, sheet,
+        resolve_name=bot_instance.resolve_artist_name, format_row=sheet.format_status_row,
+        batch_size=Config.SHEETS_BATCH_SIZE, flush_interval=Config.SHEETS_FLUSH_INTERVAL,
+        poll_interval=Config.SHEETS_SYNC_POLL_INTERVAL, retry_min=Config.SHEETS_RETRY_MIN,
+        retry_max=Config.SHEETS_RETRY_MAX, process_lock=InterProcessLock(Config.SHEETS_LOCK_PATH),
+    )
+    bot_instance.sheets_syncer.start()
+    bot_instance.sheets_ready.set()
+    bot_instance.setup_sinks()
+    Config.WEBHOOK_INLINE_REPLY = args.inline
+
+    for hook in asgi_app.on_startup:
+        await hook()
+    await bot_instance.warm_up()
+
+    stream = synthetic_stream(args.chats, args.artists, args.status_share, args.duplicate_share, args.seed)
+    steps = []
+    for rate in args.rates:
+        before = {'sqlite': bot_instance.storage.stats(), 'sheet': sheet.stats(), 'pool': update_pool.stats(),
+                  'sinks': bot_instance.sinks.stats(), 'api': len(fake_api.calls_for('sendMessage'))}
+        latencies, codes, elapsed = await run_step(asgi_app, stream, rate, args.duration)
+        drain = await wait_processed(update_pool)
+        await bot_instance.sinks.drain(timeout=30)
+        await asyncio.to_thread(bot_instance.storage.flush, 30)
+        # Строки шага — в листе до замера; что не ушло из-за ошибок API, видно в sheet_backlog
+        await asyncio.to_thread(bot_instance.sheets_syncer.flush, 60)
+        after = {'sqlite': bot_instance.storage.stats(), 'sheet': sheet.stats(), 'pool': update_pool.stats(),
+                 'sinks': bot_instance.sinks.stats(), 'api': len(fake_api.calls_for('sendMessage'))}
+        sent = sum(codes.values())
+        errors = sent - codes.get(200, 0)
+        sink_errors = Counter(after['sinks']['errors']) - Counter(before['sinks']['errors'])
+        sink_errors += Counter(after['sinks']['timeouts']) - Counter(before['sinks']['timeouts'])
+        step = {
+            'rate': rate,
+            'sent': sent,
+            'elapsed_s': round(elapsed, 3),
+            'throughput_rps': round(sent / elapsed, 1) if elapsed else 0.0,
+            'processed_within_s': round(elapsed + drain, 3),
+            'latency_ms': {
+                'p50': round(percentile(latencies, 50) * 1000, 2),
+                'p95': round(percentile(latencies, 95) * 1000, 2),
+                'p99': round(percentile(latencies, 99) * 1000, 2),
+                'max': round(max(latencies, default=0) * 1000, 2),
+            },
+            'responses': {str(code): count for code, count in codes.items()},
+            'error_rate': round(errors / sent, 4) if sent else 0.0,
+            'update_failures': _delta(after['pool'], before['pool'], 'failed'),
+            'sink_errors': dict(sink_errors),
+            'statuses_saved': _delta(after['sqlite'], before['sqlite'], 'inserted'),
+            'sheet_rows': _delta(after['sheet'], before['sheet'], 'rows'),
+            'sheet_requests': _delta(after['sheet'], before['sheet'], 'requests'),
+            'sheet_errors': _delta(after['sheet'], before['sheet'], 'quota_errors') + _delta(after['sheet'], before['sheet'], 'random_errors'),
+            'sheet_backlog': bot_instance.sheets_syncer.stats()['queue_depth'],
+            'outbound_messages': after['api'] - before['api'],
+        }
+        steps.append(step)
+        _print_step(step)
+
+    await asyncio.to_thread(bot_instance.sheets_syncer.flush, 30)
+    backlog = bot_instance.sheets_syncer.stats()['queue_depth']
+    for hook in asgi_app.on_shutdown:
+        await hook()
+    fake_api.stop()
+    shutil.rmtree(tmp, ignore_errors=True)
+    return {'meta': _meta(args), 'steps': steps, 'sheet_backlog_at_end': backlog}
+
+
+def _meta(args) -> Dict:
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                  capture_output=True, text=True).stdout.strip()
+    except OSError:
+        revision = None
+    return {
+        'revision': revision,
+        'python': platform.python_version(),
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'args': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+    }
+
+
+def _print_step(step: Dict):
+    lat = step['latency_ms']
+    print(f"rate {step['rate']:>6.0f}/s: отправлено {step['sent']:>6}, {step['throughput_rps']:>7.1f} rps, "
+          f"p50 {lat['p50']:>7.2f} мс, p95 {lat['p95']:>7.2f} мс, p99 {lat['p99']:>7.2f} мс, "
+          f"ошибок {step['error_rate'] * 100:.2f}%, обработано за {step['processed_within_s']:.2f} s, "
+          f"статусов {step['statuses_saved']}, в листе {step['sheet_rows']} ({step['sheet_errors']} ошибок API, "
+          f"в очереди {step['sheet_backlog']}), "
+          f"исходящих {step['outbound_messages']}")
+
+
+def compare(current: Dict, baseline: Dict):
+    """Печатает изменения p95/p99 и пропускной способности относительно прошлого прогона."""
+    old_steps = {step['rate']: step for step in baseline.get('steps', [])}
+    print(f"\nСравнение с {baseline.get('meta', {}).get('revision')} ({baseline.get('meta', {}).get('started_at')}):")
+    for step in current['steps']:
+        old = old_steps.get(step['rate'])
+        if not old:
+            continue
+        parts = []
+        for key in ('p50', 'p95', 'p99'):
+            new_value, old_value = step['latency_ms'][key], old['latency_ms'][key]
+            change = (new_value - old_value) / old_value * 100 if old_value else 0.0
+            parts.append(f"{key} {old_value:.2f} -> {new_value:.2f} мс ({change:+.0f}%)")
+        parts.append(f"rps {old['throughput_rps']} -> {step['throughput_rps']}")
+        parts.append(f"ошибки {old['error_rate'] * 100:.2f}% -> {step['error_rate'] * 100:.2f}%")
+        print(f"rate {step['rate']:>6.0f}/s: " + ', '.join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rates', type=lambda v: [float(x) for x in v.split(',')], default=[50.0, 200.0, 500.0],
+                        help='запросов в секунду через запятую, по шагу на каждую')
+    parser.add_argument('--duration', type=float, default=10.0, help='секунд на шаг')
+    parser.add_argument('--chats', type=int, default=5)
+    parser.add_argument('--artists', type=int, default=40)
+    parser.add_argument('--status-share', type=float, default=0.3, help='доля сообщений со статусом')
+    parser.add_argument('--duplicate-share', type=float, default=0.02, help='доля повторных доставок')
+    parser.add_argument('--inline', action='store_true', help='WEBHOOK_INLINE_REPLY: задержка включает обработку')
+    parser.add_argument('--api-latency', type=float, default=0.05, help='секунд на запрос к фейковому Bot API')
+    parser.add_argument('--sheet-latency', type=float, default=0.2, help='секунд на запрос к фейковому листу')
+    parser.add_argument('--sheet-quota', type=int, default=60, help='запросов к листу в минуту (0 — без квоты)')
+    parser.add_argument('--sheet-error-rate', type=float, default=0.0, help='доля случайных ошибок листа')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default='loadtest.json', help='куда сохранить результаты (JSON)')
+    parser.add_argument('--compare', help='JSON прошлого прогона для сравнения')
+    parser.add_argument('--verbose', action='store_true', help='логи бота уровня WARNING и выше')
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"Результаты сохранены в {args.output}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(result, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
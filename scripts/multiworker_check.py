@@ -0,0 +1,168 @@
+# Файл: scripts/multiworker_check.py
+"""
+Проверка режима нескольких воркеров: поднимает uvicorn --workers N против
+фейкового Bot API и общего файлового "листа", шлет K статусов и проверяет,
+что каждый сохранен ровно один раз в SQLite и в листе, а пачки разных
+воркеров в листе не перемешаны.
+
+Запуск: python -m scripts.multiworker_check [--workers 4] [--updates 200]
+"""
+
+import argparse
+import json
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from scripts.fakes import FakeBotAPI, FileSheetsManager, make_update  # noqa: E402
+
+STATUSES = ['в пути', 'на месте', 'закончил']
+
+
+def __getattr__(name):
+    """`app` для воркеров uvicorn: bot.main с подключенным файловым листом."""
+    if name != 'app':
+        raise AttributeError(name)
+    from bot.config import Config
+    from bot.locks import InterProcessLock
+    from bot.main import asgi_app, bot_instance
+    from bot.sheets_outbox import SheetsOutboxSyncer
+
+    manager = FileSheetsManager(os.environ['FAKE_SHEET_PATH'])
+    bot_instance.sheets_manager = manager
+    bot_instance.status_worksheet = manager.worksheet
+    bot_instance.storage.sheets_outbox = True
+    bot_instance.sheets_syncer = SheetsOutboxSyncer(
+        bot_instance.storage,
+        manager,
+        resolve_name=bot_instance.resolve_artist_name,
+        format_row=manager.format_status_row,
+        batch_size=Config.SHEETS_BATCH_SIZE,
+        flush_interval=Config.SHEETS_FLUSH_INTERVAL,
+        poll_interval=Config.SHEETS_SYNC_POLL_INTERVAL,
+        process_lock=InterProcessLock(Config.SHEETS_LOCK_PATH),
+    )
+    bot_instance.sheets_syncer.start()
+    bot_instance.setup_sinks()
+    return asgi_app
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _post(url: str, payload) -> int:
+    request = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'}, method='POST')
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.status
+
+
+def _wait_until(predicate, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def _server_up(url: str) -> bool:
+    try:
+        with urllib.request.urlopen(url, timeout=1):
+            return True
+    except OSError:
+        return False
+
+
+def run_check(workers: int, updates: int) -> bool:
+    fake_api = FakeBotAPI().start()
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'statuses.db')
+        sheet_path = os.path.join(tmp, 'sheet.jsonl')
+        env = dict(os.environ,
+                   BOT_TOKEN='123456:FAKE', TELEGRAM_API_BASE_URL=fake_api.base_url,
+                   DATABASE_PATH=db_path, SHEETS_LOCK_PATH=os.path.join(tmp, 'sheets.lock'),
+                   FAKE_SHEET_PATH=sheet_path, SHEETS_BATCH_SIZE='7', SHEETS_FLUSH_INTERVAL='0.2',
+                   SHEETS_SYNC_POLL_INTERVAL='1', OUTBOUND_RATE_PER_MINUTE='0',
+                   GOOGLE_SHEETS_CREDENTIALS_JSON='')
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'scripts.multiworker_check:app', '--host', '127.0.0.1',
+             '--port', str(port), '--workers', str(workers), '--log-level', 'warning'],
+            cwd=tmp, env=dict(env, PYTHONPATH=REPO_ROOT),
+            stdout=subprocess.DEVNULL, stderr=open(os.path.join(tmp, 'server.log'), 'w'),
+        )
+        try:
+            base = f"http://127.0.0.1:{port}"
+            if not _wait_until(lambda: _server_up(base + '/'), 30):
+                print("Сервер не поднялся")
+                return False
+
+            payloads = [make_update(i, 50000 + i, f"Я {STATUSES[i % 3]}!") for i in range(1, updates + 1)]
+            with ThreadPoolExecutor(max_workers=32) as pool:
+                codes = Counter(pool.map(lambda p: _post(base + '/webhook', p), payloads))
+            print(f"Ответы вебхука: {dict(codes)}")
+
+            _wait_until(lambda: len(fake_api.calls_for('sendMessage')) >= updates, 60)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(60)
+            fake_api.stop()
+
+        with sqlite3.connect(db_path) as conn:
+            stored = Counter(user_id for (user_id,) in conn.execute('SELECT user_id FROM statuses'))
+        sheet_rows = FileSheetsManager.read(sheet_path)
+        in_sheet = Counter(entry['row'][1] for entry in sheet_rows)
+
+        expected_ids = {50000 + i for i in range(1, updates + 1)}
+        expected_names = {f"user{user_id}" for user_id in expected_ids}
+        ok = True
+        if set(stored) != expected_ids or any(count != 1 for count in stored.values()):
+            print(f"SQLite: ожидалось {updates} уникальных записей, получено {sum(stored.values())} ({len(stored)} уникальных)")
+            ok = False
+        if set(in_sheet) != expected_names or any(count != 1 for count in in_sheet.values()):
+            print(f"Лист: ожидалось {updates} уникальных строк, получено {sum(in_sheet.values())} ({len(in_sheet)} уникальных)")
+            ok = False
+
+        # Пачка — непрерывный участок файла: batch id не должен встречаться снова после смены
+        seen, previous = set(), None
+        for entry in sheet_rows:
+            if entry['batch'] != previous:
+                if entry['batch'] in seen:
+                    print(f"Лист: пачка {entry['batch']} перемешана со строками другого воркера")
+                    ok = False
+                    break
+                seen.add(entry['batch'])
+                previous = entry['batch']
+
+        replies = len(fake_api.calls_for('sendMessage'))
+        print(f"Воркеров: {workers}, статусов: {updates}, в SQLite: {sum(stored.values())}, "
+              f"в листе: {len(sheet_rows)} ({len(seen)} пачек), ответов: {replies}")
+        print("OK" if ok else "FAIL")
+        return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--updates', type=int, default=200)
+    args = parser.parse_args()
+    sys.exit(0 if run_check(args.workers, args.updates) else 1)
+
+
+if __name__ == '__main__':
+    main()
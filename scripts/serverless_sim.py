@@ -0,0 +1,117 @@
+# Файл: scripts/serverless_sim.py
+"""
+Холодные и теплые вызовы handler.handler без облака.
+
+Каждый "контейнер" — отдельный процесс Python: первый вызов холодный (импорт
+bot.main, запуск приложения), остальные теплые. Bot API — scripts.fakes.FakeBotAPI
+в этом процессе; база — во временной папке. Для каждого контейнера записываются
+время инициализации, длительность холодного вызова и теплых вызовов; после
+прогона проверяется, что все статусы лежат в SQLite к моменту ответа.
+
+Запуск: python -m scripts.serverless_sim [--containers 3] [--invocations 20] [--inline] [--api-latency 0.02]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from scripts.fakes import FakeBotAPI, make_update  # noqa: E402
+
+# Выполняется в дочернем процессе: события API Gateway по одному из stdin
+CHILD_CODE = r'''
+import json, sqlite3, sys, time
+started = time.perf_counter()
+import handler
+imported = time.perf_counter()
+results = []
+for line in sys.stdin:
+    event = json.loads(line)
+    t0 = time.perf_counter()
+    response = handler.handler(event, None)
+    elapsed = time.perf_counter() - t0
+    results.append({'status': response['statusCode'], 'seconds': elapsed, 'inline': bool(response['body'].startswith('{'))})
+conn = sqlite3.connect(handler._state.bot.DATABASE_PATH)
+stored = conn.execute('SELECT COUNT(*) FROM statuses').fetchone()[0]
+print(json.dumps({'module_import_s': imported - started, 'init': handler.init_stats(), 'calls': results, 'stored': stored}))
+'''
+
+
+def gateway_event(update) -> dict:
+    """Событие HTTP API (v2) с телом обновления Telegram."""
+    return {
+        'version': '2.0', 'rawPath': '/webhook', 'rawQueryString': '',
+        'headers': {'content-type': 'application/json'},
+        'requestContext': {'http': {'method': 'POST', 'sourceIp': '149.154.167.197'}},
+        'body': json.dumps(update, ensure_ascii=False), 'isBase64Encoded': False,
+    }
+
+
+def run_container(index: int, args, fake_api: FakeBotAPI) -> dict:
+    from bot.artists import ARTIST_MAPPING
+    users = list(ARTIST_MAPPING)
+    lines = []
+    for i in range(args.invocations):
+        text = 'в пути' if i % 2 == 0 else 'Кто сегодня на смене?'
+        update = make_update(index * 100000 + i + 1, users[i % len(users)], text)
+        lines.append(json.dumps(gateway_event(update), ensure_ascii=False))
+    with tempfile.TemporaryDirectory() as cwd:
+        env = dict(os.environ, PYTHONPATH=REPO_ROOT, BOT_TOKEN='123456:SERVERLESS',
+                   TELEGRAM_API_BASE_URL=fake_api.base_url, DATABASE_PATH=os.path.join(cwd, 'statuses.db'),
+                   GOOGLE_SHEETS_CREDENTIALS_JSON='', LOG_LEVEL='WARNING',
+                   WEBHOOK_INLINE_REPLY='1' if args.inline else '')
+        out = subprocess.run([sys.executable, '-c', CHILD_CODE], cwd=cwd, env=env, input='\n'.join(lines),
+                             capture_output=True, text=True, timeout=600)
+    if out.returncode != 0:
+        raise RuntimeError(f"Контейнер {index} завершился с ошибкой:\n{out.stderr[-2000:]}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--containers', type=int, default=3, help='сколько холодных стартов')
+    parser.add_argument('--invocations', type=int, default=20, help='вызовов на контейнер (первый — холодный)')
+    parser.add_argument('--inline', action='store_true', help='WEBHOOK_INLINE_REPLY: подтверждение в теле ответа')
+    parser.add_argument('--api-latency', type=float, default=0.02, help='секунд на запрос к фейковому Bot API')
+    parser.add_argument('--output', help='сохранить результаты в JSON')
+    args = parser.parse_args()
+
+    fake_api = FakeBotAPI(latency=args.api_latency).start()
+    try:
+        containers = [run_container(i, args, fake_api) for i in range(args.containers)]
+    finally:
+        fake_api.stop()
+
+    expected_statuses = (args.invocations + 1) // 2
+    print(f"{'контейнер':>9} {'импорт handler, мс':>18} {'инициализация, мс':>18} {'холодный вызов, мс':>19} "
+          f"{'теплый p50, мс':>15} {'теплый max, мс':>15} {'в SQLite':>9}")
+    for i, result in enumerate(containers):
+        warm = [call['seconds'] * 1000 for call in result['calls'][1:]] or [0.0]
+        print(f"{i:>9} {result['module_import_s'] * 1000:>18.1f} {result['init']['init_ms']:>18.1f} "
+              f"{result['calls'][0]['seconds'] * 1000:>19.1f} {statistics.median(warm):>15.1f} {max(warm):>15.1f} "
+              f"{result['stored']:>6}/{expected_statuses}")
+
+    cold = statistics.median(result['calls'][0]['seconds'] * 1000 for result in containers)
+    init = statistics.median(result['init']['init_ms'] for result in containers)
+    warm = statistics.median(call['seconds'] * 1000 for result in containers for call in result['calls'][1:])
+    print(f"\nМедианы: инициализация {init:.1f} мс, холодный вызов {cold:.1f} мс, теплый вызов {warm:.1f} мс "
+          f"(холодный дороже теплого в {cold / warm:.1f} раза)" if warm else "")
+    failed = [call for result in containers for call in result['calls'] if call['status'] != 200]
+    lost = [result for result in containers if result['stored'] != expected_statuses]
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'containers': containers}, f, ensure_ascii=False, indent=2)
+    if failed or lost:
+        print(f"ОШИБКА: ответов не 200: {len(failed)}, контейнеров с недописанными статусами: {len(lost)}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == '__main__':
+    main()
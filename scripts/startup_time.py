@@ -0,0 +1,91 @@
+# Файл: scripts/startup_time.py
+"""
+Время холодного старта: импорт bot.main и первый ответ ASGI-приложения на GET /.
+Каждый замер — отдельный процесс Python. С --baseline REF то же самое меряется
+на другой ревизии (через временный git worktree) для сравнения "до/после".
+
+Учетные данные Google берутся из окружения (GOOGLE_SHEETS_CREDENTIALS_JSON), если заданы;
+BOT_TOKEN подставляется фиктивный, если не задан.
+
+Запуск: python -m scripts.startup_time [--runs 5] [--baseline HEAD~1]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Выполняется в дочернем процессе: импорт и первый запрос без сети
+CHILD_CODE = r'''
+import asyncio, json, time
+started = time.perf_counter()
+from bot.main import asgi_app
+imported = time.perf_counter()
+
+async def first_response():
+    sent = []
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+    async def send(message):
+        sent.append(message)
+    scope = {'type': 'http', 'method': 'GET', 'path': '/', 'query_string': b'', 'headers': [],
+             'http_version': '1.1', 'scheme': 'http', 'root_path': '', 'server': ('127.0.0.1', 80),
+             'client': ('127.0.0.1', 1)}
+    await asgi_app(scope, receive, send)
+    return sent[0]['status']
+
+status = asyncio.run(first_response())
+responded = time.perf_counter()
+print(json.dumps({'import_s': imported - started, 'first_response_s': responded - started, 'status': status}))
+'''
+
+
+def measure(tree: str, runs: int):
+    env = dict(os.environ, PYTHONPATH=tree)
+    env.setdefault('BOT_TOKEN', '123456:STARTUP-TIME')
+    results = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as cwd:  # База и прочие файлы — во временной папке
+            env['DATABASE_PATH'] = os.path.join(cwd, 'statuses.db')
+            out = subprocess.run([sys.executable, '-c', CHILD_CODE], cwd=cwd, env=env,
+                                 capture_output=True, text=True, timeout=300)
+        if out.returncode != 0:
+            raise RuntimeError(f"Замер в {tree} завершился с ошибкой:\n{out.stderr[-2000:]}")
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {
+        'import_ms': statistics.median(r['import_s'] for r in results) * 1000,
+        'first_response_ms': statistics.median(r['first_response_s'] for r in results) * 1000,
+        'status': results[-1]['status'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--baseline', help='git-ревизия для сравнения, например HEAD~1')
+    args = parser.parse_args()
+
+    rows = [('текущее дерево', measure(REPO_ROOT, args.runs))]
+    if args.baseline:
+        with tempfile.TemporaryDirectory() as tmp:
+            tree = os.path.join(tmp, 'baseline')
+            subprocess.run(['git', 'worktree', 'add', '--detach', tree, args.baseline], cwd=REPO_ROOT,
+                           check=True, capture_output=True)
+            try:
+                rows.insert(0, (args.baseline, measure(tree, args.runs)))
+            finally:
+                subprocess.run(['git', 'worktree', 'remove', '--force', tree], cwd=REPO_ROOT, capture_output=True)
+
+    print(f"Медиана по {args.runs} запускам")
+    print(f"{'ревизия':>16} {'импорт, мс':>12} {'первый ответ, мс':>18} {'HTTP':>5}")
+    for name, result in rows:
+        print(f"{name:>16} {result['import_ms']:>12.1f} {result['first_response_ms']:>18.1f} {result['status']:>5}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,2 +1,2 @@
 #!/bin/bash
-uvicorn bot.main:asgi_app --host 0.0.0.0 --port $PORT --workers 1
+uvicorn bot.main:asgi_app --host 0.0.0.0 --port $PORT --workers ${WEB_CONCURRENCY:-1}
@@ -0,0 +1,34 @@
+import sqlite3
+
+from bot.reports import init_report_schema, update_daily_summary
+
+
+def _summary(conn, day):
+    return conn.execute(
+        'SELECT travel_seconds, onsite_seconds, trips, visits, en_route_since, arrived_since '
+        'FROM daily_summary WHERE day = ? AND user_id = 1', (day,)
+    ).fetchone()
+
+
+def test_interval_crossing_midnight_is_split_between_days():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE statuses (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, username TEXT, status TEXT NOT NULL, timestamp DATETIME NOT NULL)')
+    init_report_schema(conn)
+
+    update_daily_summary(conn, 1, 'artist', 'в пути', '2026-10-15 23:40:00+03:00')
+    update_daily_summary(conn, 1, 'artist', 'на месте', '2026-10-16 00:20:00+03:00')
+    update_daily_summary(conn, 1, 'artist', 'закончил', '2026-10-16 01:00:00+03:00')
+
+    assert _summary(conn, '2026-10-15') == (20 * 60, 0, 0, 0, None, None)
+    assert _summary(conn, '2026-10-16') == (20 * 60, 40 * 60, 1, 1, None, None)
+
+
+def test_interval_left_open_for_days_is_not_carried():
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE statuses (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL, username TEXT, status TEXT NOT NULL, timestamp DATETIME NOT NULL)')
+    init_report_schema(conn)
+
+    update_daily_summary(conn, 1, 'artist', 'на месте', '2026-10-13 22:00:00+03:00')
+    update_daily_summary(conn, 1, 'artist', 'закончил', '2026-10-16 09:00:00+03:00')
+
+    assert _summary(conn, '2026-10-16') == (0, 0, 0, 0, None, None)